@@ -1,13 +1,89 @@
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_STARTED = time.perf_counter()
+import asyncio
+import json
+import re
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from langgraph_workflow import workflow
-from config import GROQ_API_KEY, AVAILABLE_MODELS
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, field_validator
+from langgraph_workflow import get_workflow
+from config import (
+    GROQ_API_KEY, AVAILABLE_MODELS, VALIDATOR_WARMUP_ON_STARTUP,
+    BATCH_MAX_REQUIREMENTS, BATCH_MAX_CONCURRENCY, RENDER_MAX_DOT_BYTES,
+    STRUCTURED_OUTPUT, PARTITIONED_GENERATION
+)
+from incose_validator import ValidationResult
+from validator_registry import validator_registry
 from groq_client import GroqUMLClient
-from incose_validator import INCOSEValidator
+from uml_generator import UMLDiagramGenerator
+from uml_models import UMLDiagram
+from uml_patch import DiagramChanges, apply_patch, dot_fragments
+from uml_cache import get_uml_cache, normalize_scenario
+from validation_cache import normalize_requirement
+from diagram_renderer import (
+    RENDER_FORMATS, RenderError, RenderTimeout, RenderUnavailable, get_renderer
+)
+from parse_stats import parse_stats
+from prompt_builder import prompt_stats
+from incose_rules import rule_screen_stats
+from lazy_imports import import_timings
+from llm_scheduler import get_scheduler
+from metrics import HTTP_REQUEST_SECONDS, register_collector, render_metrics
+from single_flight import SingleFlight
+from job_queue import get_job_queue
 from typing import Optional, List
 
-app = FastAPI()
+# Heavy dependencies (torch, chromadb, langgraph, groq) are deferred until first use
+APP_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+def warmup() -> dict:
+    """
+    Load every deferred dependency now instead of on the first request
+    
+    Returns:
+        dict: Seconds spent per warmup step
+    """
+    timings = {}
+    start = time.perf_counter()
+    validator_registry.warmup()
+    timings["validator"] = time.perf_counter() - start
+    start = time.perf_counter()
+    get_workflow()
+    timings["workflow"] = time.perf_counter() - start
+    start = time.perf_counter()
+    diagram_generator.generate_diagram(UMLDiagram(title="warmup"))
+    GroqUMLClient().client
+    timings["diagram_and_groq"] = time.perf_counter() - start
+    print(f"🔥 Warmup finished in {sum(timings.values()):.2f}s")
+    return timings
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print(f"🚀 App modules imported in {APP_IMPORT_SECONDS:.2f}s")
+    # Load the embedding model, vector store and workflow once per worker, off the event loop.
+    # Scale-from-zero deployments can turn this off and call POST /warmup when convenient.
+    if VALIDATOR_WARMUP_ON_STARTUP:
+        threading.Thread(target=warmup, name="app-warmup", daemon=True).start()
+    # Creating the renderer scans its artifact cache on disk; done here so no request pays for it
+    await asyncio.to_thread(get_renderer)
+    queue = get_job_queue()
+    if queue is not None:
+        await queue.start(JOB_HANDLERS)
+    yield
+    if queue is not None:
+        await queue.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+diagram_generator = UMLDiagramGenerator()
+
+# Identical concurrent requests share one pipeline run
+generate_flight = SingleFlight("/generate-uml")
+evaluate_flight = SingleFlight("/evaluate-requirement")
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,23 +93,100 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # The route template, not the raw path, keeps artifact keys out of the label set
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, path, str(status))
+
 class ScenarioRequest(BaseModel):
     scenario: str
     uml_type: Optional[str] = None
     model: Optional[str] = "llama3-8b-8192"
+    structured: Optional[bool] = None  # None uses STRUCTURED_OUTPUT; /generate-uml/stream then sends only "done"
+    partitioned: Optional[bool] = None  # Outline + per-subsystem generation; None uses PARTITIONED_GENERATION
 
 class UMLResponse(BaseModel):
     dot_source: str
     uml_diagram: Optional[str] = None
     error: Optional[str] = None
+    model: Optional[str] = None  # Model that generated the diagram; differs from the request after a fallback
+
+class RefineRequest(BaseModel):
+    uml_diagram: UMLDiagram  # Also accepts the JSON string returned as UMLResponse.uml_diagram
+    instruction: str
+    uml_type: Optional[str] = None
+    model: Optional[str] = "llama3-8b-8192"
+    structured: Optional[bool] = None
+    include_dot_source: bool = True  # False returns only the DOT fragments that changed
+
+    @field_validator("uml_diagram", mode="before")
+    @classmethod
+    def parse_diagram_json(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+class RefineResponse(BaseModel):
+    uml_diagram: str
+    dot_source: Optional[str] = None
+    dot_fragments: dict
+    changed: bool
+    error: Optional[str] = None
 
 class RequirementRequest(BaseModel):
     requirement: str
     model: Optional[str] = "llama3-8b-8192"
+    structured: Optional[bool] = None  # None uses STRUCTURED_OUTPUT
+    deep_review: bool = False  # Always run the LLM, even when the rule pre-screen rejects
 
 class RequirementResponse(BaseModel):
     result: str  # "VALID" or "INVALID"
     reason: str  # Detailed reasoning from the validator
+    model: Optional[str] = None  # Model that evaluated it; None when the rule pre-screen answered
+
+class BatchRequirementRequest(BaseModel):
+    requirements: List[str]
+    model: Optional[str] = "llama3-8b-8192"
+    max_concurrency: Optional[int] = None
+    structured: Optional[bool] = None
+    deep_review: bool = False
+
+class BatchRequirementItem(BaseModel):
+    index: int
+    requirement: str
+    result: str  # "VALID" or "INVALID"
+    reason: str
+    score: float
+    error: Optional[str] = None  # Set when this item failed; other items are unaffected
+    model: Optional[str] = None  # As in RequirementResponse
+
+class BatchRequirementResponse(BaseModel):
+    results: List[BatchRequirementItem]
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str  # "generate-uml" or "evaluate-requirements"
+    status: str  # "queued", "running", "succeeded", "failed" or "cancelled"
+    priority: int
+    completed: int  # Progress, e.g. requirements validated so far
+    total: int
+    attempts: int  # Runs started; above 1 when a worker was lost mid-job
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None  # The job and its result are deleted after this time
+
+class RenderRequest(BaseModel):
+    dot_source: str
+    format: str = "svg"  # "svg" or "png"
 
 class ModelInfo(BaseModel):
     id: str
@@ -44,6 +197,150 @@ class ModelInfo(BaseModel):
 class ModelsResponse(BaseModel):
     models: List[ModelInfo]
 
+class HealthResponse(BaseModel):
+    status: str
+    validator: dict
+
+@app.get("/health", response_model=HealthResponse)
+def health():
+    return HealthResponse(status="ok", validator=validator_registry.status())
+
+@app.get("/ready", response_model=HealthResponse)
+def ready():
+    # Load balancers should only route to workers whose validator is warm
+    status = validator_registry.status()
+    if not validator_registry.is_ready:
+        return JSONResponse(
+            status_code=503,
+            content=HealthResponse(status="warming", validator=status).model_dump()
+        )
+    return HealthResponse(status="ready", validator=status)
+
+@app.get("/startup")
+def startup_report():
+    # Import cost of the app modules, then of each dependency deferred to first use
+    return {
+        "app_import_seconds": APP_IMPORT_SECONDS,
+        "deferred_imports": import_timings(),
+        "validator": validator_registry.status()
+    }
+
+@app.post("/warmup")
+async def warmup_endpoint():
+    timings = await run_in_threadpool(warmup)
+    return {"status": "warm", "seconds": timings, "deferred_imports": import_timings()}
+
+@app.get("/cache/stats")
+def cache_stats():
+    cache = get_uml_cache()
+    return {
+        "uml": cache.stats() if cache is not None else None,
+        "validation": validator_registry.cache_stats(),
+        "query_embeddings": validator_registry.embedding_cache_stats(),
+        "render": get_renderer().stats()
+    }
+
+@app.post("/cache/clear")
+def clear_caches():
+    cache = get_uml_cache()
+    if cache is not None:
+        cache.clear()
+    validator_registry.invalidate_result_caches()
+    return {"status": "cleared"}
+
+@app.get("/stats/parse")
+def get_parse_stats():
+    # Per-model parse failure rates, split by free-text and structured output mode
+    return {"parse": parse_stats()}
+
+@app.get("/stats/rules")
+def get_rule_screen_stats():
+    # Share of validations answered by the deterministic rule pre-screen without an LLM call
+    return rule_screen_stats.snapshot()
+
+@app.get("/stats/prompt")
+def get_prompt_stats():
+    # Per-model average evaluation prompt size (estimated tokens) and LLM latency
+    return {"prompt": prompt_stats()}
+
+def collect_pipeline_metrics():
+    """Export the parse, rule screen and cache counters kept elsewhere as metric families"""
+    parse = parse_stats()
+    yield "llm_parse_total", "counter", "LLM outputs parsed, by kind and output mode", [
+        ({"kind": entry["kind"], "model": entry["model"], "mode": entry["mode"]}, entry["attempts"])
+        for entry in parse
+    ]
+    yield "llm_parse_failures_total", "counter", "LLM outputs that failed to parse or needed a fallback", [
+        ({"kind": entry["kind"], "model": entry["model"], "mode": entry["mode"]}, entry["failures"])
+        for entry in parse
+    ]
+    screen = rule_screen_stats.snapshot()
+    yield "rule_screen_total", "counter", "Rule pre-screen outcomes", [
+        ({"outcome": outcome}, screen[outcome]) for outcome in ("fast_path", "inconclusive", "deep_review")
+    ]
+
+    # (labels, hits, misses, entries) per cache
+    caches = []
+    uml = get_uml_cache()
+    if uml is not None:
+        stats = uml.stats()
+        caches.append(({"cache": "uml", "model": "", "mode": ""}, stats["hits"], stats["misses"], stats["memory_entries"]))
+    for model, modes in validator_registry.cache_stats().items():
+        for mode, stats in modes.items():
+            caches.append((
+                {"cache": "validation", "model": model, "mode": mode},
+                stats["exact_hits"] + stats["semantic_hits"], stats["misses"], stats["entries"]
+            ))
+    embeddings = validator_registry.embedding_cache_stats()
+    if embeddings is not None:
+        caches.append(({"cache": "query_embeddings", "model": "", "mode": ""}, embeddings["hits"], embeddings["misses"], embeddings["entries"]))
+    render = get_renderer().stats()
+    caches.append(({"cache": "render", "model": "", "mode": ""}, render["hits"], render["misses"], render["entries"]))
+    yield "cache_hits_total", "counter", "Cache lookups answered from the cache", [
+        (labels, hits) for labels, hits, _, _ in caches
+    ]
+    yield "cache_misses_total", "counter", "Cache lookups that missed", [
+        (labels, misses) for labels, _, misses, _ in caches
+    ]
+    yield "cache_entries", "gauge", "Entries held in memory by each cache", [
+        (labels, entries) for labels, _, _, entries in caches
+    ]
+
+    budgets = get_scheduler().stats()["models"]
+    yield "llm_budget_available", "gauge", "Requests and tokens the scheduler would admit now, per model", [
+        ({"model": model, "budget": budget}, snapshot[f"{budget}_available"])
+        for model, snapshot in budgets.items() for budget in ("requests", "tokens")
+    ]
+
+    queue = get_job_queue()
+    if queue is not None:
+        yield "jobs", "gauge", "Background jobs in the job store, by status", [
+            ({"status": status}, count) for status, count in queue.store.counts().items()
+        ]
+
+register_collector(collect_pipeline_metrics)
+
+@app.get("/stats/single-flight")
+def get_single_flight_stats():
+    # Requests that joined an identical call already in flight instead of running their own
+    return {flight.name: flight.stats() for flight in (generate_flight, evaluate_flight)}
+
+@app.get("/stats/jobs")
+def get_job_stats():
+    # Job counts by status across every process sharing the job store, and this process's workers
+    queue = get_job_queue()
+    return queue.stats() if queue is not None else {"enabled": False}
+
+@app.get("/stats/scheduler")
+def get_scheduler_stats():
+    # Per-model request and token budgets of the Groq call scheduler, as last aligned with rate limit headers
+    return get_scheduler().stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus scrape target: stage and HTTP latency histograms, LLM tokens, parse and cache counters
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/models", response_model=ModelsResponse)
 def get_available_models():
     models = []
@@ -56,12 +353,11 @@ def get_available_models():
         ))
     return ModelsResponse(models=models)
 
-@app.post("/generate-uml", response_model=UMLResponse)
-def generate_uml_endpoint(req: ScenarioRequest):
+def prepare_scenario(req: ScenarioRequest):
+    """Validate a generation request; returns (stripped scenario, model)"""
     if not GROQ_API_KEY:
         raise HTTPException(status_code=400, detail="GROQ_API_KEY not set.")
     scenario = req.scenario.strip()
-    uml_type = req.uml_type
     model = req.model or "llama3-8b-8192"
     
     if model not in AVAILABLE_MODELS:
@@ -69,28 +365,244 @@ def generate_uml_endpoint(req: ScenarioRequest):
     
     if not scenario:
         raise HTTPException(status_code=400, detail="Scenario description is required.")
+    return scenario, model
+
+async def run_uml_workflow(scenario: str, model: str, req: ScenarioRequest) -> UMLResponse:
+    result = await get_workflow().ainvoke({
+        "scenario": scenario,
+        "uml_diagram": None,
+        "dot_source": "",
+        "error": "",
+        "uml_type": req.uml_type,
+        "model": model,
+        "structured": req.structured,
+        "partitioned": req.partitioned
+    })
+    uml_diagram_obj = result.get("uml_diagram", None)
+    uml_diagram_str = uml_diagram_obj.json() if uml_diagram_obj else None
+    return UMLResponse(
+        dot_source=result.get("dot_source", ""),
+        uml_diagram=uml_diagram_str,
+        error=result.get("error", None),
+        model=result.get("served_model") or model
+    )
+
+def generation_key(scenario: str, model: str, req: ScenarioRequest) -> tuple:
+    """Single-flight key: everything that changes the diagram, with None options resolved to their defaults"""
+    return (
+        normalize_scenario(scenario), req.uml_type, model,
+        STRUCTURED_OUTPUT if req.structured is None else req.structured,
+        PARTITIONED_GENERATION if req.partitioned is None else req.partitioned
+    )
+
+@app.post("/generate-uml", response_model=UMLResponse)
+async def generate_uml_endpoint(req: ScenarioRequest):
+    scenario, model = prepare_scenario(req)
+    key = generation_key(scenario, model, req)
     try:
-        print(f"Requested UML type: {uml_type}, Model: {model}")
-        result = workflow.invoke({
-            "scenario": scenario,
-            "uml_diagram": None,
-            "dot_source": "",
-            "error": "",
-            "uml_type": uml_type,
-            "model": model
-        })
-        uml_diagram_obj = result.get("uml_diagram", None)
-        uml_diagram_str = uml_diagram_obj.json() if uml_diagram_obj else None
-        return UMLResponse(
-            dot_source=result.get("dot_source", ""),
-            uml_diagram=uml_diagram_str,
-            error=result.get("error", None)
-        )
+        return await generate_flight.do(key, lambda: run_uml_workflow(scenario, model, req))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate-uml/refine", response_model=RefineResponse)
+async def refine_uml_endpoint(req: RefineRequest):
+    """
+    Apply an instruction to an existing diagram
+
+    The LLM returns only the added, changed and removed classes and relationships,
+    which are merged into the given diagram; dot_fragments holds the DOT statements
+    for just those changes. On failure the diagram is returned unchanged with error set.
+    """
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=400, detail="GROQ_API_KEY not set.")
+    instruction = req.instruction.strip()
+    model = req.model or "llama3-8b-8192"
+    
+    if model not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+    
+    if not instruction:
+        raise HTTPException(status_code=400, detail="Refinement instruction is required.")
+    
+    groq_client = GroqUMLClient(model=model, structured=req.structured)
+    error = None
+    try:
+        patch = await groq_client.arefine_uml(req.uml_diagram, instruction, req.uml_type)
+        diagram, changes = apply_patch(req.uml_diagram, patch)
+    except Exception as e:
+        print(f"Error refining UML: {e}")
+        error = f"Error refining UML: {str(e)}"
+        diagram, changes = req.uml_diagram, DiagramChanges()
+    return RefineResponse(
+        uml_diagram=diagram.model_dump_json(),
+        dot_source=diagram_generator.generate_diagram(diagram) if req.include_dot_source else None,
+        dot_fragments=dot_fragments(changes),
+        changed=not changes.is_empty,
+        error=error
+    )
+
+# Rendered artifacts are content-addressed, so a URL's bytes never change
+_ARTIFACT_NAME = re.compile(r"^([0-9a-f]{64})\.(svg|png)$")
+_ARTIFACT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def artifact_headers(key: str, fmt: str) -> dict:
+    return {
+        "ETag": f'"{key}"',
+        "Cache-Control": _ARTIFACT_CACHE_CONTROL,
+        "Content-Location": f"/render/{key}.{fmt}"
+    }
+
+def etag_matches(request: Request, key: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or f'"{key}"' in tags
+
+@app.post("/render")
+async def render_endpoint(req: RenderRequest):
+    fmt = req.format.lower()
+    if fmt not in RENDER_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {req.format}")
+    if not req.dot_source.strip():
+        raise HTTPException(status_code=400, detail="DOT source is required.")
+    if len(req.dot_source.encode("utf-8")) > RENDER_MAX_DOT_BYTES:
+        raise HTTPException(status_code=413, detail=f"DOT source exceeds {RENDER_MAX_DOT_BYTES} bytes.")
+    try:
+        key, data = await get_renderer().render(req.dot_source, fmt)
+    except RenderUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except RenderError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid DOT source: {str(e)[:500]}")
+    return Response(content=data, media_type=RENDER_FORMATS[fmt], headers=artifact_headers(key, fmt))
+
+@app.get("/render/{artifact}")
+def get_rendered_artifact(artifact: str, request: Request):
+    match = _ARTIFACT_NAME.match(artifact)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Rendered diagram not found")
+    key, fmt = match.groups()
+    renderer = get_renderer()
+    # Checked before the ETag so "If-None-Match: *" cannot answer 304 for a missing artifact
+    if not renderer.has(key, fmt):
+        # Evicted or never rendered: POST the DOT source to /render again
+        raise HTTPException(status_code=404, detail="Rendered diagram not found")
+    if etag_matches(request, key):
+        return Response(status_code=304, headers=artifact_headers(key, fmt))
+    data = renderer.get(key, fmt)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Rendered diagram not found")
+    return Response(content=data, media_type=RENDER_FORMATS[fmt], headers=artifact_headers(key, fmt))
+
+def encode_stream_event(event: str, payload: dict, stream_format: str) -> str:
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": event, **payload}) + "\n"
+
+@app.post("/generate-uml/stream")
+async def generate_uml_stream_endpoint(req: ScenarioRequest):
+    """
+    Stream UML generation as NDJSON
+    
+    Emits "title", "class" and "relationship" events as each element of the LLM's
+    XML closes, each with the DOT source of the partial diagram, then "done" with
+    the final UMLDiagram JSON, DOT source and the model that generated it.
+    Structured and partitioned generation produce no XML to stream, so those
+    requests run the /generate-uml pipeline (sharing its single-flight) and
+    send only "done".
+    """
+    scenario, model = prepare_scenario(req)
+    key = generation_key(scenario, model, req)
+    
+    async def whole_diagram_events():
+        try:
+            response = await generate_flight.do(key, lambda: run_uml_workflow(scenario, model, req))
+            yield encode_stream_event("done", response.model_dump(), "ndjson")
+        except Exception as e:
+            yield encode_stream_event("error", {"detail": str(e)}, "ndjson")
+    
+    async def events():
+        try:
+            groq_client = GroqUMLClient(model=model)
+            async for event, payload, diagram in groq_client.astream_uml(scenario, req.uml_type):
+                if event == "title":
+                    yield encode_stream_event("title", {"title": payload}, "ndjson")
+                elif event in ("class", "relationship"):
+                    yield encode_stream_event(event, {
+                        event: payload.model_dump(),
+                        "dot_source": diagram_generator.generate_diagram(diagram)
+                    }, "ndjson")
+                else:
+                    yield encode_stream_event("done", {
+                        "uml_diagram": payload.model_dump_json(),
+                        "dot_source": diagram_generator.generate_diagram(payload),
+                        "model": payload.served_model or model
+                    }, "ndjson")
+        except Exception as e:
+            yield encode_stream_event("error", {"detail": str(e)}, "ndjson")
+    
+    _, _, _, structured, partitioned = key
+    return StreamingResponse(
+        whole_diagram_events() if structured or partitioned else events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_validation_reason(validation_result: ValidationResult) -> str:
+    """Render a ValidationResult as the human-readable reason shown in the UI"""
+    # Format the reason with all available information
+    reason_parts = []
+    
+    # Add overall percentage score at the top
+    reason_parts.append(f"Overall Score: {validation_result.score:.1f}%")
+    reason_parts.append("")  # Add empty line
+    
+    # Add detailed analysis for each INCOSE criteria
+    if validation_result.analysis:
+        reason_parts.append("INCOSE Criteria Analysis:")
+        for criterion, assessment in validation_result.analysis.items():
+            criterion_name = criterion.upper()
+            reason_parts.append(f"• {criterion_name}: {assessment}")
+        reason_parts.append("")  # Add empty line
+    
+    if validation_result.detailed_reasoning:
+        reason_parts.append("Overall Assessment:")
+        reason_parts.append(validation_result.detailed_reasoning)
+        reason_parts.append("")  # Add empty line
+    
+    if validation_result.issues:
+        reason_parts.append("Issues Identified:")
+        for issue in validation_result.issues:
+            reason_parts.append(f"• {issue}")
+        reason_parts.append("")  # Add empty line
+    
+    if validation_result.suggestions:
+        reason_parts.append("Improvement Suggestions:")
+        for suggestion in validation_result.suggestions:
+            reason_parts.append(f"• {suggestion}")
+        reason_parts.append("")  # Add empty line
+    
+    # Add improvements section
+    reason_parts.append("Improvements:")
+    if validation_result.is_valid and validation_result.score >= 80:
+        reason_parts.append("• This requirement meets INCOSE standards well")
+        reason_parts.append("• Consider minor refinements for enhanced clarity if needed")
+    elif validation_result.is_valid and validation_result.score >= 60:
+        reason_parts.append("• This requirement is acceptable but has room for improvement")
+        reason_parts.append("• Focus on addressing the issues identified above")
+        reason_parts.append("• Consider making the requirement more specific and measurable")
+    else:
+        reason_parts.append("• This requirement needs significant improvements to meet INCOSE standards")
+        reason_parts.append("• Rewrite the requirement to address all identified issues")
+        reason_parts.append("• Ensure clarity, completeness, and verifiability")
+        reason_parts.append("• Consider breaking complex requirements into smaller, more manageable parts")
+    
+    return "\n".join(reason_parts)
+
 @app.post("/evaluate-requirement", response_model=RequirementResponse)
-def evaluate_requirement_endpoint(req: RequirementRequest):
+async def evaluate_requirement_endpoint(req: RequirementRequest):
     if not GROQ_API_KEY:
         raise HTTPException(status_code=400, detail="GROQ_API_KEY not set.")
     
@@ -106,67 +618,239 @@ def evaluate_requirement_endpoint(req: RequirementRequest):
             reason="Requirement cannot be empty."
         )
     
-    try:
-        groq_client = GroqUMLClient(model=model)
-        validator = INCOSEValidator(groq_client)
+    async def run_validation() -> RequirementResponse:
+        # get() may block on a cold registry's warmup, so keep it off the event loop
+        validator = await run_in_threadpool(validator_registry.get, model, req.structured)
         
-        validation_result = validator.validate_requirement(requirement)
+        validation_result = await validator.avalidate_requirement(requirement, deep_review=req.deep_review)
         
         # Convert ValidationResult to our response format
-        result = "VALID" if validation_result.is_valid else "INVALID"
-        
-        # Format the reason with all available information
-        reason_parts = []
-        
-        # Add overall percentage score at the top
-        reason_parts.append(f"Overall Score: {validation_result.score:.1f}%")
-        reason_parts.append("")  # Add empty line
-        
-        # Add detailed analysis for each INCOSE criteria
-        if validation_result.analysis:
-            reason_parts.append("INCOSE Criteria Analysis:")
-            for criterion, assessment in validation_result.analysis.items():
-                criterion_name = criterion.upper()
-                reason_parts.append(f"• {criterion_name}: {assessment}")
-            reason_parts.append("")  # Add empty line
-        
-        if validation_result.detailed_reasoning:
-            reason_parts.append("Overall Assessment:")
-            reason_parts.append(validation_result.detailed_reasoning)
-            reason_parts.append("")  # Add empty line
-        
-        if validation_result.issues:
-            reason_parts.append("Issues Identified:")
-            for issue in validation_result.issues:
-                reason_parts.append(f"• {issue}")
-            reason_parts.append("")  # Add empty line
-        
-        if validation_result.suggestions:
-            reason_parts.append("Improvement Suggestions:")
-            for suggestion in validation_result.suggestions:
-                reason_parts.append(f"• {suggestion}")
-            reason_parts.append("")  # Add empty line
-        
-        # Add improvements section
-        reason_parts.append("Improvements:")
-        if validation_result.is_valid and validation_result.score >= 80:
-            reason_parts.append("• This requirement meets INCOSE standards well")
-            reason_parts.append("• Consider minor refinements for enhanced clarity if needed")
-        elif validation_result.is_valid and validation_result.score >= 60:
-            reason_parts.append("• This requirement is acceptable but has room for improvement")
-            reason_parts.append("• Focus on addressing the issues identified above")
-            reason_parts.append("• Consider making the requirement more specific and measurable")
-        else:
-            reason_parts.append("• This requirement needs significant improvements to meet INCOSE standards")
-            reason_parts.append("• Rewrite the requirement to address all identified issues")
-            reason_parts.append("• Ensure clarity, completeness, and verifiability")
-            reason_parts.append("• Consider breaking complex requirements into smaller, more manageable parts")
-        
-        reason = "\n".join(reason_parts)
-        
         return RequirementResponse(
-            result=result,
-            reason=reason
+            result="VALID" if validation_result.is_valid else "INVALID",
+            reason=format_validation_reason(validation_result),
+            model=validation_result.model
         )
+
+    key = (
+        normalize_requirement(requirement), model,
+        STRUCTURED_OUTPUT if req.structured is None else req.structured, req.deep_review
+    )
+    try:
+        return await evaluate_flight.do(key, run_validation)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error evaluating requirement: {str(e)}")
+
+def to_batch_item(index: int, requirement: str, validation_result: ValidationResult) -> BatchRequirementItem:
+    return BatchRequirementItem(
+        index=index,
+        requirement=requirement,
+        result="VALID" if validation_result.is_valid else "INVALID",
+        reason=format_validation_reason(validation_result),
+        score=validation_result.score,
+        error=validation_result.error,
+        model=validation_result.model
+    )
+
+def prepare_batch(req: BatchRequirementRequest):
+    """Validate a batch request; returns (model, stripped requirements, non-empty indexes, concurrency)"""
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=400, detail="GROQ_API_KEY not set.")
+    
+    model = req.model or "llama3-8b-8192"
+    if model not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+    
+    if len(req.requirements) > BATCH_MAX_REQUIREMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many requirements: {len(req.requirements)} (max {BATCH_MAX_REQUIREMENTS})"
+        )
+    
+    requirements = [requirement.strip() for requirement in req.requirements]
+    non_empty = [i for i, requirement in enumerate(requirements) if requirement]
+    max_concurrency = min(req.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    return model, requirements, non_empty, max_concurrency
+
+def empty_batch_item(index: int, requirement: str) -> BatchRequirementItem:
+    return BatchRequirementItem(
+        index=index,
+        requirement=requirement,
+        result="INVALID",
+        reason="Requirement cannot be empty.",
+        score=0.0,
+        error="Requirement cannot be empty."
+    )
+
+def batch_response(requirements: List[str], by_index: dict) -> BatchRequirementResponse:
+    """Results in input order; requirements missing from by_index were empty"""
+    items = []
+    for index, requirement in enumerate(requirements):
+        if index in by_index:
+            items.append(to_batch_item(index, requirement, by_index[index]))
+        else:
+            items.append(empty_batch_item(index, requirement))
+    return BatchRequirementResponse(results=items)
+
+@app.post("/evaluate-requirements/batch", response_model=BatchRequirementResponse)
+async def evaluate_requirements_batch_endpoint(req: BatchRequirementRequest):
+    model, requirements, non_empty, max_concurrency = prepare_batch(req)
+    
+    try:
+        validator = await run_in_threadpool(validator_registry.get, model, req.structured)
+        validation_results = await validator.avalidate_many(
+            [requirements[i] for i in non_empty],
+            max_concurrency=max_concurrency,
+            deep_review=req.deep_review
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error evaluating requirements: {str(e)}")
+    
+    return batch_response(requirements, dict(zip(non_empty, validation_results)))
+
+@app.post("/evaluate-requirements/stream")
+async def evaluate_requirements_stream_endpoint(req: BatchRequirementRequest, format: str = "ndjson"):
+    """
+    Validate a batch and stream each result as soon as it finishes
+    
+    Emits a "start" event with the total, one "result" event per requirement in
+    completion order (each carries its input index and progress counters), then
+    "done". Use format=ndjson (default) or format=sse for Server-Sent Events framing.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Invalid stream format: {format}")
+    model, requirements, non_empty, max_concurrency = prepare_batch(req)
+    validator = await run_in_threadpool(validator_registry.get, model, req.structured)
+    
+    async def events():
+        total = len(requirements)
+        completed = 0
+        start = time.perf_counter()
+        yield encode_stream_event("start", {"total": total}, format)
+        try:
+            non_empty_set = set(non_empty)
+            for index, requirement in enumerate(requirements):
+                if index not in non_empty_set:
+                    completed += 1
+                    item = empty_batch_item(index, requirement)
+                    yield encode_stream_event(
+                        "result", {"completed": completed, "total": total, "item": item.model_dump()}, format
+                    )
+            async for position, validation_result in validator.aiter_validate_many(
+                [requirements[i] for i in non_empty],
+                max_concurrency=max_concurrency,
+                deep_review=req.deep_review
+            ):
+                index = non_empty[position]
+                completed += 1
+                item = to_batch_item(index, requirements[index], validation_result)
+                yield encode_stream_event(
+                    "result", {"completed": completed, "total": total, "item": item.model_dump()}, format
+                )
+        except Exception as e:
+            yield encode_stream_event("error", {"completed": completed, "total": total, "detail": str(e)}, format)
+            return
+        yield encode_stream_event(
+            "done",
+            {"completed": completed, "total": total, "elapsed_seconds": round(time.perf_counter() - start, 3)},
+            format
+        )
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        # Disable proxy buffering so events reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def require_job_queue():
+    queue = get_job_queue()
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is disabled (JOBS_ENABLED=false)")
+    return queue
+
+def to_job_response(job: dict) -> JobResponse:
+    return JobResponse(**{field: job[field] for field in JobResponse.model_fields})
+
+async def generate_uml_job(payload: dict, progress) -> dict:
+    req = ScenarioRequest(**payload)
+    scenario, model = prepare_scenario(req)
+    progress(0, 1)
+    response = await run_uml_workflow(scenario, model, req)
+    progress(1, 1)
+    return response.model_dump()
+
+async def evaluate_requirements_job(payload: dict, progress) -> dict:
+    req = BatchRequirementRequest(**payload)
+    model, requirements, non_empty, max_concurrency = prepare_batch(req)
+    validator = await run_in_threadpool(validator_registry.get, model, req.structured)
+    total = len(requirements)
+    by_index = {}
+    progress(total - len(non_empty), total)
+    async for position, validation_result in validator.aiter_validate_many(
+        [requirements[i] for i in non_empty],
+        max_concurrency=max_concurrency,
+        deep_review=req.deep_review
+    ):
+        by_index[non_empty[position]] = validation_result
+        progress(total - len(non_empty) + len(by_index), total)
+    return batch_response(requirements, by_index).model_dump()
+
+JOB_HANDLERS = {
+    "generate-uml": generate_uml_job,
+    "evaluate-requirements": evaluate_requirements_job,
+}
+
+@app.post("/jobs/generate-uml", response_model=JobResponse, status_code=202)
+async def submit_generate_uml_job(req: ScenarioRequest, priority: int = 0):
+    """
+    Queue a UML generation; poll GET /jobs/{job_id} and fetch GET /jobs/{job_id}/result
+    
+    Higher priority jobs are claimed first. The request is checked now, so invalid
+    input fails with 400 here rather than as a failed job.
+    """
+    queue = require_job_queue()
+    prepare_scenario(req)
+    return to_job_response(await queue.submit("generate-uml", req.model_dump(), priority, total=1))
+
+@app.post("/jobs/evaluate-requirements", response_model=JobResponse, status_code=202)
+async def submit_evaluate_requirements_job(req: BatchRequirementRequest, priority: int = 0):
+    """
+    Queue a batch validation; the job's completed/total track requirements validated
+    
+    The result, once the job succeeds, is the BatchRequirementResponse that
+    POST /evaluate-requirements/batch would have returned.
+    """
+    queue = require_job_queue()
+    prepare_batch(req)
+    return to_job_response(
+        await queue.submit("evaluate-requirements", req.model_dump(), priority, total=len(req.requirements))
+    )
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str):
+    job = require_job_queue().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return to_job_response(job)
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    # UMLResponse or BatchRequirementResponse, as the synchronous endpoint would have returned
+    job = require_job_queue().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job["status"] != "succeeded":
+        detail = f"Job is {job['status']}"
+        if job["error"]:
+            detail += f": {job['error']}"
+        raise HTTPException(status_code=409, detail=detail)
+    return JSONResponse(content=job["result"])
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    # Queued jobs never start; running jobs stop at their next await. Finished jobs are left as they are.
+    # Async so the worker task is cancelled from the event loop's own thread
+    job = await require_job_queue().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return to_job_response(job)
@@ -0,0 +1,130 @@
+"""
+Benchmark the DOT writer against the graphviz.Digraph-based generator it replaced.
+
+Builds synthetic class diagrams of 1k to 10k classes (with as many
+relationships, and a few attributes and methods per class), then reports per
+size the time each path takes, its throughput in classes per second, and its
+peak Python memory (tracemalloc). Plain names make both paths emit identical
+DOT, which is checked; a final pass renders one diagram from several threads
+through a single shared generator and checks every result matches.
+
+    python benchmark_dot_writer.py [--sizes 1000 2500 5000 10000] [--repeat 3] [--threads 8]
+"""
+
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_imports import timed_import
+from uml_generator import UMLDiagramGenerator
+from uml_models import UMLClass, UMLDiagram, UMLRelationship
+
+RELATIONSHIP_TYPES = ["inheritance", "association", "composition", "aggregation"]
+
+class DigraphDiagramGenerator:
+    """The generator as it was before dot_writer: label += per member, graphviz.Digraph state"""
+
+    def __init__(self):
+        self.dot = None
+
+    def generate_diagram(self, uml_diagram: UMLDiagram) -> str:
+        self.dot = timed_import("graphviz").Digraph(comment=uml_diagram.title)
+        self.dot.attr(rankdir='TB')
+        for uml_class in uml_diagram.classes:
+            self._add_class(uml_class)
+        for relationship in uml_diagram.relationships:
+            self._add_relationship(relationship)
+        return self.dot.source
+
+    def _add_class(self, uml_class: UMLClass):
+        label = f"<<TABLE BORDER='0' CELLBORDER='1' CELLSPACING='0'>"
+        label += f"<TR><TD PORT='header' BGCOLOR='lightblue'><B>{uml_class.name}</B></TD></TR>"
+        if uml_class.attributes:
+            label += f"<TR><TD PORT='attrs' BGCOLOR='lightgray'>"
+            for attr in uml_class.attributes:
+                label += f"{attr}<BR/>"
+            label += "</TD></TR>"
+        if uml_class.methods:
+            label += f"<TR><TD PORT='methods' BGCOLOR='lightyellow'>"
+            for method in uml_class.methods:
+                label += f"{method}<BR/>"
+            label += "</TD></TR>"
+        label += "</TABLE>>"
+        self.dot.node(uml_class.name, label, shape='none')
+
+    def _add_relationship(self, relationship: UMLRelationship):
+        arrow_styles = {
+            'inheritance': 'empty',
+            'association': 'open',
+            'composition': 'diamond',
+            'aggregation': 'odiamond'
+        }
+        arrowhead = arrow_styles.get(relationship.relationship_type, 'open')
+        self.dot.edge(
+            relationship.from_class,
+            relationship.to_class,
+            arrowhead=arrowhead,
+            label=relationship.relationship_type
+        )
+
+def synthetic_diagram(size: int) -> UMLDiagram:
+    classes = [
+        UMLClass(
+            name=f"Class{i}",
+            attributes=[f"- field{j}: int" for j in range(4)],
+            methods=[f"+ operation{j}(): void" for j in range(3)]
+        )
+        for i in range(size)
+    ]
+    relationships = [
+        UMLRelationship(
+            from_class=f"Class{i}",
+            to_class=f"Class{(i * 7 + 1) % size}",
+            relationship_type=RELATIONSHIP_TYPES[i % len(RELATIONSHIP_TYPES)]
+        )
+        for i in range(size)
+    ]
+    return UMLDiagram(title=f"Synthetic {size}", classes=classes, relationships=relationships)
+
+def measure(generate, diagram: UMLDiagram, repeat: int):
+    """Best wall time over repeat runs, then the peak traced memory of one more run"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        source = generate(diagram)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    generate(diagram)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, source
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2500, 5000, 10000], help="Classes per diagram")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per path and size (best is kept)")
+    arg_parser.add_argument("--threads", type=int, default=8, help="Threads sharing one generator in the final check")
+    args = arg_parser.parse_args()
+
+    writer = UMLDiagramGenerator()
+    digraph = DigraphDiagramGenerator()
+    print(f"{'classes':>8}{'path':>10}{'ms':>10}{'classes/s':>12}{'peak MiB':>10}{'speedup':>9}{'same dot':>10}")
+    for size in args.sizes:
+        diagram = synthetic_diagram(size)
+        digraph_s, digraph_peak, digraph_source = measure(digraph.generate_diagram, diagram, args.repeat)
+        writer_s, writer_peak, writer_source = measure(writer.generate_diagram, diagram, args.repeat)
+        print(f"{size:>8}{'digraph':>10}{digraph_s * 1e3:>10.1f}{size / digraph_s:>12,.0f}{digraph_peak / 2**20:>10.2f}")
+        print(
+            f"{size:>8}{'writer':>10}{writer_s * 1e3:>10.1f}{size / writer_s:>12,.0f}{writer_peak / 2**20:>10.2f}"
+            f"{digraph_s / writer_s:>8.1f}x{str(writer_source == digraph_source):>10}"
+        )
+
+    diagram = synthetic_diagram(args.sizes[0])
+    expected = writer.generate_diagram(diagram)
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda _: writer.generate_diagram(diagram), range(args.threads * 4)))
+    print(f"{len(results)} concurrent renders on one generator, all identical: {all(r == expected for r in results)}")
+
+if __name__ == "__main__":
+    main()
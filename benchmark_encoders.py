@@ -0,0 +1,83 @@
+"""
+Check the ONNX encoders against the float32 torch encoder and time all three.
+
+For a set of requirement queries, reports per-backend embedding latency, the
+cosine similarity of each backend's vectors to torch's, and whether the chunks
+retrieved from the INCOSE index (exact top-k and MMR) are the same as with the
+torch query vectors. Exits non-zero when retrieval parity is below --min-overlap.
+
+    python benchmark_encoders.py [--repeat 5] [--k 5] [--min-overlap 1.0]
+"""
+
+import argparse
+import resource
+import sys
+import time
+
+import numpy as np
+
+from benchmark_retrieval import QUERIES
+from config import INCOSE_PERSIST_DIR, NUMPY_INDEX_DIR
+from encoders import ENCODER_BACKENDS, load_encoder
+from incose_validator import IncoseStore
+from numpy_index import NumpyVectorIndex
+
+def overlap(reference, candidate) -> float:
+    return sum(len(set(r) & set(c)) for r, c in zip(reference, candidate)) / sum(len(r) for r in reference)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the query set")
+    arg_parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per query")
+    arg_parser.add_argument("--min-overlap", type=float, default=1.0, help="Required MMR overlap with torch")
+    args = arg_parser.parse_args()
+
+    if NumpyVectorIndex.exists(NUMPY_INDEX_DIR):
+        index = NumpyVectorIndex.load(NUMPY_INDEX_DIR)
+    else:
+        store = IncoseStore.load(INCOSE_PERSIST_DIR, backend="numpy", encoder_backend="torch")
+        if store.index is None:
+            raise SystemExit("INCOSE index could not be loaded")
+        index = store.index
+
+    results = {}
+    for backend in ENCODER_BACKENDS:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        try:
+            encoder = load_encoder(backend)
+        except Exception as e:
+            print(f"⚠️  Skipping {backend}: {e}")
+            continue
+        embeddings = np.asarray(encoder.embed_documents(QUERIES), dtype=np.float32)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for query in QUERIES:
+                encoder.embed_query(query)
+        results[backend] = {
+            "embeddings": embeddings,
+            "ms": (time.perf_counter() - start) / (args.repeat * len(QUERIES)) * 1e3,
+            # ru_maxrss is the process peak, so this is what loading the backend added to it
+            "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+            "top": [[row for row, _ in hits] for hits in index.search(embeddings, args.k)],
+            "mmr": index.mmr_rows(embeddings, k=args.k).tolist(),
+        }
+
+    if "torch" not in results:
+        raise SystemExit("The torch encoder is the parity reference and could not be loaded")
+    reference = results["torch"]
+    print(f"{'backend':<12}{'ms/query':>10}{'+peak MB':>10}{'min cos':>10}{'top-k':>8}{'mmr':>8}")
+    failed = False
+    for backend, result in results.items():
+        cosine = (result["embeddings"] * reference["embeddings"]).sum(axis=1).min()
+        top_overlap = overlap(reference["top"], result["top"])
+        mmr_overlap = overlap(reference["mmr"], result["mmr"])
+        failed |= mmr_overlap < args.min_overlap
+        print(f"{backend:<12}{result['ms']:>10.2f}{result['rss_mb']:>10.0f}{cosine:>10.4f}"
+              f"{top_overlap:>8.1%}{mmr_overlap:>8.1%}")
+    if failed:
+        print(f"❌ Retrieval parity below {args.min_overlap:.0%}")
+        sys.exit(1)
+    print("✅ Retrieved chunks match the torch encoder")
+
+if __name__ == "__main__":
+    main()
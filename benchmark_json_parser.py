@@ -0,0 +1,125 @@
+"""
+Benchmark the lenient JSON scanner against the regex repair chain it replaced.
+
+Runs both parsers over a corpus of malformed validator responses and reports the
+per-response parse cost and how many responses each one recovered.
+
+    python benchmark_json_parser.py [--repeat 200]
+"""
+
+import argparse
+import json
+import re
+import time
+
+from lenient_json import parse_lenient_json
+
+def legacy_fix_malformed_json(json_content: str) -> str:
+    """The former INCOSEValidator._fix_malformed_json, kept verbatim for comparison"""
+    json_content = re.sub(r'(\w+):', r'"\1":', json_content)
+    json_content = re.sub(r':\s*"(true|false)"', r': \1', json_content)
+    json_content = re.sub(r':\s*"(\d+(?:\.\d+)?)"', r': \1', json_content)
+    json_content = re.sub(r':\s*([^",\[\]{}]\w[^",\[\]{}]*)', r': "\1"', json_content)
+
+    def fix_array_items(match):
+        array_content = match.group(1)
+        items = []
+        parts = array_content.split(',')
+        for part in parts:
+            part = part.strip()
+            if not part:
+                continue
+            if not (part.startswith('"') and part.endswith('"')) and not re.match(r'^(\d+(\.\d+)?|true|false|null)$', part):
+                part = part.replace('"', '\\"')
+                part = f'"{part}"'
+            items.append(part)
+        return f"[{', '.join(items)}]"
+
+    return re.sub(r'\[([^\]]*)\]', fix_array_items, json_content)
+
+def legacy_parse(response_content: str):
+    """The former cleanup + repair + json.loads path of _parse_evaluation_response"""
+    response_content = response_content.strip()
+    response_content = response_content.replace('```json', '').replace('```', '').strip()
+    response_content = response_content.replace("'", '"')
+    response_content = response_content.replace('\\"', '"')
+    start_brace = response_content.find('{')
+    end_brace = response_content.rfind('}')
+    if start_brace != -1 and end_brace != -1 and end_brace > start_brace:
+        json_content = response_content[start_brace:end_brace + 1]
+    else:
+        json_content = response_content
+    json_content = legacy_fix_malformed_json(json_content)
+    try:
+        return json.loads(json_content)
+    except json.JSONDecodeError:
+        return None
+
+VALID = {
+    "is_valid": True,
+    "score": 85,
+    "issues": ["Response time lacks a load condition", "Term user is undefined"],
+    "suggestions": ["Specify the expected concurrent load", "Reference the user role"],
+    "detailed_reasoning": "The requirement is singular and verifiable but lacks context",
+    "analysis": {
+        "validity": "Valid - uses shall and a single capability",
+        "clarity": "Clear - one interpretation",
+        "completeness": "Incomplete - load conditions missing",
+        "feasibility": "Feasible - 2 seconds is achievable",
+        "verifiability": "Verifiable - measurable by test",
+        "traceability": "Traceable - maps to login use case",
+    },
+}
+
+def build_corpus():
+    clean = json.dumps(VALID, indent=4)
+    return {
+        "clean": clean,
+        "code_fence": f"Here is my evaluation:\n```json\n{clean}\n```\nLet me know if you need more.",
+        "single_quotes": clean.replace('"', "'"),
+        "apostrophes": clean.replace("lacks context", "doesn't state the user's context"),
+        "unescaped_quotes": clean.replace("one interpretation", 'one "obvious" interpretation'),
+        "unquoted_keys": re.sub(r'"(\w+)":', r"\1:", clean),
+        "python_literals": clean.replace("true", "True"),
+        "trailing_commas": clean.replace('"\n', '",\n').replace("]\n", "],\n"),
+        "quoted_numbers": clean.replace("85", '"85"'),
+        "truncated": clean[:int(len(clean) * 0.8)],
+        "long_reasoning": clean.replace("lacks context", "lacks context " * 400),
+    }
+
+def time_parser(parser, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def recovered(result) -> bool:
+    return isinstance(result, dict) and "score" in result and "analysis" in result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--repeat", type=int, default=200, help="Parses per corpus entry")
+    args = arg_parser.parse_args()
+
+    corpus = build_corpus()
+    print(f"{'case':<18}{'legacy µs':>12}{'lenient µs':>12}{'speedup':>10}  legacy  lenient")
+    totals = [0.0, 0.0]
+    wins = [0, 0]
+    for name, text in corpus.items():
+        legacy_us = time_parser(legacy_parse, text, args.repeat)
+        lenient_us = time_parser(parse_lenient_json, text, args.repeat)
+        legacy_ok = recovered(legacy_parse(text))
+        lenient_ok = recovered(parse_lenient_json(text))
+        totals[0] += legacy_us
+        totals[1] += lenient_us
+        wins[0] += legacy_ok
+        wins[1] += lenient_ok
+        print(
+            f"{name:<18}{legacy_us:>12.1f}{lenient_us:>12.1f}{legacy_us / lenient_us:>9.1f}x"
+            f"  {'ok' if legacy_ok else 'FAIL':<6}  {'ok' if lenient_ok else 'FAIL'}"
+        )
+    print(f"{'total':<18}{totals[0]:>12.1f}{totals[1]:>12.1f}{totals[0] / totals[1]:>9.1f}x"
+          f"  {wins[0]}/{len(corpus)}    {wins[1]}/{len(corpus)}")
+
+if __name__ == "__main__":
+    main()
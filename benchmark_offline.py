@@ -0,0 +1,342 @@
+"""
+Offline load benchmark of the app and its pipeline, with Groq replaced by recorded completions.
+
+Swaps groq_replay's stand-in in for the Groq client, so the LLM costs a
+simulated, seeded delay instead of a network call and needs no API key. Then
+drives each target at each concurrency level:
+
+    app:/generate-uml          POST through the real FastAPI app (in-process ASGI)
+    app:/generate-uml/refine
+    app:/evaluate-requirement
+    workflow                   the compiled LangGraph workflow (ainvoke)
+    validator                  INCOSEValidator.avalidate_requirement
+    diagram                    UMLDiagramGenerator.generate_diagram on worker threads
+
+For every target and level it reports p50/p95/p99 latency, requests per second,
+errors (including requests answered with an error diagram or failed evaluation),
+peak RSS while the level ran, stub LLM calls and 429s, and mean time per pipeline stage
+(from metrics.stage_seconds). Every request uses distinct input, and the UML and
+validation caches are off unless --caches is given, so each request reaches the
+stub. Evaluations ask for a deep review so none are answered by the rule
+pre-screen alone. --server-rpm makes the stub enforce a per-model request limit
+like Groq's, to measure goodput with LLM_SCHEDULER_ENABLED on and off. The
+scheduler's default request budget would otherwise set the pace, so it is off
+unless --server-rpm is given; --scheduler on/off overrides that, and the setting
+is recorded with the results. Results go to a JSON file; --baseline compares them with an earlier file, e.g. one written
+on another commit.
+
+    python benchmark_offline.py [--concurrency 1 8 32] [--requests 64] [--targets ...]
+        [--latency-ms 250] [--tokens-per-second 800] [--server-rpm 0] [--scheduler on|off] [--output benchmark_offline.json]
+        [--baseline previous.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+TARGETS = [
+    "app:/generate-uml", "app:/generate-uml/refine", "app:/evaluate-requirement",
+    "workflow", "validator", "diagram"
+]
+
+def configure_environment(args):
+    # config.py reads the environment when first imported, so this runs before any app module is loaded
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ["VALIDATOR_WARMUP_ON_STARTUP"] = "false"
+    if not args.caches:
+        os.environ["UML_CACHE_ENABLED"] = "false"
+        os.environ["VALIDATION_CACHE_ENABLED"] = "false"
+        os.environ["QUERY_EMBEDDING_CACHE_SIZE"] = "0"
+    if args.scheduler is None:
+        args.scheduler = "on" if args.server_rpm else "off"
+    os.environ["LLM_SCHEDULER_ENABLED"] = "true" if args.scheduler == "on" else "false"
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear interpolation between closest ranks; q in [0, 100]"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class PeakRSS:
+    """Highest resident set size seen while the block runs, sampled every 10 ms"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while True:
+            rss = current_rss_bytes()
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        if current_rss_bytes() is not None:
+            self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            # No /proc: the process-lifetime peak is the best available (KiB on Linux, bytes on macOS)
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if sys.platform == "darwin" else maxrss * 1024
+        return False
+
+def stage_totals() -> Dict[str, list]:
+    """[seconds, count] per stage, summed over models"""
+    from metrics import STAGE_SECONDS
+    totals = {}
+    for (stage, _model), series in STAGE_SECONDS.snapshot().items():
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += series["sum"]
+        entry[1] += series["count"]
+    return totals
+
+def stage_means_ms(before: Dict[str, list], after: Dict[str, list]) -> Dict[str, float]:
+    means = {}
+    for stage, (seconds, count) in sorted(after.items()):
+        previous_seconds, previous_count = before.get(stage, (0.0, 0))
+        if count > previous_count:
+            means[stage] = (seconds - previous_seconds) / (count - previous_count) * 1e3
+    return means
+
+async def run_level(operation: Callable[[int], Awaitable[bool]], requests: int, concurrency: int, offset: int):
+    """Run requests operations with at most concurrency in flight; returns (latencies, errors, wall seconds)"""
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            try:
+                ok = await operation(offset + index)
+            except Exception as e:
+                print(f"⚠️  Request {offset + index} failed: {e}")
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return latencies, errors, time.perf_counter() - start
+
+def scenario(index: int) -> str:
+    return (
+        f"Online bookstore #{index}: customers browse books and e-books, keep a cart, "
+        "place orders and pay by card."
+    )
+
+def requirement(index: int) -> str:
+    return f"The system shall export report {index} as a PDF file within {index % 9 + 1} seconds of the request."
+
+def build_operations(args, replay) -> Dict[str, Callable[[int], Awaitable[bool]]]:
+    import httpx
+    import app as app_module
+    from langgraph_workflow import get_workflow
+    from uml_generator import UMLDiagramGenerator
+    from uml_models import UMLDiagram
+    from validator_registry import validator_registry
+
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app_module.app), base_url="http://benchmark", timeout=None
+    )
+    diagram = UMLDiagram.model_validate_json(replay.recordings["uml"]["arguments"])
+    generator = UMLDiagramGenerator()
+
+    async def post(path: str, payload: dict) -> Optional[dict]:
+        response = await client.post(path, json=payload)
+        return response.json() if response.status_code == 200 else None
+
+    async def generate(index: int) -> bool:
+        body = await post("/generate-uml", {
+            "scenario": scenario(index), "model": args.model, "structured": args.structured
+        })
+        # Failed generations still answer 200, with an error diagram
+        return bool(body) and not body.get("error") and '"title":"Error ' not in (body.get("uml_diagram") or "")
+
+    async def refine(index: int) -> bool:
+        body = await post("/generate-uml/refine", {
+            "uml_diagram": diagram.model_dump(), "instruction": f"Add reviews, variant {index}",
+            "model": args.model, "structured": args.structured
+        })
+        return bool(body) and not body.get("error")
+
+    async def evaluate(index: int) -> bool:
+        body = await post("/evaluate-requirement", {
+            "requirement": requirement(index), "model": args.model,
+            "structured": args.structured, "deep_review": True
+        })
+        return bool(body) and "Failed to get LLM response" not in body["reason"]
+
+    async def workflow(index: int) -> bool:
+        result = await get_workflow().ainvoke({
+            "scenario": scenario(index), "uml_diagram": None, "dot_source": "", "error": "",
+            "uml_type": "class", "model": args.model, "structured": args.structured, "partitioned": None
+        })
+        uml_diagram = result.get("uml_diagram")
+        return not result.get("error") and uml_diagram is not None and not uml_diagram.title.startswith("Error ")
+
+    async def validate(index: int) -> bool:
+        validator = await asyncio.to_thread(validator_registry.get, args.model, args.structured)
+        result = await validator.avalidate_requirement(requirement(index), deep_review=True)
+        return result.error is None
+
+    async def render(index: int) -> bool:
+        return bool(await asyncio.to_thread(generator.generate_diagram, diagram))
+
+    return {
+        "app:/generate-uml": generate,
+        "app:/generate-uml/refine": refine,
+        "app:/evaluate-requirement": evaluate,
+        "workflow": workflow,
+        "validator": validate,
+        "diagram": render,
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: List[dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(row["target"], row["concurrency"]): row for row in json.load(f)["results"]}
+    print(f"\nAgainst {baseline_path}:")
+    print(f"{'target':<28}{'conc':>6}{'p95 ms':>10}{'was':>10}{'change':>9}{'rps':>9}{'was':>9}{'change':>9}")
+    for row in results:
+        old = baseline.get((row["target"], row["concurrency"]))
+        if old is None:
+            continue
+        p95_change = (row["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+        rps_change = (row["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0
+        print(
+            f"{row['target']:<28}{row['concurrency']:>6}{row['p95_ms']:>10.1f}{old['p95_ms']:>10.1f}{p95_change:>+8.1f}%"
+            f"{row['rps']:>9.1f}{old['rps']:>9.1f}{rps_change:>+8.1f}%"
+        )
+
+async def run(args) -> List[dict]:
+    import groq_replay
+    replay = groq_replay.install(groq_replay.ReplayCompletions(
+        args.recordings, args.latency_ms / 1e3, args.tokens_per_second, args.jitter, args.seed, args.server_rpm
+    ))
+    operations = build_operations(args, replay)
+
+    results = []
+    offset = 0
+    print(f"LLM scheduler {args.scheduler}, stub limit {args.server_rpm or 'none'} rpm")
+    print(
+        f"{'target':<28}{'conc':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}{'goodput':>9}"
+        f"{'errors':>8}{'peak MiB':>10}{'llm':>6}{'429s':>6}"
+    )
+    for target in args.targets:
+        operation = operations[target]
+        # Untimed first call: deferred imports, workflow compilation and validator warmup
+        await operation(offset)
+        offset += 1
+        for concurrency in args.concurrency:
+            calls_before = replay.calls
+            rate_limited_before = replay.rate_limited
+            stages_before = stage_totals()
+            with PeakRSS() as rss:
+                latencies, errors, wall = await run_level(operation, args.requests, concurrency, offset)
+            offset += args.requests
+            latencies.sort()
+            row = {
+                "target": target,
+                "concurrency": concurrency,
+                "requests": args.requests,
+                "errors": errors,
+                "p50_ms": percentile(latencies, 50) * 1e3,
+                "p95_ms": percentile(latencies, 95) * 1e3,
+                "p99_ms": percentile(latencies, 99) * 1e3,
+                "mean_ms": sum(latencies) / len(latencies) * 1e3,
+                "rps": len(latencies) / wall,
+                "goodput_rps": (len(latencies) - errors) / wall,
+                "peak_rss_mib": rss.peak / 2**20,
+                "llm_calls": replay.calls - calls_before,
+                "llm_rate_limited": replay.rate_limited - rate_limited_before,
+                "stage_mean_ms": stage_means_ms(stages_before, stage_totals()),
+                "scheduler": args.scheduler,
+            }
+            results.append(row)
+            print(
+                f"{target:<28}{concurrency:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+                f"{row['rps']:>9.1f}{row['goodput_rps']:>9.1f}{errors:>8}{row['peak_rss_mib']:>10.1f}"
+                f"{row['llm_calls']:>6}{row['llm_rate_limited']:>6}"
+            )
+    return results
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS, help="What to drive")
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Requests in flight")
+    arg_parser.add_argument("--requests", type=int, default=64, help="Requests per target and concurrency level")
+    arg_parser.add_argument("--model", default="llama3-8b-8192", help="Model named in every request")
+    arg_parser.add_argument("--structured", action="store_true", help="Use structured (tool-call) output")
+    arg_parser.add_argument("--caches", action="store_true", help="Keep the UML, validation and embedding caches on")
+    arg_parser.add_argument("--recordings", default="recorded_completions.json", help="Recorded completions to replay")
+    arg_parser.add_argument("--latency-ms", type=float, default=250, help="Simulated time to first token")
+    arg_parser.add_argument("--tokens-per-second", type=float, default=800, help="Simulated generation speed")
+    arg_parser.add_argument("--jitter", type=float, default=0.2, help="Relative standard deviation of the delay")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Jitter seed")
+    arg_parser.add_argument("--server-rpm", type=float, default=0, help="Per-model requests per minute the stub accepts (0 = unlimited)")
+    arg_parser.add_argument(
+        "--scheduler", choices=["on", "off"],
+        help="Client-side LLM request scheduler (default: on only when --server-rpm is set)"
+    )
+    arg_parser.add_argument("--output", default="benchmark_offline.json", help="Where to write the JSON results")
+    arg_parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = arg_parser.parse_args()
+
+    configure_environment(args)
+    started = datetime.now(timezone.utc)
+    results = asyncio.run(run(args))
+    report = {
+        "commit": git_commit(),
+        "started_at": started.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Compare the token-budgeted INCOSE evaluation prompt with the original one.
+
+For each requirement query, retrieves chunks with BM25 (no embedding model
+needed) and builds both prompts: the original template with the chunks joined
+and cut at 2000 characters, and the current one with the deduplicated relevant
+sentences packed into the model's token budget. Reports estimated input tokens
+per model, how much of each query's vocabulary the context keeps, and the
+builder's own cost. With --live and GROQ_API_KEY set, both prompts are also sent
+to the first model and the mean response latency is compared.
+
+    python benchmark_prompts.py [--k 5] [--live 0]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmark_retrieval import QUERIES, term_coverage
+from bm25_index import BM25Index, index_path
+from config import AVAILABLE_MODELS, BM25_INDEX_PATH, GROQ_API_KEY, INCOSE_CHUNKS_PATH, INCOSE_PERSIST_DIR
+from groq_client import GroqUMLClient
+from incose_validator import INCOSEValidator, IncoseStore
+from prompt_builder import compress_context, count_tokens, max_output_tokens
+
+LEGACY_CONTEXT_CHARS = 2000
+LEGACY_MAX_TOKENS = 2000
+
+def legacy_prompt(requirement_text: str, context: str) -> str:
+    """The evaluation prompt as it was before token budgeting"""
+    escaped_requirement = requirement_text.replace('"', '\\"').replace("'", "\\'")
+    return f"""You are a systems engineering expert familiar with INCOSE standards.
+
+Context (INCOSE Standards):
+{context}
+
+Requirement to Evaluate:
+{escaped_requirement}
+
+Task: Evaluate this requirement against INCOSE standards using the following criteria:
+
+1. VALIDITY: Is the requirement valid according to INCOSE standards?
+2. CLARITY: Is the requirement clear and unambiguous?
+3. COMPLETENESS: Is the requirement complete and specific?
+4. FEASIBILITY: Is the requirement technically feasible and practical?
+5. VERIFIABILITY: Can the requirement be verified and tested?
+6. TRACEABILITY: Is the requirement traceable and consistent with system context?
+
+CRITICAL: You must respond with ONLY a valid JSON object. DO NOT include quotes within text values that would break JSON parsing.
+
+JSON format (use exactly this structure):
+{{
+    "is_valid": true,
+    "score": 85,
+    "issues": ["Issue one", "Issue two"],
+    "suggestions": ["Suggestion one", "Suggestion two"],
+    "detailed_reasoning": "Brief explanation without quotes",
+    "analysis": {{
+        "validity": "Valid/Invalid - reason",
+        "clarity": "Clear/Unclear - reason",
+        "completeness": "Complete/Incomplete - reason",
+        "feasibility": "Feasible/Infeasible - reason",
+        "verifiability": "Verifiable/Unverifiable - reason",
+        "traceability": "Traceable/Untraceable - reason"
+    }}
+}}
+
+Rules:
+- Use only double quotes for JSON strings
+- Do not use single quotes or apostrophes in text values
+- Keep text values under 100 characters
+- Ensure the JSON is valid and parseable
+- Address all 6 criteria in the analysis section"""
+
+def time_llm(client: GroqUMLClient, prompts, max_tokens: int) -> float:
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        client._make_request(prompt, max_tokens=max_tokens)
+        latencies.append(time.perf_counter() - start)
+    return statistics.mean(latencies)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per query")
+    arg_parser.add_argument("--live", type=int, default=0, help="Queries sent to Groq per prompt style (0 = offline)")
+    args = arg_parser.parse_args()
+
+    bm25 = BM25Index.load_or_build(INCOSE_CHUNKS_PATH, index_path(INCOSE_PERSIST_DIR, BM25_INDEX_PATH))
+    retrieved = [bm25.search(query, k=args.k) for query in QUERIES]
+    legacy_contexts = ["\n\n".join(chunks)[:LEGACY_CONTEXT_CHARS] for chunks in retrieved]
+    legacy_prompts = [legacy_prompt(query, context) for query, context in zip(QUERIES, legacy_contexts)]
+    print(f"{len(QUERIES)} queries, {args.k} BM25 chunks each")
+
+    print(f"{'model':<22}{'legacy in':>10}{'budgeted in':>12}{'saved':>8}{'max out':>9}{'build ms':>10}")
+    validators = {}
+    for model in AVAILABLE_MODELS:
+        validator = INCOSEValidator(GroqUMLClient(model), store=IncoseStore(bm25=bm25))
+        validators[model] = validator
+        start = time.perf_counter()
+        prompts = [
+            validator._build_evaluation_prompt(query, validator._format_context(query, chunks))
+            for query, chunks in zip(QUERIES, retrieved)
+        ]
+        build_ms = (time.perf_counter() - start) / len(QUERIES) * 1e3
+        legacy_tokens = statistics.mean(count_tokens(prompt, model) for prompt in legacy_prompts)
+        budgeted_tokens = statistics.mean(count_tokens(prompt, model) for prompt in prompts)
+        print(
+            f"{model:<22}{legacy_tokens:>10.0f}{budgeted_tokens:>12.0f}{1 - budgeted_tokens / legacy_tokens:>8.0%}"
+            f"{max_output_tokens(model):>9}{build_ms:>10.2f}"
+        )
+
+    model = next(iter(AVAILABLE_MODELS))
+    compressed = [compress_context(query, chunks, model) for query, chunks in zip(QUERIES, retrieved)]
+    print(f"{'context':<22}{'chars':>10}{'term coverage':>15}")
+    for name, contexts in [("legacy @ 2000 chars", legacy_contexts), ("budgeted", compressed)]:
+        chars = statistics.mean(len(context) for context in contexts)
+        coverage = statistics.mean(term_coverage(query, context) for query, context in zip(QUERIES, contexts))
+        print(f"{name:<22}{chars:>10.0f}{coverage:>15.1%}")
+
+    if args.live:
+        if not GROQ_API_KEY:
+            raise SystemExit("--live needs GROQ_API_KEY")
+        validator = validators[model]
+        queries = list(zip(QUERIES, retrieved))[:args.live]
+        legacy_s = time_llm(validator.groq_client, legacy_prompts[:args.live], LEGACY_MAX_TOKENS)
+        budgeted_s = time_llm(
+            validator.groq_client,
+            [validator._build_evaluation_prompt(query, validator._format_context(query, chunks)) for query, chunks in queries],
+            max_output_tokens(model)
+        )
+        print(f"{model} latency: legacy {legacy_s:.2f} s, budgeted {budgeted_s:.2f} s ({1 - budgeted_s / legacy_s:.0%} faster)")
+
+if __name__ == "__main__":
+    main()
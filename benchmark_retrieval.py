@@ -0,0 +1,138 @@
+"""
+Benchmark the numpy retrieval index against the Chroma path it can replace.
+
+Embeds a set of requirement queries once, then times top-k and MMR retrieval on
+both backends (per query, and batched for numpy). Recall@k is measured against
+exact cosine top-k, and MMR agreement is the share of Chroma's MMR chunks that
+the numpy MMR also selects. Finally, hybrid BM25 + vector retrieval is compared
+with vector-only MMR by how many of each query's terms the trimmed context
+contains, cut at the old 2000-character budget and compressed into the default
+model's token budget by prompt_builder.
+
+    python benchmark_retrieval.py [--repeat 20] [--k 5]
+"""
+
+import argparse
+import time
+
+from bm25_index import BM25Index, index_path, reciprocal_rank_fusion, tokenize
+from config import (
+    INCOSE_PERSIST_DIR, NUMPY_INDEX_DIR, INCOSE_CHUNKS_PATH, BM25_INDEX_PATH, RRF_K, GROQ_MODEL
+)
+from incose_validator import IncoseStore
+from numpy_index import NumpyVectorIndex
+from prompt_builder import compress_context
+
+QUERIES = [
+    "The system shall respond to user login requests within 2 seconds.",
+    "The software should be user friendly.",
+    "The aircraft shall maintain cabin pressure equivalent to 8000 ft altitude.",
+    "The system shall log all failed authentication attempts with a timestamp.",
+    "The pump shall deliver 50 liters per minute at 3 bar.",
+    "The operator shall be able to stop the conveyor from any workstation.",
+    "The system shall be maintainable.",
+    "The database shall support 10,000 concurrent transactions.",
+    "The vehicle shall achieve a range of at least 400 km on a full charge.",
+    "All requirements shall be traceable to a stakeholder need.",
+    "The display shall be readable in direct sunlight.",
+    "The system shall encrypt data at rest using AES-256.",
+    "The controller shall recover from a power loss without data corruption.",
+    "The interface shall comply with the ICD revision C.",
+    "The satellite shall have a design life of 15 years.",
+    "The application shall be fast and reliable and secure.",
+    "The system shall process orders and/or refunds within TBD seconds.",
+    "The pump shall operate at approximately 3 bar as appropriate.",
+]
+
+def term_coverage(query: str, context: str) -> float:
+    """Share of the query's distinct terms that appear in the context"""
+    terms = set(tokenize(query))
+    return len(terms & set(tokenize(context))) / len(terms) if terms else 1.0
+
+def time_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--repeat", type=int, default=20, help="Timed passes over the query set")
+    arg_parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per query")
+    args = arg_parser.parse_args()
+
+    store = IncoseStore.load(INCOSE_PERSIST_DIR, backend="chroma")
+    if store.vectorstore is None:
+        raise SystemExit("Chroma store could not be loaded")
+    vectorstore = store.vectorstore
+    index = (
+        NumpyVectorIndex.load(NUMPY_INDEX_DIR) if NumpyVectorIndex.exists(NUMPY_INDEX_DIR)
+        else NumpyVectorIndex.from_chroma(vectorstore, NUMPY_INDEX_DIR)
+    )
+    embeddings = store.embedding_model.embed_documents(QUERIES)
+    k = args.k
+    print(f"{len(index)} chunks, {len(QUERIES)} queries, k={k}")
+
+    # Recall of each backend's top-k against exact cosine top-k
+    exact = [[index.documents[row] for row, _ in hits] for hits in index.search(embeddings, k)]
+    chroma_top = [
+        [doc.page_content for doc in vectorstore.similarity_search_by_vector(embedding, k=k)]
+        for embedding in embeddings
+    ]
+    chroma_recall = sum(len(set(c) & set(e)) for c, e in zip(chroma_top, exact)) / (k * len(QUERIES))
+
+    chroma_mmr = [
+        [doc.page_content for doc in vectorstore.max_marginal_relevance_search_by_vector(embedding, k=k)]
+        for embedding in embeddings
+    ]
+    numpy_mmr = index.mmr_search(embeddings, k=k)
+    mmr_agreement = sum(len(set(c) & set(n)) for c, n in zip(chroma_mmr, numpy_mmr)) / (k * len(QUERIES))
+
+    def per_query(fn):
+        return lambda: [fn(embedding) for embedding in embeddings]
+
+    timings = {
+        "chroma top-k": time_call(per_query(lambda e: vectorstore.similarity_search_by_vector(e, k=k)), args.repeat),
+        "chroma mmr": time_call(per_query(lambda e: vectorstore.max_marginal_relevance_search_by_vector(e, k=k)), args.repeat),
+        "numpy top-k": time_call(per_query(lambda e: index.search([e], k)), args.repeat),
+        "numpy mmr": time_call(per_query(lambda e: index.mmr_search([e], k=k)), args.repeat),
+        "numpy mmr batched": time_call(lambda: index.mmr_search(embeddings, k=k), args.repeat),
+    }
+
+    print(f"{'path':<20}{'ms/query':>10}")
+    for name, total_ms in timings.items():
+        print(f"{name:<20}{total_ms / len(QUERIES):>10.3f}")
+    print(f"chroma top-{k} recall vs exact: {chroma_recall:.1%} (numpy is exact: 100.0%)")
+    print(f"mmr agreement chroma vs numpy: {mmr_agreement:.1%}")
+
+    start = time.perf_counter()
+    bm25 = BM25Index.load_or_build(INCOSE_CHUNKS_PATH, index_path(INCOSE_PERSIST_DIR, BM25_INDEX_PATH))
+    print(f"bm25 index ready in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    hybrid = [
+        reciprocal_rank_fusion([vector_chunks, bm25.search(query, k=k)], k=RRF_K)[:k]
+        for query, vector_chunks in zip(QUERIES, numpy_mmr)
+    ]
+    hybrid_ms = time_call(
+        lambda: [bm25.search(query, k=k) for query in QUERIES], args.repeat
+    ) / len(QUERIES)
+    print(f"bm25 search: {hybrid_ms:.3f} ms/query")
+    print(f"{'context':<28}{'term coverage':>14}")
+    def cut(query, chunks):
+        return "\n\n".join(chunks)[:2000]
+
+    def budgeted(query, chunks):
+        return compress_context(query, chunks, GROQ_MODEL)
+
+    for name, rankings, build in [
+        ("vector mmr @ 2000", numpy_mmr, cut),
+        ("vector mmr budgeted", numpy_mmr, budgeted),
+        ("hybrid rrf @ 2000", hybrid, cut),
+        ("hybrid rrf budgeted", hybrid, budgeted),
+    ]:
+        coverage = sum(
+            term_coverage(query, build(query, chunks)) for query, chunks in zip(QUERIES, rankings)
+        ) / len(QUERIES)
+        print(f"{name:<28}{coverage:>14.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Precomputed BM25 index over the INCOSE chunks, for hybrid lexical + vector retrieval.
+
+Requirement defects often hinge on exact rule vocabulary ("shall", "TBD",
+"and/or", units, vague adjectives) that dense embeddings blur. The index stores
+each term's postings with their final BM25 weights in CSR arrays, so a query is
+a handful of slice additions, and the serialized .npz loads in milliseconds.
+The index records a hash of the chunks file and is rebuilt when it goes stale.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+BM25_INDEX_FILE = "incose_bm25.npz"
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[/\-][a-z0-9]+)*")
+# Deliberately keeps "shall", "and", "or", "not": they carry meaning in requirement rules
+_STOPWORDS = frozenset(
+    "a an the of to in on at by for from with as is are was were be been it its this that these "
+    "those which who whom into than then there their they them we our you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def index_path(persist_dir: str, configured: str = "") -> str:
+    """Where the index is stored: the configured path, else beside the vectors in persist_dir"""
+    return configured or os.path.join(persist_dir, BM25_INDEX_FILE)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """
+    Merge ranked lists of chunks by reciprocal rank: score = sum of 1 / (k + rank)
+
+    Chunks found by several retrievers rise to the top; ties keep first-seen order.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda chunk: scores[chunk], reverse=True)
+
+class BM25Index:
+    def __init__(self, documents: List[str], terms: List[str], indptr: np.ndarray,
+                 doc_ids: np.ndarray, weights: np.ndarray, source_hash: str = ""):
+        """
+        Args:
+            documents (List[str]): Indexed chunk texts
+            terms (List[str]): Vocabulary; term i's postings are doc_ids/weights[indptr[i]:indptr[i + 1]]
+            indptr (np.ndarray): CSR row pointers into doc_ids and weights
+            doc_ids (np.ndarray): Document of each posting
+            weights (np.ndarray): Precomputed BM25 weight of each posting
+            source_hash (str): Hash of the chunks file the index was built from
+        """
+        self.documents = documents
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.source_hash = source_hash
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, documents: List[str], k1: float = 1.5, b: float = 0.75, source_hash: str = "") -> "BM25Index":
+        term_counts = [Counter(tokenize(document)) for document in documents]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(documents) else 0.0
+
+        postings = defaultdict(list)
+        for doc_id, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                postings[term].append((doc_id, count))
+
+        terms = sorted(postings)
+        document_frequency = np.array([len(postings[term]) for term in terms], dtype=np.int64)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=indptr[1:])
+        flat = np.array([posting for term in terms for posting in postings[term]], dtype=np.int64).reshape(-1, 2)
+        doc_ids = flat[:, 0].astype(np.int32)
+        counts = flat[:, 1].astype(np.float32)
+
+        total = len(documents)
+        idf = np.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = k1 * (1 - b + b * lengths[doc_ids] / average_length)
+        weights = np.repeat(idf, document_frequency) * counts * (k1 + 1) / (counts + norm)
+        return cls(documents, terms, indptr, doc_ids, weights.astype(np.float32), source_hash)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.terms, key=self.terms.get)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=np.array(terms, dtype=str),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            source_hash=np.array(self.source_hash)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, documents: List[str]) -> "BM25Index":
+        with np.load(path) as data:
+            return cls(
+                documents, data["terms"].tolist(), data["indptr"],
+                data["doc_ids"], data["weights"], str(data["source_hash"])
+            )
+
+    @classmethod
+    def load_or_build(cls, chunks_path: str, index_path: str) -> "BM25Index":
+        """Load the serialized index, rebuilding and saving it if missing or built from other chunks"""
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            documents = json.load(f)
+        source_hash = file_hash(chunks_path)
+        if os.path.exists(index_path):
+            index = cls.load(index_path, documents)
+            if index.source_hash == source_hash:
+                return index
+        index = cls.build(documents, source_hash=source_hash)
+        try:
+            index.save(index_path)
+        except OSError as e:
+            # The built index is still usable; it is just rebuilt again next time
+            print(f"⚠️  Could not save BM25 index to {index_path}, keeping it in memory: {e}")
+            return index
+        print(f"📚 Built BM25 index over {len(documents)} chunks at {index_path}")
+        return index
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            i = self.terms.get(term)
+            if i is not None:
+                start, end = self.indptr[i], self.indptr[i + 1]
+                # Each document appears once per term, so fancy-index addition is safe here
+                scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[str]:
+        """Top-k chunks by BM25 score, best first; chunks sharing no term with the query are left out"""
+        scores = self.scores(query)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.documents[i] for i in top]
@@ -10,26 +10,156 @@ AVAILABLE_MODELS = {
     "llama3-8b-8192": {
         "name": "LLAMA3 8B",
         "description": "Fast and efficient 8B parameter model",
-        "provider": "groq"
+        "provider": "groq",
+        "context_window": 8192,
+        "chars_per_token": 6.0,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 30000
     },
     "llama3-70b-8192": {
         "name": "LLAMA3 70B",
         "description": "More powerful 70B parameter model",
-        "provider": "groq"
+        "provider": "groq",
+        "context_window": 8192,
+        "chars_per_token": 6.0,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 6000
     },
     "mistral-8x7b-32768": {
         "name": "Mistral 8x7B",
         "description": "Mixture of experts model with 32k context",
-        "provider": "groq"
+        "provider": "groq",
+        "context_window": 32768,
+        "chars_per_token": 4.0,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 5000
     },
     "gemma-7b-it": {
         "name": "Gemma 7B",
         "description": "Google's Gemma 7B instruction-tuned model",
-        "provider": "groq"
+        "provider": "groq",
+        "context_window": 8192,
+        "chars_per_token": 6.0,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 15000
     },
     "gemma2-9b-it": {
         "name": "Gemma 2 9B",
         "description": "Latest Gemma 2 9B instruction-tuned model",
-        "provider": "groq"
+        "provider": "groq",
+        "context_window": 8192,
+        "chars_per_token": 6.0,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 15000
     }
-}
\ No newline at end of file
+}
+
+# INCOSE vector store and embedding model shared by every validator
+INCOSE_PERSIST_DIR = os.getenv("INCOSE_PERSIST_DIR", "chroma_db_incose")
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Encoder backend: "torch", or "onnx" / "onnx-int8" for the ONNX Runtime export in ONNX_MODEL_DIR
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_encoder")
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+# Hybrid retrieval: BM25 over the raw chunks, fused with the vector results by reciprocal rank
+INCOSE_CHUNKS_PATH = os.getenv("INCOSE_CHUNKS_PATH", "chunked_incose.json")
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+# Serialized BM25 index; empty stores it inside INCOSE_PERSIST_DIR (see bm25_index.index_path)
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "")
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Token budgets of the INCOSE evaluation prompt: relevant rule sentences packed into the
+# context, and the response length; counted per model with chars_per_token above
+VALIDATOR_CONTEXT_TOKENS = int(os.getenv("VALIDATOR_CONTEXT_TOKENS", "300"))
+VALIDATOR_MAX_OUTPUT_TOKENS = int(os.getenv("VALIDATOR_MAX_OUTPUT_TOKENS", "800"))
+
+# Deterministic INCOSE writing-rule pre-screen: requirements scoring below the threshold are
+# rejected without an LLM call unless a deep review is requested
+RULE_SCREEN_ENABLED = os.getenv("RULE_SCREEN_ENABLED", "true").lower() == "true"
+RULE_SCREEN_INVALID_BELOW = float(os.getenv("RULE_SCREEN_INVALID_BELOW", "60"))
+
+# Retrieval backend for the validator: "chroma", or "numpy" for the in-process exact index
+# memory-mapped from NUMPY_INDEX_DIR (exported from the Chroma store on first use)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+NUMPY_INDEX_DIR = os.getenv("NUMPY_INDEX_DIR", "incose_index")
+# Chunks per embedding call and concurrent embedding calls used by setup_vectorstore.py
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+VALIDATOR_WARMUP_ON_STARTUP = os.getenv("VALIDATOR_WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Pooled keep-alive HTTP connections to Groq, shared by every GroqUMLClient in a process
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "20"))
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "60"))
+
+# Response cache in front of GroqUMLClient.generate_uml
+UML_CACHE_ENABLED = os.getenv("UML_CACHE_ENABLED", "true").lower() == "true"
+UML_CACHE_MAX_ENTRIES = int(os.getenv("UML_CACHE_MAX_ENTRIES", "512"))
+UML_CACHE_TTL_SECONDS = float(os.getenv("UML_CACHE_TTL_SECONDS", "86400"))
+UML_CACHE_SQLITE_PATH = os.getenv("UML_CACHE_SQLITE_PATH") or None
+UML_CACHE_SQLITE_MAX_ENTRIES = int(os.getenv("UML_CACHE_SQLITE_MAX_ENTRIES", "10000"))
+
+# Near-duplicate cache of INCOSE validation results, one per model
+VALIDATION_CACHE_ENABLED = os.getenv("VALIDATION_CACHE_ENABLED", "true").lower() == "true"
+VALIDATION_CACHE_THRESHOLD = float(os.getenv("VALIDATION_CACHE_THRESHOLD", "0.97"))
+VALIDATION_CACHE_MAX_ENTRIES = int(os.getenv("VALIDATION_CACHE_MAX_ENTRIES", "2048"))
+
+# Batch requirement validation fan-out
+BATCH_MAX_REQUIREMENTS = int(os.getenv("BATCH_MAX_REQUIREMENTS", "5000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_REQUESTS_PER_MINUTE = float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "30"))  # 0 disables pacing
+
+# Ask models for schema-constrained output (tool calls validated with pydantic) instead of
+# free text that is parsed and repaired afterwards. Requests can override this per call.
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "false").lower() == "true"
+
+# Completion limit for /generate-uml/refine, which returns only the changes to a diagram
+REFINE_MAX_TOKENS = int(os.getenv("REFINE_MAX_TOKENS", "1000"))
+
+# Server-side Graphviz rendering for /render: concurrent dot processes, per-render timeout,
+# and the on-disk artifact cache keyed by a hash of the DOT source
+GRAPHVIZ_DOT = os.getenv("GRAPHVIZ_DOT", "dot")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "30"))
+RENDER_MAX_DOT_BYTES = int(os.getenv("RENDER_MAX_DOT_BYTES", str(1024 * 1024)))
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "render_cache")
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Partitioned generation for large scenarios: an outline call splits the system into subsystems,
+# whose classes are generated concurrently and merged into one diagram
+PARTITIONED_GENERATION = os.getenv("PARTITIONED_GENERATION", "false").lower() == "true"
+PARTITION_MAX_SUBSYSTEMS = int(os.getenv("PARTITION_MAX_SUBSYSTEMS", "8"))
+PARTITION_MAX_CONCURRENCY = int(os.getenv("PARTITION_MAX_CONCURRENCY", "4"))
+
+# Per-stage latency histograms and LLM token counters served on GET /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Client-side scheduling of Groq calls. Each model gets request and token budgets (seeded from
+# AVAILABLE_MODELS, then tracked from x-ratelimit-* response headers). 429, 5xx and connection
+# errors are retried with jittered exponential backoff. A call goes to the next model in
+# LLM_FALLBACK_MODELS when the requested one would make it wait longer than LLM_FALLBACK_AFTER_SECONDS.
+# Fallback is off unless models are listed: it answers a request for a large model with a smaller
+# one (reported in the response's "model" field), trading output quality for latency.
+LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+LLM_MAX_QUEUE_SECONDS = float(os.getenv("LLM_MAX_QUEUE_SECONDS", "30"))  # Longest admission wait before giving up
+LLM_FALLBACK_AFTER_SECONDS = float(os.getenv("LLM_FALLBACK_AFTER_SECONDS", "2"))
+LLM_FALLBACK_MODELS = [
+    model.strip() for model in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if model.strip()
+]
+
+# Concurrent identical /generate-uml and /evaluate-requirement requests share one pipeline run
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Background job queue (/jobs) for batches and diagrams that outlast proxy timeouts. Jobs and their
+# results live in SQLite, so they survive restarts; a job whose worker stops heartbeating for
+# JOB_LEASE_SECONDS is requeued, up to JOB_MAX_ATTEMPTS runs. Finished results expire after the TTL.
+# Off by default: enabling it creates JOBS_SQLITE_PATH and has each process poll it for work.
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "false").lower() == "true"
+JOBS_SQLITE_PATH = os.getenv("JOBS_SQLITE_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))  # 0 keeps results forever
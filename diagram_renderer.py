@@ -0,0 +1,245 @@
+"""
+Server-side Graphviz rendering with a content-addressed artifact cache.
+
+DOT sources are rendered to SVG or PNG by `dot` subprocesses, at most
+RENDER_WORKERS at a time, and each render is killed after RENDER_TIMEOUT_SECONDS.
+Artifacts are stored on disk under the SHA-256 of the format and source, which
+is also their ETag, and the least recently used ones are evicted once the cache
+grows past RENDER_CACHE_MAX_BYTES. Concurrent requests for the same artifact
+share one render, and repeated views are served from disk without running dot.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import (
+    GRAPHVIZ_DOT, RENDER_WORKERS, RENDER_TIMEOUT_SECONDS, RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES
+)
+
+RENDER_FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+
+class RenderError(Exception):
+    """dot rejected the DOT source"""
+
+class RenderTimeout(RenderError):
+    """dot did not finish within the per-render timeout"""
+
+class RenderUnavailable(RenderError):
+    """The Graphviz dot executable is not installed"""
+
+class DiagramRenderer:
+    def __init__(
+        self,
+        cache_dir: str = RENDER_CACHE_DIR,
+        max_bytes: int = RENDER_CACHE_MAX_BYTES,
+        workers: int = RENDER_WORKERS,
+        timeout_seconds: float = RENDER_TIMEOUT_SECONDS,
+        dot_binary: str = GRAPHVIZ_DOT
+    ):
+        """
+        Args:
+            cache_dir (str): Directory holding rendered artifacts, named <key>.<format>
+            max_bytes (int): Total artifact size kept before the least recently used are evicted
+            workers (int): dot processes allowed to run at once; further renders wait for a slot
+            timeout_seconds (float): Time a single dot process may run before it is killed
+            dot_binary (str): Graphviz dot executable
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.timeout_seconds = timeout_seconds
+        self.dot_binary = dot_binary
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.renders = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(dot_source: str, fmt: str) -> str:
+        return hashlib.sha256(f"{fmt}\x1f{dot_source}".encode("utf-8")).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _scan(self):
+        """Rebuild the LRU order from the artifacts a previous process left, oldest access first"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = self._path(name)
+            if name.endswith(".tmp"):
+                os.remove(path)  # Interrupted write
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name, stat.st_size))
+        with self._lock:
+            for _, name, size in sorted(files):
+                self._entries[name] = size
+                self._total_bytes += size
+            self._evict_locked()
+
+    def has(self, key: str, fmt: str) -> bool:
+        """Whether an artifact is cached, without reading it or counting a hit"""
+        with self._lock:
+            return f"{key}.{fmt}" in self._entries
+
+    def get(self, key: str, fmt: str) -> Optional[bytes]:
+        """Cached artifact for a key, or None; a hit refreshes its place in the eviction order"""
+        name = f"{key}.{fmt}"
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        path = self._path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Keeps recency across restarts
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+        return data
+
+    def _store(self, name: str, data: bytes):
+        path = self._path(name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        # The newest artifact is always kept, even when it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    async def render(self, dot_source: str, fmt: str = "svg") -> Tuple[str, bytes]:
+        """
+        Render DOT source, or return the cached artifact
+
+        Args:
+            dot_source (str): Graphviz DOT source
+            fmt (str): Output format from RENDER_FORMATS
+
+        Returns:
+            Tuple[str, bytes]: Artifact key (usable as ETag) and the rendered bytes
+
+        Raises:
+            RenderError: dot rejected the source; RenderTimeout and RenderUnavailable are subclasses
+        """
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"Unsupported render format: {fmt}")
+        key = self.make_key(dot_source, fmt)
+        # The read and the access-time update stay off the event loop; misses skip the thread hop
+        data = await asyncio.to_thread(self.get, key, fmt) if self.has(key, fmt) else None
+        if data is not None:
+            return key, data
+
+        name = f"{key}.{fmt}"
+        pending = self._inflight.get(name)
+        if pending is None:
+            self.misses += 1
+            pending = asyncio.ensure_future(self._render_and_store(name, dot_source, fmt))
+            self._inflight[name] = pending
+            pending.add_done_callback(lambda future: self._finish(name, future))
+        else:
+            self.coalesced += 1
+        # Shielded so a client disconnecting does not cancel a render others are waiting for
+        return key, await asyncio.shield(pending)
+
+    def _finish(self, name: str, future: asyncio.Future):
+        self._inflight.pop(name, None)
+        if not future.cancelled():
+            future.exception()  # Retrieved here in case every waiter has gone away
+
+    async def _render_and_store(self, name: str, dot_source: str, fmt: str) -> bytes:
+        data = await self._run_dot(dot_source, fmt)
+        await asyncio.to_thread(self._store, name, data)
+        return data
+
+    async def _run_dot(self, dot_source: str, fmt: str) -> bytes:
+        async with self._slots:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.dot_binary, f"-T{fmt}",
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except FileNotFoundError as e:
+                self.failures += 1
+                raise RenderUnavailable(f"Graphviz executable not found: {self.dot_binary}") from e
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(dot_source.encode("utf-8")), self.timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise RenderTimeout(f"Rendering did not finish within {self.timeout_seconds:g}s")
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+        if process.returncode != 0:
+            self.failures += 1
+            message = stderr.decode("utf-8", errors="replace").strip()
+            raise RenderError(message or f"dot exited with status {process.returncode}")
+        self.renders += 1
+        return stdout
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "renders": self.renders,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+_default_renderer = None
+_default_renderer_lock = threading.Lock()
+
+def get_renderer() -> DiagramRenderer:
+    """
+    Return the process-wide renderer configured in config.py
+
+    The first call creates the cache directory and scans it, so the app makes
+    it from a worker thread at startup rather than inside a request.
+    """
+    global _default_renderer
+    if _default_renderer is None:
+        with _default_renderer_lock:
+            if _default_renderer is None:
+                _default_renderer = DiagramRenderer()
+    return _default_renderer
@@ -0,0 +1,107 @@
+"""
+Stateless DOT writer for UMLDiagram models.
+
+Writes the same DOT that graphviz.Digraph produced for the class diagram
+(HTML-table nodes, styled edges) straight into a text buffer, without building
+a Digraph or running every statement through its quoting. Free text from the
+model is escaped for HTML labels, so members such as "items: List<Item>" no
+longer break the label. There is no shared state, so one writer can serve any
+number of threads.
+"""
+
+import io
+import re
+from typing import TextIO
+
+from uml_models import UMLClass, UMLDiagram, UMLRelationship
+
+ARROW_STYLES = {
+    'inheritance': 'empty',
+    'association': 'open',
+    'composition': 'diamond',
+    'aggregation': 'odiamond'
+}
+
+# Identifiers DOT accepts unquoted, as graphviz.Digraph decides it
+_PLAIN_ID = re.compile(r"(?:[a-zA-Z_\u0080-\uffff][a-zA-Z0-9_\u0080-\uffff]*|-?(?:\.\d+|\d+(?:\.\d*)?))\Z")
+_KEYWORDS = frozenset({"node", "edge", "graph", "digraph", "subgraph", "strict"})
+_HTML_SPECIAL = re.compile(r'[&<>"]')
+
+_TABLE_OPEN = "<<TABLE BORDER='0' CELLBORDER='1' CELLSPACING='0'><TR><TD PORT='header' BGCOLOR='lightblue'><B>"
+_ATTRIBUTES_OPEN = "<TR><TD PORT='attrs' BGCOLOR='lightgray'>"
+_METHODS_OPEN = "<TR><TD PORT='methods' BGCOLOR='lightyellow'>"
+
+def quote_id(name: str) -> str:
+    """DOT ID for a node name or attribute value, quoted only when it has to be"""
+    if _PLAIN_ID.match(name) and name.lower() not in _KEYWORDS:
+        return name
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+def escape_html(text: str) -> str:
+    """Escape text for an HTML-like label; line breaks become <BR/>"""
+    if _HTML_SPECIAL.search(text):
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    return text.replace("\n", "<BR/>")
+
+def _write_members(write, cell_open: str, members):
+    # Blank members (an empty <attribute/> in model output) are dropped, and so is a compartment left empty
+    members = [member for member in members if member]
+    if not members:
+        return
+    write(cell_open)
+    # One escape pass per compartment: members joined by line breaks, each followed by <BR/>
+    write(escape_html("\n".join(members) + "\n"))
+    write("</TD></TR>")
+
+def write_class(uml_class: UMLClass, write):
+    write("\t")
+    write(quote_id(uml_class.name))
+    write(" [label=")
+    write(_TABLE_OPEN)
+    write(escape_html(uml_class.name))
+    write("</B></TD></TR>")
+    if uml_class.attributes:
+        _write_members(write, _ATTRIBUTES_OPEN, uml_class.attributes)
+    if uml_class.methods:
+        _write_members(write, _METHODS_OPEN, uml_class.methods)
+    write("</TABLE>> shape=none]\n")
+
+def write_relationship(relationship: UMLRelationship, write):
+    arrowhead = ARROW_STYLES.get(relationship.relationship_type, 'open')
+    write(
+        f"\t{quote_id(relationship.from_class)} -> {quote_id(relationship.to_class)} "
+        f"[label={quote_id(relationship.relationship_type)} arrowhead={arrowhead}]\n"
+    )
+
+def write_diagram(uml_diagram: UMLDiagram, out: TextIO):
+    """
+    Write a class diagram as DOT
+
+    Args:
+        uml_diagram (UMLDiagram): Diagram to write
+        out (TextIO): Destination, e.g. an io.StringIO or an open file
+    """
+    write = out.write
+    write(f"// {' '.join((uml_diagram.title or '').splitlines())}\ndigraph {{\n\trankdir=TB\n")
+    for uml_class in uml_diagram.classes:
+        write_class(uml_class, write)
+    for relationship in uml_diagram.relationships:
+        write_relationship(relationship, write)
+    write("}\n")
+
+def diagram_to_dot(uml_diagram: UMLDiagram) -> str:
+    buffer = io.StringIO()
+    write_diagram(uml_diagram, buffer)
+    return buffer.getvalue()
+
+def class_statement(uml_class: UMLClass) -> str:
+    """The node statement write_diagram emits for a class, including its line break"""
+    parts = []
+    write_class(uml_class, parts.append)
+    return "".join(parts)
+
+def relationship_statement(relationship: UMLRelationship) -> str:
+    """The edge statement write_diagram emits for a relationship, including its line break"""
+    parts = []
+    write_relationship(relationship, parts.append)
+    return "".join(parts)
@@ -0,0 +1,194 @@
+"""
+Pluggable sentence encoders for INCOSE retrieval.
+
+Every backend computes the same all-MiniLM-L6-v2 embeddings (mean pooling,
+L2-normalized) through the embed_documents / embed_query methods of langchain's
+Embeddings interface, so Chroma and the numpy index accept any of them:
+
+- "torch": sentence-transformers via HuggingFaceEmbeddings (the original path)
+- "onnx": ONNX Runtime on the exported float32 graph, no torch at runtime
+- "onnx-int8": the same graph with dynamically quantized int8 weights
+
+Query embeddings are memoized by CachedEncoder. The ONNX models are produced by
+setup_onnx_encoder.py, and benchmark_encoders.py checks them against torch.
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+
+from config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, ONNX_MODEL_DIR, QUERY_EMBEDDING_CACHE_SIZE
+)
+from lazy_imports import timed_import
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_MODEL_FILES = {"onnx": "model.onnx", "onnx-int8": "model_int8.onnx"}
+MAX_SEQUENCE_LENGTH = 256  # all-MiniLM-L6-v2's max_seq_length; longer text is truncated
+
+class Encoder(ABC):
+    # Duck-types langchain's Embeddings so importing the encoder layer does not pull in langchain
+    backend = ""
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    @abstractmethod
+    def embed_query(self, text: str) -> List[float]:
+        ...
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries; backends without a query cache just batch them"""
+        return self.embed_documents(texts)
+
+class TorchEncoder(Encoder):
+    backend = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        # torch is only imported for this backend, so ONNX deployments can leave it out
+        torch = timed_import("torch")
+        HuggingFaceEmbeddings = timed_import("langchain_community.embeddings").HuggingFaceEmbeddings
+
+        # Set PyTorch environment variables to avoid meta tensor issues
+        os.environ['PYTORCH_CUDA_ALLOC_CONF'] = 'max_split_size_mb:128'
+        os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+        torch.set_default_dtype(torch.float32)
+
+        self.model = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={
+                'device': 'cpu',
+                'torch_dtype': torch.float32
+            },
+            encode_kwargs={'normalize_embeddings': True}
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+class OnnxEncoder(Encoder):
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = False):
+        onnxruntime = timed_import("onnxruntime")
+        Tokenizer = timed_import("tokenizers").Tokenizer
+
+        self.backend = "onnx-int8" if quantized else "onnx"
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILES[self.backend])
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; run setup_onnx_encoder.py first")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding()
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_embeddings = self.session.run(
+            None, {name: value for name, value in feeds.items() if name in self.input_names}
+        )[0]
+        # Mean pooling over real tokens, then L2 normalization, as sentence-transformers does
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+class CachedEncoder(Encoder):
+    """LRU cache of query embeddings in front of another encoder; documents are not cached"""
+
+    def __init__(self, encoder: Encoder, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.encoder = encoder
+        self.backend = encoder.backend
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, text: str):
+        with self._lock:
+            embedding = self._entries.get(text)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return embedding
+
+    def _put(self, text: str, embedding: List[float]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[text] = embedding
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        embedding = self._get(text)
+        if embedding is None:
+            embedding = self.encoder.embed_query(text)
+            self._put(text, embedding)
+        return embedding
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        embeddings = [self._get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = self.encoder.embed_documents([texts[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+                self._put(texts[i], embedding)
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encoder.embed_documents(texts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+def load_encoder(backend: str = EMBEDDING_BACKEND, model_dir: str = ONNX_MODEL_DIR) -> Encoder:
+    """Create the encoder for a backend name from ENCODER_BACKENDS"""
+    if backend == "torch":
+        return TorchEncoder()
+    if backend in ONNX_MODEL_FILES:
+        return OnnxEncoder(model_dir, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+def encoder_signature(backend: str = EMBEDDING_BACKEND) -> str:
+    """Identifies which vectors a backend produces; the torch path keeps the bare model name"""
+    if backend == "torch":
+        return EMBEDDING_MODEL_NAME
+    return f"{EMBEDDING_MODEL_NAME}#{backend}"
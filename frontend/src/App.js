@@ -18,6 +18,24 @@ const DEFAULT_MODELS = [
   { id: "gemma2-9b-it", name: "Gemma 2 9B", description: "Latest Gemma 2 9B instruction-tuned model" }
 ];
 
+// Read a newline-delimited JSON response body, calling onEvent for each event as it arrives
+async function readNdjson(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (line.trim()) onEvent(JSON.parse(line));
+    }
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
 // Login Component
 function LoginPage({ onLogin }) {
   const [username, setUsername] = useState("");
@@ -76,12 +94,17 @@ function App() {
   const [umlResult, setUmlResult] = useState(null);
   const [umlLoading, setUmlLoading] = useState(false);
   const [umlError, setUmlError] = useState("");
+  const [umlStructured, setUmlStructured] = useState(false);
+  const [umlPartitioned, setUmlPartitioned] = useState(false);
 
   const [requirement, setRequirement] = useState("");
   const [reqSelectedModel, setReqSelectedModel] = useState("llama3-8b-8192");
   const [reqResult, setReqResult] = useState(null);
   const [reqLoading, setReqLoading] = useState(false);
   const [reqError, setReqError] = useState("");
+  const [reqBatchMode, setReqBatchMode] = useState(false);
+  const [batchResults, setBatchResults] = useState([]);
+  const [batchProgress, setBatchProgress] = useState(null);
 
   const diagramRef = useRef(null);
 
@@ -111,19 +134,40 @@ function App() {
     setUmlLoading(true);
     setUmlError("");
     setUmlResult(null);
+    const request = { scenario, uml_type: umlType, model: selectedModel };
     try {
-      const res = await fetch("http://localhost:8000/generate-uml", {
+      if (umlStructured || umlPartitioned) {
+        // Structured and partitioned output arrive whole, so use the regular endpoint
+        const res = await fetch("http://localhost:8000/generate-uml", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({
+            ...request,
+            structured: umlStructured || null,
+            partitioned: umlPartitioned || null
+          }),
+        });
+        const data = await res.json();
+        if (!res.ok) throw new Error(data.detail || "Error generating UML");
+        setUmlResult(data);
+        return;
+      }
+      // Stream the generation so classes appear in the diagram as soon as the model emits them
+      const res = await fetch("http://localhost:8000/generate-uml/stream", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ 
-          scenario, 
-          uml_type: umlType,
-          model: selectedModel
-        }),
+        body: JSON.stringify(request),
       });
       if (!res.ok) throw new Error((await res.json()).detail || "Error generating UML");
-      const data = await res.json();
-      setUmlResult(data);
+      await readNdjson(res, event => {
+        if (event.event === "class" || event.event === "relationship") {
+          setUmlResult({ dot_source: event.dot_source, partial: true });
+        } else if (event.event === "done") {
+          setUmlResult({ dot_source: event.dot_source, uml_diagram: event.uml_diagram, error: event.error });
+        } else if (event.event === "error") {
+          setUmlError(event.detail);
+        }
+      });
     } catch (err) {
       setUmlError(err.message);
     } finally {
@@ -133,6 +177,10 @@ function App() {
 
   const handleReqSubmit = async (e) => {
     e.preventDefault();
+    if (reqBatchMode) {
+      await handleBatchReqSubmit();
+      return;
+    }
     setReqLoading(true);
     setReqError("");
     setReqResult(null);
@@ -155,6 +203,43 @@ function App() {
     }
   };
 
+  // Validate one requirement per line and render each result as soon as the server streams it
+  const handleBatchReqSubmit = async () => {
+    const requirements = requirement.split("\n").filter(line => line.trim());
+    setReqLoading(true);
+    setReqError("");
+    setReqResult(null);
+    setBatchResults([]);
+    setBatchProgress({ completed: 0, total: requirements.length });
+    try {
+      const res = await fetch("http://localhost:8000/evaluate-requirements/stream?format=ndjson", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          requirements,
+          model: reqSelectedModel
+        }),
+      });
+      if (!res.ok) throw new Error((await res.json()).detail || "Error evaluating requirements");
+      await readNdjson(res, event => {
+        if (event.event === "result") {
+          setBatchResults(prev => {
+            const next = [...prev];
+            next[event.item.index] = event.item;
+            return next;
+          });
+          setBatchProgress({ completed: event.completed, total: event.total });
+        } else if (event.event === "error") {
+          setReqError(event.detail);
+        }
+      });
+    } catch (err) {
+      setReqError(err.message);
+    } finally {
+      setReqLoading(false);
+    }
+  };
+
   const handleLogout = () => {
     setIsLoggedIn(false);
   };
@@ -200,6 +285,26 @@ function App() {
               ))}
             </select>
             <br />
+            <label htmlFor="uml-structured">
+              <input
+                type="checkbox"
+                id="uml-structured"
+                checked={umlStructured}
+                onChange={e => setUmlStructured(e.target.checked)}
+              />
+              {' '}Structured output (tool call)
+            </label>
+            <br />
+            <label htmlFor="uml-partitioned">
+              <input
+                type="checkbox"
+                id="uml-partitioned"
+                checked={umlPartitioned}
+                onChange={e => setUmlPartitioned(e.target.checked)}
+              />
+              {' '}Partitioned generation (large scenarios)
+            </label>
+            <br />
             <textarea
               value={scenario}
               onChange={e => setScenario(e.target.value)}
@@ -210,7 +315,7 @@ function App() {
             <br />
             <button type="submit" disabled={umlLoading}>Generate UML</button>
           </form>
-          {umlLoading && <p>Generating UML...</p>}
+          {umlLoading && <p>{umlResult && umlResult.partial ? "Generating UML (streaming)..." : "Generating UML..."}</p>}
           {umlError && <p style={{ color: 'red' }}>{umlError}</p>}
           {umlResult && (
             <div className="uml-result">
@@ -240,19 +345,56 @@ function App() {
               ))}
             </select>
             <br />
+            <label htmlFor="req-batch-mode">
+              <input
+                type="checkbox"
+                id="req-batch-mode"
+                checked={reqBatchMode}
+                onChange={e => setReqBatchMode(e.target.checked)}
+              />
+              {' '}Batch mode (one requirement per line)
+            </label>
+            <br />
             <textarea
               value={requirement}
               onChange={e => setRequirement(e.target.value)}
-              placeholder="Enter a system requirement to validate against INCOSE standards..."
-              rows={4}
+              placeholder={reqBatchMode
+                ? "Enter one system requirement per line..."
+                : "Enter a system requirement to validate against INCOSE standards..."}
+              rows={reqBatchMode ? 8 : 4}
               style={{ width: '100%' }}
             />
             <br />
-            <button type="submit" disabled={reqLoading}>Validate Requirement</button>
+            <button type="submit" disabled={reqLoading}>
+              {reqBatchMode ? "Validate Requirements" : "Validate Requirement"}
+            </button>
           </form>
-          {reqLoading && <p>Evaluating requirement...</p>}
+          {reqLoading && !reqBatchMode && <p>Evaluating requirement...</p>}
+          {reqBatchMode && batchProgress && (
+            <p>Validated {batchProgress.completed} of {batchProgress.total} requirements</p>
+          )}
+          {reqBatchMode && batchResults.filter(Boolean).map(item => (
+            <div key={item.index} className="req-result" style={{
+              padding: '10px',
+              border: item.result === 'VALID' ? '2px solid #4CAF50' : '2px solid #f44336',
+              borderRadius: '8px',
+              backgroundColor: item.result === 'VALID' ? '#e8f5e8' : '#ffebee',
+              marginTop: '10px'
+            }}>
+              <h5 style={{ margin: '0 0 5px 0', color: item.result === 'VALID' ? '#2e7d32' : '#c62828' }}>
+                #{item.index + 1} {item.result === 'VALID' ? '✓ Valid' : '✗ Invalid'} ({item.score.toFixed(1)}%)
+              </h5>
+              <div style={{ fontSize: '14px', marginBottom: '5px' }}>{item.requirement}</div>
+              <details>
+                <summary>Analysis</summary>
+                <div style={{ fontSize: '14px', lineHeight: '1.4', whiteSpace: 'pre-wrap' }}>
+                  {item.reason}
+                </div>
+              </details>
+            </div>
+          ))}
           {reqError && <p style={{ color: 'red' }}>{reqError}</p>}
-          {reqResult && (
+          {!reqBatchMode && reqResult && (
             <div className="req-result">
               <div style={{ 
                 padding: '15px', 
@@ -1,23 +1,238 @@
-import groq
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import weakref
 import xml.etree.ElementTree as ET
-from config import GROQ_API_KEY, GROQ_MODEL
-from uml_models import UMLDiagram, UMLClass, UMLRelationship
+from config import (
+    GROQ_API_KEY, GROQ_MODEL, GROQ_MAX_CONNECTIONS,
+    GROQ_MAX_KEEPALIVE_CONNECTIONS, GROQ_TIMEOUT_SECONDS, STRUCTURED_OUTPUT, REFINE_MAX_TOKENS,
+    PARTITION_MAX_SUBSYSTEMS, PARTITION_MAX_CONCURRENCY, LLM_SCHEDULER_ENABLED
+)
+from typing import AsyncIterator, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from lazy_imports import timed_import
+from llm_scheduler import get_scheduler
+from metrics import STAGE_SECONDS, record_llm_usage, timed
+from parse_stats import record_parse
+from prompt_builder import count_tokens
+from uml_models import UMLDiagram, UMLDiagramPatch, UMLOutline
+from uml_xml import (
+    IncrementalUMLParser, class_from_element, outline_from_element, patch_from_element,
+    relationship_from_element, strip_code_fence
+)
+from uml_partition import merge_subsystem_diagrams, subsystem_scenario
+from uml_cache import UMLResponseCache, get_uml_cache
+
+_sync_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+
+# (requested, served) model of the last completion in this context; parse stats go to the served model
+_last_completion: contextvars.ContextVar = contextvars.ContextVar("last_completion", default=None)
+# Models a generation fell back to, collected across its completions (subsystem tasks share the list)
+_fallbacks: contextvars.ContextVar = contextvars.ContextVar("fallbacks", default=None)
+
+def _note_completion(requested: str, served: str):
+    _last_completion.set((requested, served))
+    fallbacks = _fallbacks.get()
+    if served != requested and fallbacks is not None:
+        fallbacks.append(served)
+
+class _TrackFallbacks:
+    """Collect the models the enclosed completions fell back to"""
+    __slots__ = ("fallbacks", "token")
+
+    def __enter__(self) -> list:
+        self.fallbacks = []
+        self.token = _fallbacks.set(self.fallbacks)
+        return self.fallbacks
+
+    def __exit__(self, exc_type, exc, traceback):
+        _fallbacks.reset(self.token)
+        return False
+
+# groq and httpx are imported when the first client is built, not with this module
+def _http_limits() -> "httpx.Limits":
+    return timed_import("httpx").Limits(
+        max_connections=GROQ_MAX_CONNECTIONS,
+        max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+def _retry_kwargs() -> dict:
+    # llm_scheduler retries with its own backoff and model fallback; SDK retries would multiply them
+    return {"max_retries": 0} if LLM_SCHEDULER_ENABLED else {}
+
+def get_groq_client() -> "groq.Groq":
+    """Return the process-wide Groq client so HTTP connections are reused across requests"""
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                _sync_client = timed_import("groq").Groq(
+                    api_key=GROQ_API_KEY,
+                    http_client=timed_import("httpx").Client(limits=_http_limits(), timeout=GROQ_TIMEOUT_SECONDS),
+                    **_retry_kwargs()
+                )
+    return _sync_client
+
+def get_async_groq_client() -> "groq.AsyncGroq":
+    """
+    Return the pooled AsyncGroq client for the running event loop
+
+    httpx async connections are bound to the loop that opened them, so one
+    client is kept per loop; in a uvicorn worker that is a single client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = timed_import("groq").AsyncGroq(
+            api_key=GROQ_API_KEY,
+            http_client=timed_import("httpx").AsyncClient(limits=_http_limits(), timeout=GROQ_TIMEOUT_SECONDS),
+            **_retry_kwargs()
+        )
+        _async_clients[loop] = client
+    return client
+
+UML_TOOL_NAME = "emit_uml_diagram"
+UML_PATCH_TOOL_NAME = "emit_uml_patch"
+UML_OUTLINE_TOOL_NAME = "emit_uml_outline"
+
+# Bump whenever the UML prompt changes so cached responses from the old prompt stop matching
+UML_PROMPT_TEMPLATE_VERSION = "1"
+
+UML_TYPE_PROMPTS = {
+    "class": "Generate a UML class diagram in XML format. Include classes, their attributes, methods, and relationships (inheritance, association, composition, aggregation).",
+    "object": "Generate a UML object diagram in XML format. Include instances (objects) of classes, links between objects, and attribute values for each object.",
+    "composite": "Generate a UML composite structure diagram in XML format. Include the internal structure of a class or component, parts, ports, and connectors.",
+    "sequence": "Generate a UML sequence diagram in XML format. Include objects/actors, messages exchanged (with order), and lifelines for each object/actor.",
+    "usecase": "Generate a UML use case diagram in XML format. Include actors (users, external systems), use cases (system functions), and relationships (associations, includes, extends) between them."
+}
+
+class StructuredOutputError(ValueError):
+    """Raised when a structured response does not validate against its schema"""
+    def __init__(self, message: str, raw_output: str):
+        super().__init__(message)
+        self.raw_output = raw_output
 
 class GroqUMLClient:
-    def __init__(self, model: str = None):
-        self.client = groq.Groq(api_key=GROQ_API_KEY)
+    def __init__(self, model: str = None, cache: UMLResponseCache = None, structured: bool = None):
+        """
+        Args:
+            model (str): Groq model ID; defaults to GROQ_MODEL
+            cache (UMLResponseCache): Response cache; defaults to the process-wide cache
+            structured (bool): Request schema-constrained tool-call output instead of free
+                text; defaults to STRUCTURED_OUTPUT
+        """
         self.model = model or GROQ_MODEL
+        # Falls back to the process-wide cache; None when UML_CACHE_ENABLED is off
+        self.cache = cache if cache is not None else get_uml_cache()
+        self.structured = STRUCTURED_OUTPUT if structured is None else structured
 
-    def generate_uml(self, scenario_description: str, uml_type: str = "class") -> UMLDiagram:
-        uml_type_prompts = {
-            "class": "Generate a UML class diagram in XML format. Include classes, their attributes, methods, and relationships (inheritance, association, composition, aggregation).",
-            "object": "Generate a UML object diagram in XML format. Include instances (objects) of classes, links between objects, and attribute values for each object.",
-            "composite": "Generate a UML composite structure diagram in XML format. Include the internal structure of a class or component, parts, ports, and connectors.",
-            "sequence": "Generate a UML sequence diagram in XML format. Include objects/actors, messages exchanged (with order), and lifelines for each object/actor.",
-            "usecase": "Generate a UML use case diagram in XML format. Include actors (users, external systems), use cases (system functions), and relationships (associations, includes, extends) between them."
-        }
-        prompt_instructions = uml_type_prompts.get(uml_type, uml_type_prompts["class"])
-        prompt = f"""
+    @property
+    def served_model(self) -> str:
+        """Model that served this client's last completion in the current context; differs after a fallback"""
+        last = _last_completion.get()
+        return last[1] if last is not None and last[0] == self.model else self.model
+
+    @property
+    def output_mode(self) -> str:
+        return "structured" if self.structured else "text"
+
+    @property
+    def client(self) -> "groq.Groq":
+        return get_groq_client()
+
+    @property
+    def async_client(self) -> "groq.AsyncGroq":
+        return get_async_groq_client()
+
+    def _complete(self, kind: str, prompt: str, max_tokens: int, **extra):
+        """
+        One chat completion for a single user prompt, timed as stage "llm.<kind>"
+
+        Goes through the process-wide LLMScheduler: admission against the model's
+        request and token budget, retries of 429/5xx/connection errors, and fallback
+        to another model when this one is saturated.
+
+        Args:
+            kind (str): What the completion is for, as in parse_stats ("uml", "validation", ...)
+            prompt (str): User prompt
+            max_tokens (int): Completion token limit
+            **extra: Further create() arguments, e.g. tools and tool_choice
+
+        Returns:
+            The ChatCompletion; its usage is counted into llm_tokens_total under the model that served it,
+            which served_model reports afterwards
+        """
+        _last_completion.set(None)
+        estimated = count_tokens(prompt, self.model) + max_tokens
+        try:
+            with timed(f"llm.{kind}", self.model):
+                response, model = get_scheduler().call(
+                    self.model, estimated, lambda model: self._send(model, prompt, max_tokens, extra)
+                )
+        except Exception:
+            record_llm_usage(self.model, kind, None, outcome="error")
+            raise
+        record_llm_usage(model, kind, response)
+        _note_completion(self.model, model)
+        return response
+
+    async def _acomplete(self, kind: str, prompt: str, max_tokens: int, **extra):
+        """Async variant of _complete"""
+        _last_completion.set(None)
+        estimated = count_tokens(prompt, self.model) + max_tokens
+        try:
+            with timed(f"llm.{kind}", self.model):
+                response, model = await get_scheduler().acall(
+                    self.model, estimated, lambda model: self._asend(model, prompt, max_tokens, extra)
+                )
+        except Exception:
+            record_llm_usage(self.model, kind, None, outcome="error")
+            raise
+        record_llm_usage(model, kind, response)
+        _note_completion(self.model, model)
+        return response
+
+    @staticmethod
+    def _request(model: str, prompt: str, max_tokens: int, extra: dict) -> dict:
+        return dict(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=max_tokens,
+            **extra
+        )
+
+    def _send(self, model: str, prompt: str, max_tokens: int, extra: dict):
+        """Send once; returns the completion and the response headers that carry the rate limits"""
+        completions = self.client.chat.completions
+        raw_api = getattr(completions, "with_raw_response", None)
+        if raw_api is None:
+            # Stand-in clients (groq_replay) have no raw responses, hence no rate limit headers
+            return completions.create(**self._request(model, prompt, max_tokens, extra)), {}
+        raw = raw_api.create(**self._request(model, prompt, max_tokens, extra))
+        return raw.parse(), raw.headers
+
+    async def _asend(self, model: str, prompt: str, max_tokens: int, extra: dict):
+        """Async variant of _send"""
+        completions = self.async_client.chat.completions
+        raw_api = getattr(completions, "with_raw_response", None)
+        if raw_api is None:
+            return await completions.create(**self._request(model, prompt, max_tokens, extra)), {}
+        raw = await raw_api.create(**self._request(model, prompt, max_tokens, extra))
+        parsed = raw.parse()
+        if inspect.isawaitable(parsed):
+            # Newer SDKs parse async responses asynchronously
+            parsed = await parsed
+        return parsed, raw.headers
+
+    def _build_uml_prompt(self, scenario_description: str, uml_type: str = "class") -> str:
+        prompt_instructions = UML_TYPE_PROMPTS.get(uml_type, UML_TYPE_PROMPTS["class"])
+        return f"""
         {prompt_instructions}
         Scenario: {scenario_description}
         Return the result in this exact XML format:
@@ -45,76 +260,514 @@ class GroqUMLClient:
             </relationships>
         </uml_diagram>
         """
+
+    def _build_uml_structured_prompt(self, scenario_description: str, uml_type: str = "class") -> str:
+        prompt_instructions = UML_TYPE_PROMPTS.get(uml_type, UML_TYPE_PROMPTS["class"])
+        return f"""
+        {prompt_instructions.replace(" in XML format", "")}
+        Scenario: {scenario_description}
+        Call the {UML_TOOL_NAME} function with the complete diagram. Use inheritance,
+        association, composition or aggregation as relationship types, and refer to
+        classes by their exact names.
+        """
+
+    def _cache_key(self, scenario_description: str, uml_type: str, partitioned: bool = False) -> str:
+        # Structured, free-text and partitioned generation differ, so their responses are cached apart
+        prompt_version = UML_PROMPT_TEMPLATE_VERSION + ("-structured" if self.structured else "")
+        if partitioned:
+            prompt_version += "-partitioned"
+        return UMLResponseCache.make_key(scenario_description, uml_type, self.model, prompt_version)
+
+    def _cacheable(self, diagram: UMLDiagram, fallbacks: list) -> bool:
+        if fallbacks:
+            # Another model's output must not be served as this model's; report who produced it instead
+            diagram._served_model = fallbacks[0]
+            return False
+        # Error diagrams carry no classes; never cache them so a retry reaches the LLM
+        return self.cache is not None and bool(diagram.classes)
+
+    def _cache_store(self, key: str, diagram: UMLDiagram, fallbacks: list):
+        if self._cacheable(diagram, fallbacks):
+            self.cache.set(key, diagram)
+
+    async def _acache_store(self, key: str, diagram: UMLDiagram, fallbacks: list):
+        if self._cacheable(diagram, fallbacks):
+            await self.cache.aset(key, diagram)
+
+    def generate_uml(self, scenario_description: str, uml_type: str = "class") -> UMLDiagram:
+        key = self._cache_key(scenario_description, uml_type)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        with _TrackFallbacks() as fallbacks:
+            diagram = self._generate_uml_uncached(scenario_description, uml_type)
+        self._cache_store(key, diagram, fallbacks)
+        return diagram
+
+    def _generate_uml_uncached(self, scenario_description: str, uml_type: str) -> UMLDiagram:
+        if self.structured:
+            return self._generate_uml_structured(scenario_description, uml_type)
+        prompt = self._build_uml_prompt(scenario_description, uml_type)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=2000
-            )
+            response = self._complete("uml", prompt, max_tokens=2000)
             xml_content = response.choices[0].message.content
             return self._parse_xml_to_uml(xml_content)
         except Exception as e:
             print(f"Error generating UML: {e}")
             return UMLDiagram(title="Error generating diagram")
-    def _parse_xml_to_uml(self, xml_content: str) -> UMLDiagram:
+
+    async def agenerate_uml(self, scenario_description: str, uml_type: str = "class") -> UMLDiagram:
+        """Async variant of generate_uml that awaits the pooled AsyncGroq client"""
+        key = self._cache_key(scenario_description, uml_type)
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return cached
+        with _TrackFallbacks() as fallbacks:
+            diagram = await self._agenerate_uml_uncached(scenario_description, uml_type)
+        await self._acache_store(key, diagram, fallbacks)
+        return diagram
+
+    async def _agenerate_uml_uncached(self, scenario_description: str, uml_type: str) -> UMLDiagram:
+        if self.structured:
+            return await self._agenerate_uml_structured(scenario_description, uml_type)
+        prompt = self._build_uml_prompt(scenario_description, uml_type)
+        try:
+            response = await self._acomplete("uml", prompt, max_tokens=2000)
+            xml_content = response.choices[0].message.content
+            return self._parse_xml_to_uml(xml_content)
+        except Exception as e:
+            print(f"Error generating UML: {e}")
+            return UMLDiagram(title="Error generating diagram")
+
+    def _generate_uml_structured(self, scenario_description: str, uml_type: str) -> UMLDiagram:
+        prompt = self._build_uml_structured_prompt(scenario_description, uml_type)
         try:
-            if "```xml" in xml_content:
-                xml_content = xml_content.split("```xml")[1].split("```")[0]
-            elif "```" in xml_content:
-                xml_content = xml_content.split("```")[1]
+            return self.make_structured_request(
+                prompt, UMLDiagram, UML_TOOL_NAME, "Return the generated UML diagram", max_tokens=2000
+            )
+        except StructuredOutputError as e:
+            print(f"Error parsing structured UML: {e}")
+            return UMLDiagram(title="Error parsing diagram")
+        except Exception as e:
+            print(f"Error generating UML: {e}")
+            return UMLDiagram(title="Error generating diagram")
+
+    async def _agenerate_uml_structured(self, scenario_description: str, uml_type: str) -> UMLDiagram:
+        prompt = self._build_uml_structured_prompt(scenario_description, uml_type)
+        try:
+            return await self.a_make_structured_request(
+                prompt, UMLDiagram, UML_TOOL_NAME, "Return the generated UML diagram", max_tokens=2000
+            )
+        except StructuredOutputError as e:
+            print(f"Error parsing structured UML: {e}")
+            return UMLDiagram(title="Error parsing diagram")
+        except Exception as e:
+            print(f"Error generating UML: {e}")
+            return UMLDiagram(title="Error generating diagram")
+
+    def _build_outline_prompt(self, scenario_description: str, uml_type: str = "class") -> str:
+        return f"""
+        Split the system in this scenario into at most {PARTITION_MAX_SUBSYSTEMS} subsystems for a UML
+        {uml_type or "class"} diagram. Give each subsystem the names of the classes it owns (each class in
+        exactly one subsystem) and list the relationships between classes of different subsystems.
+        Scenario: {scenario_description}
+        Return ONLY names, no attributes or methods, in this exact XML format:
+        <uml_outline>
+            <title>Diagram Title</title>
+            <subsystems>
+                <subsystem>
+                    <name>Subsystem name</name>
+                    <description>One sentence on its responsibility</description>
+                    <classes><name>ClassName</name><name>OtherClass</name></classes>
+                </subsystem>
+            </subsystems>
+            <relationships>
+                <relationship><from>ClassName</from><to>ClassInOtherSubsystem</to><type>association</type></relationship>
+            </relationships>
+        </uml_outline>
+        """
+
+    def _parse_outline(self, content: str) -> UMLOutline:
+        try:
+            with timed("parse.uml_outline", self.served_model):
+                root = ET.fromstring(strip_code_fence(content).strip())
+                if root.tag != "uml_outline":
+                    raise ValueError(f"Expected <uml_outline>, got <{root.tag}>")
+                outline = outline_from_element(root)
+        except Exception as e:
+            record_parse("uml_outline", self.served_model, "text", False)
+            raise ValueError(f"Could not parse the subsystem outline: {e}") from e
+        record_parse("uml_outline", self.served_model, "text", True)
+        return outline
+
+    def generate_outline(self, scenario_description: str, uml_type: str = "class") -> Optional[UMLOutline]:
+        """First pass of partitioned generation; None when the outline could not be produced"""
+        prompt = self._build_outline_prompt(scenario_description, uml_type)
+        try:
+            if self.structured:
+                outline = self.make_structured_request(
+                    prompt, UMLOutline, UML_OUTLINE_TOOL_NAME, "Return the subsystem outline", kind="uml_outline"
+                )
+            else:
+                outline = self._parse_outline(self._make_request(prompt, kind="uml_outline"))
+        except Exception as e:
+            print(f"Error generating UML outline: {e}")
+            return None
+        outline.subsystems = outline.subsystems[:PARTITION_MAX_SUBSYSTEMS]
+        return outline
+
+    async def agenerate_outline(self, scenario_description: str, uml_type: str = "class") -> Optional[UMLOutline]:
+        """Async variant of generate_outline"""
+        prompt = self._build_outline_prompt(scenario_description, uml_type)
+        try:
+            if self.structured:
+                outline = await self.a_make_structured_request(
+                    prompt, UMLOutline, UML_OUTLINE_TOOL_NAME, "Return the subsystem outline", kind="uml_outline"
+                )
+            else:
+                outline = self._parse_outline(await self.a_make_request(prompt, kind="uml_outline"))
+        except Exception as e:
+            print(f"Error generating UML outline: {e}")
+            return None
+        outline.subsystems = outline.subsystems[:PARTITION_MAX_SUBSYSTEMS]
+        return outline
+
+    def generate_uml_partitioned(self, scenario_description: str, uml_type: str = "class") -> UMLDiagram:
+        """
+        Generate a large diagram as an outline plus one completion per subsystem
+
+        Subsystems are generated concurrently (PARTITION_MAX_CONCURRENCY at a time) and
+        merged by uml_partition.merge_subsystem_diagrams, so latency follows the largest
+        subsystem and the diagram is not limited to one completion's max_tokens. Falls
+        back to generate_uml when the outline fails or has a single subsystem.
+        """
+        key = self._cache_key(scenario_description, uml_type, partitioned=True)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        with _TrackFallbacks() as fallbacks:
+            outline = self.generate_outline(scenario_description, uml_type)
+            if outline is None or len(outline.subsystems) < 2:
+                return self.generate_uml(scenario_description, uml_type)
+            # Pool threads start with an empty context; give each subsystem a copy of this one
+            contexts = [contextvars.copy_context() for _ in outline.subsystems]
+            with ThreadPoolExecutor(max_workers=max(1, PARTITION_MAX_CONCURRENCY)) as pool:
+                diagrams = list(pool.map(
+                    lambda context, subsystem: context.run(
+                        self._generate_uml_uncached,
+                        subsystem_scenario(scenario_description, outline, subsystem), uml_type
+                    ),
+                    contexts, outline.subsystems
+                ))
+        diagram = merge_subsystem_diagrams(outline, diagrams)
+        self._cache_store(key, diagram, fallbacks)
+        return diagram
+
+    async def agenerate_uml_partitioned(self, scenario_description: str, uml_type: str = "class") -> UMLDiagram:
+        """Async variant of generate_uml_partitioned"""
+        key = self._cache_key(scenario_description, uml_type, partitioned=True)
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return cached
+        with _TrackFallbacks() as fallbacks:
+            outline = await self.agenerate_outline(scenario_description, uml_type)
+            if outline is None or len(outline.subsystems) < 2:
+                return await self.agenerate_uml(scenario_description, uml_type)
+            slots = asyncio.Semaphore(max(1, PARTITION_MAX_CONCURRENCY))
             
-            root = ET.fromstring(xml_content.strip())
-            diagram = UMLDiagram()
+            async def generate_subsystem(subsystem) -> UMLDiagram:
+                async with slots:
+                    return await self._agenerate_uml_uncached(
+                        subsystem_scenario(scenario_description, outline, subsystem), uml_type
+                    )
             
-            title_elem = root.find("title")
-            if title_elem is not None:
-                diagram.title = title_elem.text
+            diagrams = await asyncio.gather(*(generate_subsystem(subsystem) for subsystem in outline.subsystems))
+        diagram = merge_subsystem_diagrams(outline, diagrams)
+        await self._acache_store(key, diagram, fallbacks)
+        return diagram
+
+    async def astream_uml(
+        self, scenario_description: str, uml_type: str = "class"
+    ) -> AsyncIterator[Tuple[str, object, UMLDiagram]]:
+        """
+        Stream UML generation, yielding (event, payload, diagram_so_far) as elements close
+        
+        Events are "title", "class" and "relationship" while the completion streams,
+        then a single "done" whose payload is the final UMLDiagram. If the streamed
+        XML turns out malformed, the full text is re-parsed with _parse_xml_to_uml
+        before "done", matching generate_uml's error handling. Streaming always uses
+        the free-text XML prompt, whatever the client's structured setting.
+        """
+        key = self._cache_key(scenario_description, uml_type)
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                partial = UMLDiagram(title=cached.title)
+                yield "title", cached.title, partial
+                for uml_class in cached.classes:
+                    partial.classes.append(uml_class)
+                    yield "class", uml_class, partial
+                for relationship in cached.relationships:
+                    partial.relationships.append(relationship)
+                    yield "relationship", relationship, partial
+                yield "done", cached, cached
+                return
+        
+        prompt = self._build_uml_prompt(scenario_description, uml_type)
+        parser = IncrementalUMLParser()
+        chunks = []
+        started = time.perf_counter()
+        try:
+            # Admission, retries and fallback cover opening the stream; a broken stream is not resumed
+            stream, served = await get_scheduler().acall(
+                self.model, count_tokens(prompt, self.model) + 2000,
+                lambda model: self._aopen_stream(model, prompt, 2000)
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if not text:
+                    continue
+                if not chunks:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, "llm.uml_stream.first_token", served)
+                chunks.append(text)
+                for event, payload in parser.feed(text):
+                    yield event, payload, parser.diagram
+        except Exception as e:
+            print(f"Error generating UML: {e}")
+            record_llm_usage(self.model, "uml_stream", None, outcome="error")
+            yield "done", UMLDiagram(title="Error generating diagram"), parser.diagram
+            return
+        STAGE_SECONDS.observe(time.perf_counter() - started, "llm.uml_stream", served)
+        record_llm_usage(served, "uml_stream", None)
+        _note_completion(self.model, served)
+        
+        if parser.error or not parser.finished:
+            print(f"Incremental XML parse incomplete ({parser.error}); re-parsing full response")
+            diagram = self._parse_xml_to_uml("".join(chunks))
+        else:
+            record_parse("uml", served, "text", True)
+            diagram = parser.diagram
+        await self._acache_store(key, diagram, [served] if served != self.model else [])
+        yield "done", diagram, diagram
+
+    async def _aopen_stream(self, model: str, prompt: str, max_tokens: int):
+        stream = await self.async_client.chat.completions.create(
+            **self._request(model, prompt, max_tokens, {"stream": True})
+        )
+        return stream, {}
+
+    @staticmethod
+    def _describe_diagram(diagram: UMLDiagram) -> str:
+        # One line per class and relationship: far fewer prompt tokens than the XML format
+        lines = [f"Title: {diagram.title}", "Classes:"]
+        for uml_class in diagram.classes:
+            lines.append(
+                f"- {uml_class.name}: {'; '.join(uml_class.attributes) or '-'} | {'; '.join(uml_class.methods) or '-'}"
+            )
+        lines.append("Relationships:")
+        for relationship in diagram.relationships:
+            lines.append(f"- {relationship.from_class} {relationship.relationship_type} {relationship.to_class}")
+        return "\n".join(lines)
+
+    def _build_refine_prompt(self, diagram: UMLDiagram, instruction: str, uml_type: str = "class") -> str:
+        return f"""
+        You are refining an existing UML {uml_type or "class"} diagram.
+        Current diagram (class: attributes | methods):
+        {self._describe_diagram(diagram)}
+        Change requested: {instruction}
+        Return ONLY the changes, in this exact XML format. Leave out empty sections and
+        unchanged classes; a changed class must be given in full.
+        <uml_patch>
+            <title>New title, only if it changes</title>
+            <added_classes><class><name>ClassName</name><attributes><attribute>attr: type</attribute></attributes><methods><method>method()</method></methods></class></added_classes>
+            <changed_classes><class>...</class></changed_classes>
+            <removed_classes><name>ClassName</name></removed_classes>
+            <added_relationships><relationship><from>Class1</from><to>Class2</to><type>association</type></relationship></added_relationships>
+            <removed_relationships><relationship>...</relationship></removed_relationships>
+        </uml_patch>
+        """
+
+    def _build_refine_structured_prompt(self, diagram: UMLDiagram, instruction: str, uml_type: str = "class") -> str:
+        return f"""
+        You are refining an existing UML {uml_type or "class"} diagram.
+        Current diagram (class: attributes | methods):
+        {self._describe_diagram(diagram)}
+        Change requested: {instruction}
+        Call the {UML_PATCH_TOOL_NAME} function with ONLY the changes. Leave unchanged
+        classes out; a changed class must be given in full. Refer to classes by their exact names.
+        """
+
+    def _parse_patch(self, content: str) -> UMLDiagramPatch:
+        try:
+            with timed("parse.uml_patch", self.served_model):
+                root = ET.fromstring(strip_code_fence(content).strip())
+                if root.tag != "uml_patch":
+                    raise ValueError(f"Expected <uml_patch>, got <{root.tag}>")
+                patch = patch_from_element(root)
+        except Exception as e:
+            record_parse("uml_patch", self.served_model, "text", False)
+            raise ValueError(f"Could not parse the diagram changes: {e}") from e
+        record_parse("uml_patch", self.served_model, "text", True)
+        return patch
+
+    def refine_uml(self, diagram: UMLDiagram, instruction: str, uml_type: str = "class") -> UMLDiagramPatch:
+        """
+        Ask for only the changes an instruction makes to an existing diagram
+
+        Args:
+            diagram (UMLDiagram): Diagram being refined
+            instruction (str): Requested change, e.g. "Add a Payment class used by Order"
+            uml_type (str): Diagram type, as for generate_uml
+
+        Returns:
+            UMLDiagramPatch: Proposed changes; apply them with uml_patch.apply_patch
+
+        Raises:
+            ValueError: The request failed or the response could not be parsed
+                (StructuredOutputError in structured mode)
+        """
+        if self.structured:
+            return self.make_structured_request(
+                self._build_refine_structured_prompt(diagram, instruction, uml_type), UMLDiagramPatch,
+                UML_PATCH_TOOL_NAME, "Return the changes to the UML diagram",
+                max_tokens=REFINE_MAX_TOKENS, kind="uml_patch"
+            )
+        response = self._complete(
+            "uml_patch", self._build_refine_prompt(diagram, instruction, uml_type), max_tokens=REFINE_MAX_TOKENS
+        )
+        return self._parse_patch(response.choices[0].message.content or "")
+
+    async def arefine_uml(self, diagram: UMLDiagram, instruction: str, uml_type: str = "class") -> UMLDiagramPatch:
+        """Async variant of refine_uml"""
+        if self.structured:
+            return await self.a_make_structured_request(
+                self._build_refine_structured_prompt(diagram, instruction, uml_type), UMLDiagramPatch,
+                UML_PATCH_TOOL_NAME, "Return the changes to the UML diagram",
+                max_tokens=REFINE_MAX_TOKENS, kind="uml_patch"
+            )
+        response = await self._acomplete(
+            "uml_patch", self._build_refine_prompt(diagram, instruction, uml_type), max_tokens=REFINE_MAX_TOKENS
+        )
+        return self._parse_patch(response.choices[0].message.content or "")
+
+    def _parse_xml_to_uml(self, xml_content: str) -> UMLDiagram:
+        with timed("parse.uml", self.served_model):
+            try:
+                root = ET.fromstring(strip_code_fence(xml_content).strip())
+                diagram = UMLDiagram()
             
-            classes_elem = root.find("classes")
-            if classes_elem is not None:
-                for class_elem in classes_elem.findall("class"):
-                    uml_class = UMLClass(name=class_elem.find("name").text)
-                    
-                    attrs_elem = class_elem.find("attributes")
-                    if attrs_elem is not None:
-                        for attr_elem in attrs_elem.findall("attribute"):
-                            uml_class.attributes.append(attr_elem.text)
-                    
-                    methods_elem = class_elem.find("methods")
-                    if methods_elem is not None:
-                        for method_elem in methods_elem.findall("method"):
-                            uml_class.methods.append(method_elem.text)
-                    
-                    diagram.classes.append(uml_class)
+                title_elem = root.find("title")
+                if title_elem is not None:
+                    diagram.title = title_elem.text or diagram.title
             
-            relationships_elem = root.find("relationships")
-            if relationships_elem is not None:
-                for rel_elem in relationships_elem.findall("relationship"):
-                    from_class = rel_elem.find("from").text
-                    to_class = rel_elem.find("to").text
-                    rel_type = rel_elem.find("type").text
-                    diagram.relationships.append(
-                        UMLRelationship(
-                            from_class=from_class,
-                            to_class=to_class,
-                            relationship_type=rel_type
-                        )
-                    )
-            return diagram
-        except Exception as e:
-            print(f"Error parsing XML: {e}")
-            return UMLDiagram(title="Error parsing diagram")
+                classes_elem = root.find("classes")
+                if classes_elem is not None:
+                    for class_elem in classes_elem.findall("class"):
+                        diagram.classes.append(class_from_element(class_elem))
+            
+                relationships_elem = root.find("relationships")
+                if relationships_elem is not None:
+                    for rel_elem in relationships_elem.findall("relationship"):
+                        diagram.relationships.append(relationship_from_element(rel_elem))
+                record_parse("uml", self.served_model, "text", True)
+                return diagram
+            except Exception as e:
+                print(f"Error parsing XML: {e}")
+                record_parse("uml", self.served_model, "text", False)
+                return UMLDiagram(title="Error parsing diagram")
     
-    def _make_request(self, prompt: str, max_tokens: int = 1000) -> str:
+    def _make_request(self, prompt: str, max_tokens: int = 1000, kind: str = "validation") -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=max_tokens
-            )
+            response = self._complete(kind, prompt, max_tokens=max_tokens)
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Error making request to Groq: {e}")
+            return ""
+
+    async def a_make_request(self, prompt: str, max_tokens: int = 1000, kind: str = "validation") -> str:
+        """Async variant of _make_request"""
+        try:
+            response = await self._acomplete(kind, prompt, max_tokens=max_tokens)
             return response.choices[0].message.content
         except Exception as e:
             print(f"Error making request to Groq: {e}")
-            return ""
\ No newline at end of file
+            return ""
+
+    def _structured_kwargs(self, schema_model: Type[BaseModel], tool_name: str, description: str) -> dict:
+        # Forcing a single tool call makes the model emit arguments matching the JSON schema
+        return {
+            "tools": [{
+                "type": "function",
+                "function": {
+                    "name": tool_name,
+                    "description": description,
+                    "parameters": schema_model.model_json_schema()
+                }
+            }],
+            "tool_choice": {"type": "function", "function": {"name": tool_name}}
+        }
+
+    def _parse_structured_response(self, response, schema_model: Type[BaseModel], kind: str) -> BaseModel:
+        message = response.choices[0].message
+        if message.tool_calls:
+            raw_output = message.tool_calls[0].function.arguments or ""
+        else:
+            # Some models answer in the message body despite tool_choice
+            raw_output = message.content or ""
+        try:
+            with timed(f"parse.{kind}", self.served_model):
+                parsed = schema_model.model_validate_json(raw_output)
+        except ValidationError as e:
+            record_parse(kind, self.served_model, "structured", False)
+            raise StructuredOutputError(str(e), raw_output) from e
+        record_parse(kind, self.served_model, "structured", True)
+        return parsed
+
+    def make_structured_request(
+        self,
+        prompt: str,
+        schema_model: Type[BaseModel],
+        tool_name: str,
+        description: str,
+        max_tokens: int = 1000,
+        kind: str = "uml"
+    ) -> BaseModel:
+        """
+        Request output constrained to schema_model's JSON schema and validate it
+        
+        Args:
+            prompt (str): User prompt
+            schema_model (Type[BaseModel]): Pydantic model the tool arguments must match
+            tool_name (str): Name of the single tool the model is forced to call
+            description (str): Tool description shown to the model
+            max_tokens (int): Completion token limit
+            kind (str): Label for parse_stats and metrics, e.g. "uml" or "validation"
+        
+        Raises:
+            StructuredOutputError: The output did not validate; raw_output holds the text
+        """
+        response = self._complete(
+            kind, prompt, max_tokens=max_tokens, **self._structured_kwargs(schema_model, tool_name, description)
+        )
+        return self._parse_structured_response(response, schema_model, kind)
+
+    async def a_make_structured_request(
+        self,
+        prompt: str,
+        schema_model: Type[BaseModel],
+        tool_name: str,
+        description: str,
+        max_tokens: int = 1000,
+        kind: str = "uml"
+    ) -> BaseModel:
+        """Async variant of make_structured_request"""
+        response = await self._acomplete(
+            kind, prompt, max_tokens=max_tokens, **self._structured_kwargs(schema_model, tool_name, description)
+        )
+        return self._parse_structured_response(response, schema_model, kind)
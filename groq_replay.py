@@ -0,0 +1,171 @@
+"""
+Offline stand-in for the Groq client that replays recorded completions.
+
+ReplayGroq and AsyncReplayGroq answer chat.completions.create like groq.Groq
+and groq.AsyncGroq do, with the same response shape (choices, tool_calls,
+usage), from a recordings file holding one completion per request kind. The
+kind is inferred from the request the way GroqUMLClient builds it, and the
+answer arrives after a simulated delay: time to first token plus completion
+tokens at a fixed generation speed, with seeded jitter. An optional per-model
+request limit answers calls beyond it with a 429 carrying retry-after, as Groq
+does, to exercise the client's scheduling. install() swaps the
+replay clients in for the pooled ones in groq_client, so the app, workflow and
+validator run unmodified without an API key or network.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+
+import groq_client
+from incose_validator import EVALUATION_TOOL_NAME
+
+DEFAULT_RECORDINGS_PATH = "recorded_completions.json"
+
+# Tool names GroqUMLClient and INCOSEValidator force in structured output mode
+_TOOL_KINDS = {
+    groq_client.UML_TOOL_NAME: "uml",
+    groq_client.UML_OUTLINE_TOOL_NAME: "uml_outline",
+    groq_client.UML_PATCH_TOOL_NAME: "uml_patch",
+    EVALUATION_TOOL_NAME: "validation",
+}
+
+def request_kind(messages: list, tools: list = None) -> str:
+    """Which recorded completion answers a request: "uml", "uml_outline", "uml_patch" or "validation" """
+    if tools:
+        return _TOOL_KINDS.get(tools[0]["function"]["name"], "uml")
+    prompt = messages[-1]["content"]
+    if "<uml_outline>" in prompt:
+        return "uml_outline"
+    if "<uml_patch>" in prompt:
+        return "uml_patch"
+    if "INCOSE" in prompt:
+        return "validation"
+    return "uml"
+
+class ReplayRateLimitError(Exception):
+    """Shaped like groq.RateLimitError: status_code 429 and a response with headers"""
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Rate limit reached for model {model}; please try again in {retry_after:.2f}s")
+        self.status_code = 429
+        self.response = SimpleNamespace(headers={"retry-after": f"{retry_after:.3f}"})
+
+class ReplayCompletions:
+    """The chat.completions namespace of a replay client; shared by its sync and async front ends"""
+
+    def __init__(
+        self,
+        recordings_path: str = DEFAULT_RECORDINGS_PATH,
+        latency_seconds: float = 0.25,
+        tokens_per_second: float = 800.0,
+        jitter: float = 0.2,
+        seed: int = 0,
+        requests_per_minute: float = 0
+    ):
+        """
+        Args:
+            recordings_path (str): JSON object mapping each kind to {"content", "arguments",
+                "completion_tokens"}; "arguments" is the tool-call JSON for structured mode
+            latency_seconds (float): Simulated time to first token
+            tokens_per_second (float): Simulated generation speed; 0 returns after the first-token delay
+            jitter (float): Relative standard deviation of the delay (normal, clipped at zero)
+            seed (int): Seed of the jitter, so runs are repeatable
+            requests_per_minute (float): Calls accepted per model in any 60 s window; 0 accepts all
+        """
+        with open(recordings_path) as f:
+            self.recordings = json.load(f)
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.requests_per_minute = requests_per_minute
+        self._lock = threading.Lock()
+        self._accepted = defaultdict(deque)  # model -> start times of accepted calls in the window
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _admit(self, model: str):
+        if not self.requests_per_minute:
+            return
+        with self._lock:
+            now = time.monotonic()
+            accepted = self._accepted[model]
+            while accepted and accepted[0] <= now - 60.0:
+                accepted.popleft()
+            if len(accepted) >= self.requests_per_minute:
+                self.rate_limited += 1
+                raise ReplayRateLimitError(model, accepted[0] + 60.0 - now)
+            accepted.append(now)
+
+    def _delay(self, recording: dict) -> float:
+        delay = self.latency_seconds
+        if self.tokens_per_second > 0:
+            delay += recording.get("completion_tokens", 0) / self.tokens_per_second
+        with self._lock:
+            self.calls += 1
+            factor = self._random.gauss(1.0, self.jitter) if self.jitter else 1.0
+        return max(0.0, delay * factor)
+
+    def _response(self, messages: list, tools: list = None):
+        kind = request_kind(messages, tools)
+        recording = self.recordings[kind]
+        if tools:
+            function = SimpleNamespace(name=tools[0]["function"]["name"], arguments=recording["arguments"])
+            message = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(function=function)])
+        else:
+            message = SimpleNamespace(content=recording["content"], tool_calls=None)
+        usage = SimpleNamespace(
+            # Same ~4 characters per token the real tokenizer averages on English prompts
+            prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+            completion_tokens=recording.get("completion_tokens", 0)
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage), recording
+
+    def create(self, messages: list, model: str = "", tools: list = None, stream: bool = False, **kwargs):
+        self._admit(model)
+        response, recording = self._response(messages, tools)
+        time.sleep(self._delay(recording))
+        return response
+
+    async def acreate(self, messages: list, model: str = "", tools: list = None, stream: bool = False, **kwargs):
+        self._admit(model)
+        response, recording = self._response(messages, tools)
+        delay = self._delay(recording)
+        if stream:
+            return self._stream(response.choices[0].message.content or "", delay)
+        await asyncio.sleep(delay)
+        return response
+
+    async def _stream(self, content: str, delay: float, pieces: int = 20):
+        # The first-token delay up front, the rest spread over the chunks
+        first = min(delay, self.latency_seconds)
+        await asyncio.sleep(first)
+        size = max(1, len(content) // pieces)
+        chunks = [content[i:i + size] for i in range(0, len(content), size)]
+        for chunk in chunks:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+            await asyncio.sleep((delay - first) / len(chunks))
+
+class ReplayGroq:
+    """Drop-in for groq.Groq: client.chat.completions.create(...)"""
+
+    def __init__(self, completions: ReplayCompletions):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=completions.create))
+
+class AsyncReplayGroq:
+    """Drop-in for groq.AsyncGroq: await client.chat.completions.create(...)"""
+
+    def __init__(self, completions: ReplayCompletions):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=completions.acreate))
+
+def install(completions: ReplayCompletions) -> ReplayCompletions:
+    """Make every GroqUMLClient use the replay clients instead of the pooled Groq clients"""
+    sync_client = ReplayGroq(completions)
+    async_client = AsyncReplayGroq(completions)
+    groq_client.get_groq_client = lambda: sync_client
+    groq_client.get_async_groq_client = lambda: async_client
+    return completions
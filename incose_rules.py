@@ -0,0 +1,163 @@
+"""
+Deterministic pre-screen for INCOSE Guide to Writing Requirements rules.
+
+Rules that can be checked mechanically (missing "shall", vague terms, escape
+clauses, "and/or", TBDs, passive voice, numbers without units, compound
+requirements...) are compiled into one combined regular expression, so a
+requirement is scanned once in microseconds. Requirements that clearly break
+the rules get a result without an LLM call; everything else is inconclusive and
+goes on to the full evaluation.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+@dataclass(frozen=True)
+class Rule:
+    rule_id: str
+    criterion: str  # Analysis criterion the rule reports under
+    penalty: int
+    issue: str
+    suggestion: str
+    pattern: str = ""  # Alternatives matched by the combined scanner; empty for derived rules
+
+def _words(*terms: str) -> str:
+    return r"\b(?:" + "|".join(re.escape(term).replace(r"\ ", r"\s+") for term in terms) + r")\b"
+
+UNITS = (
+    "ms", "s", "sec", "secs", "second", "seconds", "min", "mins", "minute", "minutes", "h", "hr", "hrs",
+    "hour", "hours", "day", "days", "week", "weeks", "month", "months", "year", "years",
+    "mm", "cm", "m", "km", "ft", "in", "mi", "nm", "g", "kg", "t", "lb", "lbs", "n", "kn", "pa", "kpa",
+    "mpa", "bar", "psi", "v", "kv", "mv", "a", "ma", "w", "kw", "mw", "wh", "kwh", "hz", "khz", "mhz",
+    "ghz", "b", "kb", "mb", "gb", "tb", "bps", "kbps", "mbps", "gbps", "c", "k", "f", "db", "lux",
+    "rpm", "l", "ml", "percent", "degrees", "times", "users", "requests", "transactions", "items",
+)
+
+RULES = [
+    Rule("missing_shall", "validity", 45,
+         "Does not state a binding obligation with shall",
+         "Rewrite as: The <entity> shall <action>"),
+    Rule("weak_modal", "validity", 10,
+         "Uses a non-binding modal verb (should, will, may, must, can)",
+         "Use shall for requirements and reserve will for statements of fact",
+         _words("should", "will", "may", "must", "can", "might", "could")),
+    Rule("vague_terms", "clarity", 20,
+         "Contains vague or unverifiable terms",
+         "Replace vague adjectives with measurable criteria",
+         _words("user friendly", "user-friendly", "easy", "easily", "simple", "fast", "quick", "quickly",
+                "efficient", "efficiently", "adequate", "appropriate", "sufficient", "reasonable",
+                "robust", "flexible", "intuitive", "seamless", "seamlessly", "state-of-the-art",
+                "approximately", "several", "some", "many", "few", "various", "normal",
+                "typical", "significant", "acceptable", "reliable", "secure", "maintainable",
+                "scalable", "minimize", "maximize", "optimize")),
+    Rule("escape_clause", "verifiability", 20,
+         "Contains an escape clause that makes compliance optional",
+         "Remove clauses such as if possible or as appropriate",
+         _words("if possible", "as possible", "as appropriate", "where applicable", "if applicable",
+                "as necessary", "if necessary", "as required", "to the extent", "where practical",
+                "if practical", "as far as possible")),
+    Rule("open_ended", "completeness", 15,
+         "Contains an open-ended list",
+         "Enumerate every item instead of using etc. or including but not limited to",
+         r"\betc\b\.?|\band\s+so\s+on\b|\bincluding\s+but\s+not\s+limited\s+to\b|\bsuch\s+as\b"),
+    Rule("and_or", "clarity", 20,
+         "Uses and/or, which allows two readings",
+         "State whether both or either condition applies",
+         r"\band\s*/\s*or\b"),
+    Rule("unresolved_tbd", "completeness", 30,
+         "Contains an unresolved TBD/TBC/TBR placeholder",
+         "Resolve the placeholder or track it as an open issue before baselining",
+         r"\bTB[DCR]\b"),
+    Rule("passive_voice", "clarity", 10,
+         "Uses passive voice, hiding the responsible entity",
+         "Use active voice with the responsible entity as the subject",
+         r"\bshall\s+be\s+(?!able\b|capable\b)\w+(?:ed|en)\b(?!\s+by\b)"),
+    Rule("superfluous_infinitive", "clarity", 5,
+         "Uses a superfluous infinitive (be able to, be capable of)",
+         "State the capability directly: The <entity> shall <action>",
+         r"\bshall\s+(?:be\s+able\s+to|be\s+capable\s+of)\b"),
+    Rule("negative", "verifiability", 5,
+         "States what the system shall not do, which is hard to verify",
+         "State the required behaviour positively where possible",
+         r"\bshall\s+not\b|\bshall\s+never\b"),
+    Rule("absolute", "feasibility", 10,
+         "Uses an absolute that cannot be achieved or verified",
+         "Replace absolutes such as always, never or 100% with a bounded tolerance",
+         _words("always", "never", "all times", "every time", "completely", "totally", "infinite",
+                "instantaneous", "instantaneously", "zero downtime") + r"|\b100\s*%"),
+    Rule("missing_unit", "verifiability", 15,
+         "States a quantity without a unit of measure",
+         "Give every quantity a unit and, where relevant, a tolerance",
+         # (?<!\d[.,]) and (?!\d|[.,]\d) keep the number whole: otherwise the match backtracks a digit
+         # ("1.5 kHz" -> "1") or starts mid-number ("2.0" -> "0") and the unit lookahead passes.
+         # Version numbers are identifiers, not quantities.
+         r"(?<![\w\-])(?<!\d[.,])(?<!\bversion\s)(?<!\brelease\s)\d+(?:[.,]\d+)*(?!\d|[.,]\d)"
+         r"(?!\s*(?:%|°|[\-/])|\s*(?:" + "|".join(UNITS) + r")\b)"),
+    Rule("compound", "validity", 20,
+         "States more than one requirement",
+         "Split into one requirement per shall statement"),
+]
+
+# One alternation with a named group per rule, plus a bare "shall" last so the rules that
+# start with "shall" win at that position and it is still counted in the same pass
+_SCANNER = re.compile(
+    "|".join([
+        f"(?P<{rule.rule_id}>{rule.pattern})" for rule in RULES if rule.pattern
+    ] + [r"(?P<shall>\bshall\b)"]),
+    re.IGNORECASE
+)
+# Rules whose match consumes the "shall", so it is counted through them
+_CONTAINS_SHALL = frozenset({"shall", "passive_voice", "superfluous_infinitive", "negative"})
+
+@dataclass
+class RuleScreen:
+    score: float
+    violations: List[Rule] = field(default_factory=list)
+
+    @property
+    def rule_ids(self) -> List[str]:
+        return [rule.rule_id for rule in self.violations]
+
+def screen_requirement(text: str) -> RuleScreen:
+    """Scan a requirement once and score it against every rule"""
+    found = set()
+    shall_count = 0
+    for match in _SCANNER.finditer(text):
+        name = match.lastgroup
+        if name in _CONTAINS_SHALL:
+            shall_count += 1
+        if name != "shall":
+            found.add(name)
+    if shall_count == 0:
+        found.add("missing_shall")
+    else:
+        # A modal alongside shall (e.g. "shall ... can") is not the binding verb
+        found.discard("weak_modal")
+    if shall_count > 1:
+        found.add("compound")
+    violations = [rule for rule in RULES if rule.rule_id in found]
+    score = max(0.0, 100.0 - sum(rule.penalty for rule in violations))
+    return RuleScreen(score=score, violations=violations)
+
+class RuleScreenStats:
+    """Counts how often the pre-screen answered without the LLM"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {"fast_path": 0, "inconclusive": 0, "deep_review": 0}
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        counts["total"] = total
+        counts["fast_path_share"] = counts["fast_path"] / total if total else 0.0
+        return counts
+
+rule_screen_stats = RuleScreenStats()
@@ -3,16 +3,90 @@ INCOSE Standards Requirement Validator
 Validates requirements against INCOSE (International Council on Systems Engineering) standards.
 """
 
-import json
+import copy
+import asyncio
 import re
-import torch
-from typing import List, Dict
+import time
+import numpy as np
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from dataclasses import dataclass
+from pydantic import BaseModel, Field
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 
-from groq_client import GroqUMLClient
+from config import (
+    INCOSE_PERSIST_DIR, EMBEDDING_BACKEND, VECTOR_BACKEND, NUMPY_INDEX_DIR,
+    INCOSE_CHUNKS_PATH, HYBRID_RETRIEVAL, BM25_INDEX_PATH, RRF_K,
+    BATCH_MAX_CONCURRENCY, BATCH_REQUESTS_PER_MINUTE,
+    RULE_SCREEN_ENABLED, RULE_SCREEN_INVALID_BELOW
+)
+from groq_client import GroqUMLClient, StructuredOutputError
+from bm25_index import BM25Index, index_path, reciprocal_rank_fusion
+from encoders import CachedEncoder, load_encoder
+from incose_rules import RuleScreen, rule_screen_stats, screen_requirement
+from lazy_imports import timed_import
+from lenient_json import parse_lenient_json
+from metrics import timed
+from numpy_index import NumpyVectorIndex
+from parse_stats import record_parse
+from prompt_builder import compress_context, count_tokens, max_output_tokens, record_prompt
+from rate_limit import AsyncRateLimiter
+from validation_cache import SemanticValidationCache, normalize_requirement
+
+# Used when the vector store is unavailable or retrieval fails
+BASIC_INCOSE_CONTEXT = "INCOSE standards emphasize that requirements should be clear, complete, consistent, verifiable, and traceable. Requirements should be necessary, implementation-free, and attainable."
+
+_SCORE_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+# Patterns for free-text responses the JSON scanner could not read, compiled once
+_FALLBACK_SCORE_PATTERNS = [
+    re.compile(r'score[:\s]*(\d+)'),
+    re.compile(r'(\d+)\s*(?:out of|/)\s*100'),
+    re.compile(r'(\d+)%'),
+    re.compile(r'rating[:\s]*(\d+)')
+]
+_FALLBACK_ISSUE_PATTERNS = [
+    re.compile(r'issues?[:\s]*([^.]+\.)', re.IGNORECASE),
+    re.compile(r'problems?[:\s]*([^.]+\.)', re.IGNORECASE),
+    re.compile(r'concerns?[:\s]*([^.]+\.)', re.IGNORECASE),
+    re.compile(r'lacks?[:\s]*([^.]+\.)', re.IGNORECASE)
+]
+_FALLBACK_SUGGESTION_PATTERNS = [
+    re.compile(r'suggest[^.]*[:\s]*([^.]+\.)', re.IGNORECASE),
+    re.compile(r'recommend[^.]*[:\s]*([^.]+\.)', re.IGNORECASE),
+    re.compile(r'should[:\s]*([^.]+\.)', re.IGNORECASE),
+    re.compile(r'improvement[^.]*[:\s]*([^.]+\.)', re.IGNORECASE)
+]
+
+def _coerce_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "valid")
+    return bool(value)
+
+def _coerce_score(value) -> float:
+    """Accept 85, "85", "85%" or "85/100" as a score"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _SCORE_NUMBER.search(str(value))
+    return float(match.group()) if match else 0.0
+
+class EvaluationAnalysis(BaseModel):
+    validity: str
+    clarity: str
+    completeness: str
+    feasibility: str
+    verifiability: str
+    traceability: str
+
+class EvaluationPayload(BaseModel):
+    """Schema the LLM fills in structured output mode"""
+    is_valid: bool
+    score: float = Field(ge=0, le=100)
+    issues: List[str] = Field(default_factory=list)
+    suggestions: List[str] = Field(default_factory=list)
+    detailed_reasoning: str
+    analysis: EvaluationAnalysis
+
+EVALUATION_TOOL_NAME = "submit_evaluation"
 
 @dataclass
 class ValidationResult:
@@ -22,275 +96,625 @@ class ValidationResult:
     suggestions: List[str]
     detailed_reasoning: str
     analysis: Dict[str, str] = None
+    error: Optional[str] = None  # Set when the result stands in for a failed evaluation
+    model: Optional[str] = None  # Groq model that evaluated it; None when the rule pre-screen answered
 
-class INCOSEValidator:
-    def __init__(self, groq_client: GroqUMLClient):
-        """Initialize the INCOSE validator with Groq client and vector database"""
-        self.groq_client = groq_client
-        
-        # Set up the vector database
-        persist_dir = "chroma_db_incose"
-        
-        # Set PyTorch environment variables to avoid meta tensor issues
-        import os
-        os.environ['PYTORCH_CUDA_ALLOC_CONF'] = 'max_split_size_mb:128'
-        os.environ['TOKENIZERS_PARALLELISM'] = 'false'
-        
-        # Set PyTorch to avoid meta tensor issues
-        torch.set_default_dtype(torch.float32)
+@dataclass
+class IncoseStore:
+    """Embedding model and INCOSE vector store, loaded once and shared by validators"""
+    embedding_model: object = None
+    vectorstore: object = None
+    index: Optional[NumpyVectorIndex] = None  # Set instead of vectorstore for the numpy backend
+    bm25: Optional[BM25Index] = None  # Lexical index fused with vector results when HYBRID_RETRIEVAL is on
+
+    @property
+    def has_retrieval(self) -> bool:
+        return self.vectorstore is not None or self.index is not None
+
+    @classmethod
+    def load(
+        cls,
+        persist_dir: str = INCOSE_PERSIST_DIR,
+        backend: str = VECTOR_BACKEND,
+        index_dir: str = NUMPY_INDEX_DIR,
+        encoder_backend: str = EMBEDDING_BACKEND
+    ) -> "IncoseStore":
+        """
+        Load the embedding model and open the configured vector backend
         
+        Args:
+            persist_dir (str): Chroma persist directory
+            backend (str): "chroma", or "numpy" for the memory-mapped exact index
+            index_dir (str): NumpyVectorIndex directory; exported from the Chroma
+                store when it does not exist yet
+            encoder_backend (str): "torch", "onnx" or "onnx-int8", see encoders.py
+        """
+        bm25 = cls._load_bm25(index_path(persist_dir, BM25_INDEX_PATH)) if HYBRID_RETRIEVAL else None
         try:
-            # Initialize HuggingFace embeddings with device mapping fix
-            embedding_model = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={
-                    'device': 'cpu',
-                    'torch_dtype': torch.float32
-                },
-                encode_kwargs={'normalize_embeddings': True}
-            )
+            # Query embeddings are memoized; document embedding passes straight through
+            embedding_model = CachedEncoder(load_encoder(encoder_backend))
             
-            # Initialize Chroma vector store
-            self.vectorstore = Chroma(persist_directory=persist_dir, embedding_function=embedding_model)
+            if backend == "numpy" and NumpyVectorIndex.exists(index_dir):
+                index = NumpyVectorIndex.load(index_dir)
+                print(f"✅ INCOSE numpy index loaded ({len(index)} chunks)")
+                return cls(embedding_model=embedding_model, index=index, bm25=bm25)
             
-            # Set up retriever
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="mmr",
-                search_kwargs={"k": 5}  # Get top 5 most relevant chunks
-            )
+            # Initialize Chroma vector store; chromadb is only imported when this backend is used
+            Chroma = timed_import("langchain_community.vectorstores").Chroma
+            vectorstore = Chroma(persist_directory=persist_dir, embedding_function=embedding_model)
+            
+            if backend == "numpy":
+                index = NumpyVectorIndex.from_chroma(vectorstore, index_dir)
+                print(f"✅ INCOSE numpy index exported to {index_dir} ({len(index)} chunks)")
+                return cls(embedding_model=embedding_model, index=index, bm25=bm25)
             
             print("✅ INCOSE vector database initialized successfully")
+            return cls(embedding_model=embedding_model, vectorstore=vectorstore, bm25=bm25)
             
         except Exception as e:
             print(f"❌ Failed to initialize embeddings: {e}")
             print("⚠️  Falling back to basic validation without vector search")
-            self.vectorstore = None
+            return cls(bm25=bm25)
+
+    @staticmethod
+    def _load_bm25(bm25_path: str) -> Optional[BM25Index]:
+        # A failed save is handled inside load_or_build; this only catches a missing or unreadable chunks file
+        try:
+            return BM25Index.load_or_build(INCOSE_CHUNKS_PATH, bm25_path)
+        except Exception as e:
+            print(f"⚠️  BM25 index unavailable, using vector retrieval only: {e}")
+            return None
+
+class INCOSEValidator:
+    # Bump whenever the evaluation prompt changes; cached results from older prompts are dropped
+    PROMPT_VERSION = "3"
+
+    def __init__(
+        self,
+        groq_client: GroqUMLClient,
+        store: IncoseStore = None,
+        result_cache: SemanticValidationCache = None
+    ):
+        """
+        Initialize the INCOSE validator with Groq client and vector database
+        
+        Args:
+            groq_client (GroqUMLClient): Client used for the LLM evaluation
+            store (IncoseStore): Preloaded embedding model and vector store. When omitted
+                the store is loaded here, which takes seconds; prefer the shared
+                instance from validator_registry in long-running processes.
+            result_cache (SemanticValidationCache): Optional near-duplicate cache of
+                earlier results for the same model
+        """
+        self.groq_client = groq_client
+        self.result_cache = result_cache
+        self.store = store if store is not None else IncoseStore.load()
+        self.vectorstore = self.store.vectorstore
+        
+        if self.vectorstore is not None:
+            # Set up retriever
+            self.retriever = self.vectorstore.as_retriever(
+                search_type="mmr",
+                search_kwargs={"k": 5}  # Get top 5 most relevant chunks
+            )
+        else:
             self.retriever = None
 
-    def validate_requirement(self, requirement_text: str) -> ValidationResult:
+    def validate_requirement(self, requirement_text: str, deep_review: bool = False) -> ValidationResult:
         """
         Validate a requirement against INCOSE standards
         
         Args:
             requirement_text (str): The requirement text to validate
+            deep_review (bool): Always run the LLM evaluation, even when the rule
+                pre-screen alone can reject the requirement
             
         Returns:
             ValidationResult: The validation result with score, issues, and suggestions
         """
         try:
+            screened = self._prescreen(requirement_text, deep_review)
+            if screened is not None:
+                return screened
+            
+            # Embed once; the vector serves both the cache lookup and retrieval
+            embedding = self._embed_requirement(requirement_text)
+            cached = self._cache_lookup(requirement_text, embedding)
+            if cached is not None:
+                return cached
+            
             # Get relevant INCOSE context
-            context = self._get_relevant_context(requirement_text)
+            context = self._get_relevant_context(requirement_text, embedding)
             
             # Use LLM to evaluate the requirement
             result = self._evaluate_with_llm(requirement_text, context)
             
+            self._cache_store(requirement_text, result, embedding)
             return result
             
         except Exception as e:
-            print(f"Error validating requirement: {e}")
-            return ValidationResult(
-                is_valid=False,
-                score=0.0,
-                issues=[f"Validation failed: {str(e)}"],
-                suggestions=["Please check the requirement format and try again"],
-                detailed_reasoning=f"An error occurred during validation: {str(e)}",
-                analysis={}
-            )
+            return self._validation_error_result(e)
 
-    def _get_relevant_context(self, requirement_text: str) -> str:
-        """Get relevant INCOSE context for the requirement"""
+    async def avalidate_requirement(self, requirement_text: str, deep_review: bool = False) -> ValidationResult:
+        """
+        Async variant of validate_requirement
+        
+        Embedding and retrieval run on the CPU, so they go to the default
+        executor; the LLM call awaits the pooled AsyncGroq client.
+        """
         try:
-            # Check if vectorstore is available
-            if not self.retriever:
-                return "INCOSE standards emphasize that requirements should be clear, complete, consistent, verifiable, and traceable. Requirements should be necessary, implementation-free, and attainable."
+            screened = self._prescreen(requirement_text, deep_review)
+            if screened is not None:
+                return screened
             
-            # Use the retriever to get relevant documents
-            relevant_docs = self.retriever.get_relevant_documents(requirement_text)
+            loop = asyncio.get_running_loop()
+            embedding = await loop.run_in_executor(None, self._embed_requirement, requirement_text)
+            cached = self._cache_lookup(requirement_text, embedding)
+            if cached is not None:
+                return cached
             
-            # Combine the relevant documents into context
-            context_parts = []
-            for doc in relevant_docs:
-                context_parts.append(doc.page_content)
+            context = await loop.run_in_executor(
+                None, self._get_relevant_context, requirement_text, embedding
+            )
+            result = await self._aevaluate_with_llm(requirement_text, context)
             
-            context = "\n\n".join(context_parts)
-            return context[:2000]  # Limit context length to avoid token limits
+            self._cache_store(requirement_text, result, embedding)
+            return result
             
+        except Exception as e:
+            return self._validation_error_result(e)
+
+    def validate_many(
+        self,
+        requirement_texts: List[str],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        requests_per_minute: float = BATCH_REQUESTS_PER_MINUTE,
+        deep_review: bool = False
+    ) -> List[ValidationResult]:
+        """Synchronous wrapper around avalidate_many for scripts and notebooks"""
+        return asyncio.run(
+            self.avalidate_many(requirement_texts, max_concurrency, requests_per_minute, deep_review)
+        )
+
+    async def avalidate_many(
+        self,
+        requirement_texts: List[str],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        requests_per_minute: float = BATCH_REQUESTS_PER_MINUTE,
+        deep_review: bool = False
+    ) -> List[ValidationResult]:
+        """
+        Validate many requirements in one pass
+        
+        Args:
+            requirement_texts (List[str]): Requirements to validate
+            max_concurrency (int): Maximum LLM calls in flight at once
+            requests_per_minute (float): LLM call starts allowed per minute; 0 disables pacing
+            deep_review (bool): Send every requirement to the LLM, skipping the rule fast path
+            
+        Returns:
+            List[ValidationResult]: One result per requirement, in input order. A failed
+                item carries its error in ValidationResult.error instead of failing the batch.
+        """
+        results: List[Optional[ValidationResult]] = [None] * len(requirement_texts)
+        async for index, result in self.aiter_validate_many(
+            requirement_texts, max_concurrency, requests_per_minute, deep_review
+        ):
+            results[index] = result
+        return results
+
+    async def aiter_validate_many(
+        self,
+        requirement_texts: List[str],
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        requests_per_minute: float = BATCH_REQUESTS_PER_MINUTE,
+        deep_review: bool = False
+    ) -> AsyncIterator[Tuple[int, ValidationResult]]:
+        """
+        Validate many requirements, yielding (index, result) pairs as each one finishes
+        
+        All requirements are embedded in one vectorized call and retrieved with one
+        vector store query. Duplicates within the batch share one evaluation, and
+        the LLM calls run concurrently under the given concurrency and rate limits.
+        Rule pre-screen rejections and cached results are yielded first. Closing the
+        iterator early cancels the evaluations that have not finished.
+        """
+        loop = asyncio.get_running_loop()
+        
+        # Group duplicates so each distinct requirement is evaluated once
+        groups: Dict[str, List[int]] = {}
+        for index, text in enumerate(requirement_texts):
+            groups.setdefault(normalize_requirement(text), []).append(index)
+        group_indexes = list(groups.values())
+        unique_texts = [requirement_texts[indexes[0]] for indexes in group_indexes]
+        
+        def fan_out(position: int, result: ValidationResult):
+            indexes = group_indexes[position]
+            yield indexes[0], result
+            for index in indexes[1:]:
+                yield index, copy.deepcopy(result)
+        
+        screened_out = []
+        remaining = []
+        for position, text in enumerate(unique_texts):
+            screened = self._prescreen(text, deep_review)
+            if screened is not None:
+                screened_out.append((position, screened))
+            else:
+                remaining.append(position)
+        for position, screened in screened_out:
+            for item in fan_out(position, screened):
+                yield item
+        
+        embeddings = [None] * len(unique_texts)
+        remaining_embeddings = await loop.run_in_executor(
+            None, self._embed_requirements, [unique_texts[p] for p in remaining]
+        )
+        for position, embedding in zip(remaining, remaining_embeddings):
+            embeddings[position] = embedding
+        
+        pending = []
+        for position in remaining:
+            text = unique_texts[position]
+            cached = self._cache_lookup(text, embeddings[position])
+            if cached is not None:
+                for item in fan_out(position, cached):
+                    yield item
+            else:
+                pending.append(position)
+        
+        contexts = await loop.run_in_executor(
+            None,
+            self._get_relevant_contexts,
+            [unique_texts[p] for p in pending],
+            [embeddings[p] for p in pending]
+        )
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        limiter = AsyncRateLimiter(requests_per_minute)
+        
+        async def evaluate(position: int, context: str) -> Tuple[int, ValidationResult]:
+            text = unique_texts[position]
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    result = await self._aevaluate_with_llm(text, context)
+                except Exception as e:
+                    result = self._validation_error_result(e)
+            self._cache_store(text, result, embeddings[position])
+            return position, result
+        
+        tasks = [asyncio.ensure_future(evaluate(p, c)) for p, c in zip(pending, contexts)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                position, result = await finished
+                for item in fan_out(position, result):
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _prescreen(self, requirement_text: str, deep_review: bool) -> Optional[ValidationResult]:
+        """Answer from the deterministic rule screen when it clearly fails, else None"""
+        if not RULE_SCREEN_ENABLED:
+            return None
+        if deep_review:
+            rule_screen_stats.record("deep_review")
+            return None
+        with timed("validation.prescreen"):
+            screen = screen_requirement(requirement_text)
+        if screen.score >= RULE_SCREEN_INVALID_BELOW:
+            rule_screen_stats.record("inconclusive")
+            return None
+        rule_screen_stats.record("fast_path")
+        return self._result_from_screen(screen)
+
+    def _result_from_screen(self, screen: RuleScreen) -> ValidationResult:
+        analysis = {}
+        for rule in screen.violations:
+            # Several rules can land on one criterion; report the first, most severe by rule order
+            analysis.setdefault(rule.criterion, f"Fails rule pre-screen - {rule.issue}")
+        for criterion in ("validity", "clarity", "completeness", "feasibility", "verifiability", "traceability"):
+            analysis.setdefault(criterion, "Not assessed - rule pre-screen only")
+        return ValidationResult(
+            is_valid=False,
+            score=screen.score,
+            issues=[rule.issue for rule in screen.violations][:5],
+            suggestions=[rule.suggestion for rule in screen.violations][:5],
+            detailed_reasoning=(
+                f"Rejected by the INCOSE writing-rule pre-screen ({', '.join(screen.rule_ids)}). "
+                "Fix these issues first, or request a deep review for a full LLM evaluation."
+            ),
+            analysis=analysis
+        )
+
+    def _embed_requirements(self, requirement_texts: List[str]) -> List:
+        """Embed many requirements in one call; entries are None when embedding is unavailable"""
+        if self.store.embedding_model is None or not requirement_texts:
+            return [None] * len(requirement_texts)
+        try:
+            with timed("validation.embed"):
+                return self.store.embedding_model.embed_queries(requirement_texts)
+        except Exception as e:
+            print(f"Error embedding requirements: {e}")
+            return [None] * len(requirement_texts)
+
+    def _validation_error_result(self, e: Exception) -> ValidationResult:
+        print(f"Error validating requirement: {e}")
+        return ValidationResult(
+            is_valid=False,
+            score=0.0,
+            issues=[f"Validation failed: {str(e)}"],
+            suggestions=["Please check the requirement format and try again"],
+            detailed_reasoning=f"An error occurred during validation: {str(e)}",
+            analysis={},
+            error=str(e)
+        )
+
+    def _embed_requirement(self, requirement_text: str):
+        """Embed the requirement with the shared model, or None when it is unavailable"""
+        if self.store.embedding_model is None:
+            return None
+        try:
+            with timed("validation.embed"):
+                return self.store.embedding_model.embed_query(requirement_text)
+        except Exception as e:
+            print(f"Error embedding requirement: {e}")
+            return None
+
+    def _cache_lookup(self, requirement_text: str, embedding) -> Optional[ValidationResult]:
+        if self.result_cache is None:
+            return None
+        self.result_cache.ensure_prompt_version(self.PROMPT_VERSION)
+        return self.result_cache.lookup(requirement_text, embedding)
+
+    def _cache_store(self, requirement_text: str, result: ValidationResult, embedding):
+        # Failed evaluations are not cached so the next submission retries the LLM, and neither are
+        # evaluations a fallback model made, which must not be served as this validator's model's
+        if self.result_cache is None or result.error is not None:
+            return
+        if result.model is not None and result.model != self.groq_client.model:
+            return
+        self.result_cache.store(requirement_text, result, embedding)
+
+    def _get_relevant_context(self, requirement_text: str, embedding=None) -> str:
+        """Get relevant INCOSE context for the requirement, reusing its embedding when given"""
+        try:
+            with timed("validation.retrieve"):
+                vector_chunks = self._vector_chunks(requirement_text, embedding)
         except Exception as e:
             print(f"Error getting context: {e}")
-            return "INCOSE standards emphasize that requirements should be clear, complete, consistent, verifiable, and traceable. Requirements should be necessary, implementation-free, and attainable."
+            vector_chunks = []
+        return self._format_context(requirement_text, self._fuse(requirement_text, vector_chunks))
+
+    def _vector_chunks(self, requirement_text: str, embedding=None) -> List[str]:
+        """MMR-selected chunks from the vector backend, or [] when it is unavailable"""
+        if self.store.index is not None:
+            if embedding is None:
+                embedding = self._embed_requirement(requirement_text)
+            if embedding is None:
+                return []
+            return self.store.index.mmr_search([embedding], k=5)[0]
+        
+        # Check if vectorstore is available
+        if not self.retriever:
+            return []
+        
+        # Use the retriever to get relevant documents
+        if embedding is not None:
+            relevant_docs = self.vectorstore.max_marginal_relevance_search_by_vector(embedding, k=5)
+        else:
+            relevant_docs = self.retriever.get_relevant_documents(requirement_text)
+        return [doc.page_content for doc in relevant_docs]
+
+    def _fuse(self, requirement_text: str, vector_chunks: List[str]) -> List[str]:
+        """Merge vector chunks with BM25 chunks by reciprocal rank, best first"""
+        if self.store.bm25 is None:
+            return vector_chunks
+        with timed("validation.bm25"):
+            lexical_chunks = self.store.bm25.search(requirement_text, k=5)
+        return reciprocal_rank_fusion([vector_chunks, lexical_chunks], k=RRF_K)[:5]
+
+    def _get_relevant_contexts(self, requirement_texts: List[str], embeddings: List) -> List[str]:
+        """
+        Get context for many requirements with a single vector store query
+        
+        Fetches the MMR candidate pool for every embedding in one Chroma call,
+        then runs the MMR selection per requirement on the returned vectors.
+        """
+        if not requirement_texts:
+            return []
+        if self.store.index is not None and all(embedding is not None for embedding in embeddings):
+            try:
+                # One matrix product and a vectorized MMR pass for the whole batch
+                with timed("validation.retrieve"):
+                    batch_chunks = self.store.index.mmr_search(embeddings, k=5)
+                return [
+                    self._format_context(text, self._fuse(text, chunks))
+                    for text, chunks in zip(requirement_texts, batch_chunks)
+                ]
+            except Exception as e:
+                print(f"Error getting batch context: {e}")
+                return [self._format_context(text, self._fuse(text, [])) for text in requirement_texts]
+        if not self.retriever or any(embedding is None for embedding in embeddings):
+            return [self._get_relevant_context(text) for text in requirement_texts]
+        try:
+            maximal_marginal_relevance = timed_import(
+                "langchain_community.vectorstores.utils"
+            ).maximal_marginal_relevance
+            with timed("validation.retrieve"):
+                results = self.vectorstore._collection.query(
+                    query_embeddings=[list(embedding) for embedding in embeddings],
+                    n_results=20,  # Same candidate pool as the retriever's MMR fetch_k
+                    include=["documents", "embeddings"]
+                )
+            contexts = []
+            for text, embedding, documents, document_embeddings in zip(
+                requirement_texts, embeddings, results["documents"], results["embeddings"]
+            ):
+                selected = maximal_marginal_relevance(
+                    np.array(embedding, dtype=np.float32), document_embeddings, k=5
+                )
+                contexts.append(self._format_context(text, self._fuse(text, [documents[i] for i in selected])))
+            return contexts
+        except Exception as e:
+            print(f"Error getting batch context: {e}")
+            return [
+                self._get_relevant_context(text, embedding)
+                for text, embedding in zip(requirement_texts, embeddings)
+            ]
+
+    def _format_context(self, requirement_text: str, chunks: List[str]) -> str:
+        # Only the deduplicated sentences relevant to the requirement, within the model's token budget
+        with timed("validation.compress_context", self.groq_client.model):
+            return compress_context(requirement_text, chunks, self.groq_client.model) or BASIC_INCOSE_CONTEXT
 
     def _evaluate_with_llm(self, requirement_text: str, context: str) -> ValidationResult:
         """Use the LLM to evaluate the requirement"""
-        
+        result = self._evaluate_with_llm_untagged(requirement_text, context)
+        result.model = self.groq_client.served_model
+        return result
+
+    def _evaluate_with_llm_untagged(self, requirement_text: str, context: str) -> ValidationResult:
+        prompt = self._build_evaluation_prompt(requirement_text, context)
+        max_tokens = max_output_tokens(self.groq_client.model)
+        started = time.perf_counter()
+        try:
+            if self.groq_client.structured:
+                try:
+                    payload = self.groq_client.make_structured_request(
+                        prompt, EvaluationPayload, EVALUATION_TOOL_NAME,
+                        "Submit the INCOSE evaluation", max_tokens=max_tokens, kind="validation"
+                    )
+                    return self._result_from_data(payload.model_dump())
+                except StructuredOutputError as e:
+                    return self._repair_structured_output(e)
+            response_content = self.groq_client._make_request(prompt, max_tokens=max_tokens)
+            if not response_content.strip():
+                raise ValueError("Empty response from the LLM")
+            return self._parse_evaluation_response(response_content)
+        except Exception as e:
+            return self._llm_error_result(e)
+        finally:
+            self._record_prompt(prompt, started)
+
+    async def _aevaluate_with_llm(self, requirement_text: str, context: str) -> ValidationResult:
+        """Async variant of _evaluate_with_llm"""
+        result = await self._aevaluate_with_llm_untagged(requirement_text, context)
+        result.model = self.groq_client.served_model
+        return result
+
+    async def _aevaluate_with_llm_untagged(self, requirement_text: str, context: str) -> ValidationResult:
+        prompt = self._build_evaluation_prompt(requirement_text, context)
+        max_tokens = max_output_tokens(self.groq_client.model)
+        started = time.perf_counter()
+        try:
+            if self.groq_client.structured:
+                try:
+                    payload = await self.groq_client.a_make_structured_request(
+                        prompt, EvaluationPayload, EVALUATION_TOOL_NAME,
+                        "Submit the INCOSE evaluation", max_tokens=max_tokens, kind="validation"
+                    )
+                    return self._result_from_data(payload.model_dump())
+                except StructuredOutputError as e:
+                    return self._repair_structured_output(e)
+            response_content = await self.groq_client.a_make_request(prompt, max_tokens=max_tokens)
+            if not response_content.strip():
+                raise ValueError("Empty response from the LLM")
+            return self._parse_evaluation_response(response_content)
+        except Exception as e:
+            return self._llm_error_result(e)
+        finally:
+            self._record_prompt(prompt, started)
+
+    def _record_prompt(self, prompt: str, started: float):
+        model = self.groq_client.served_model
+        record_prompt(model, count_tokens(prompt, model), time.perf_counter() - started)
+
+    def _build_evaluation_prompt(self, requirement_text: str, context: str) -> str:
+        """Build the INCOSE evaluation prompt for the LLM"""
         # Escape the requirement text to prevent JSON issues
         escaped_requirement = requirement_text.replace('"', '\\"').replace("'", "\\'")
         
-        prompt = f"""You are a systems engineering expert familiar with INCOSE standards.
+        return f"""You are a systems engineering expert. Evaluate the requirement against INCOSE standards.
 
-Context (INCOSE Standards):
+INCOSE guidance:
 {context}
 
-Requirement to Evaluate:
+Requirement:
 {escaped_requirement}
 
-Task: Evaluate this requirement against INCOSE standards using the following criteria:
-
-1. VALIDITY: Is the requirement valid according to INCOSE standards?
-2. CLARITY: Is the requirement clear and unambiguous?
-3. COMPLETENESS: Is the requirement complete and specific?
-4. FEASIBILITY: Is the requirement technically feasible and practical?
-5. VERIFIABILITY: Can the requirement be verified and tested?
-6. TRACEABILITY: Is the requirement traceable and consistent with system context?
-
-CRITICAL: You must respond with ONLY a valid JSON object. DO NOT include quotes within text values that would break JSON parsing.
-
-JSON format (use exactly this structure):
-{{
-    "is_valid": true,
-    "score": 85,
-    "issues": ["Issue one", "Issue two"],
-    "suggestions": ["Suggestion one", "Suggestion two"],
-    "detailed_reasoning": "Brief explanation without quotes",
-    "analysis": {{
-        "validity": "Valid/Invalid - reason",
-        "clarity": "Clear/Unclear - reason", 
-        "completeness": "Complete/Incomplete - reason",
-        "feasibility": "Feasible/Infeasible - reason",
-        "verifiability": "Verifiable/Unverifiable - reason",
-        "traceability": "Traceable/Untraceable - reason"
-    }}
-}}
-
-Rules:
-- Use only double quotes for JSON strings
-- Do not use single quotes or apostrophes in text values
-- Keep text values under 100 characters
-- Ensure the JSON is valid and parseable
-- Address all 6 criteria in the analysis section"""
+Assess validity, clarity, completeness, feasibility, verifiability and traceability.
+Respond with ONLY this JSON object, using double quotes, no apostrophes, and text values under 100 characters:
+{{"is_valid": true, "score": 85, "issues": ["..."], "suggestions": ["..."], "detailed_reasoning": "...",
+"analysis": {{"validity": "Valid/Invalid - reason", "clarity": "Clear/Unclear - reason",
+"completeness": "Complete/Incomplete - reason", "feasibility": "Feasible/Infeasible - reason",
+"verifiability": "Verifiable/Unverifiable - reason", "traceability": "Traceable/Untraceable - reason"}}}}"""
 
-        try:
-            # Use the existing Groq client with increased tokens for detailed analysis
-            response_content = self.groq_client._make_request(prompt, max_tokens=2000)
-            
-            # Clean the response content more thoroughly
-            response_content = response_content.strip()
-            
-            # Remove common formatting issues
-            response_content = response_content.replace('```json', '').replace('```', '').strip()
-            
-            # Fix common JSON issues
-            response_content = response_content.replace("'", '"')  # Replace single quotes with double quotes
-            response_content = response_content.replace('\\"', '"')  # Fix over-escaped quotes
-            
-            # Find JSON boundaries more precisely
-            start_brace = response_content.find('{')
-            end_brace = response_content.rfind('}')
-            
-            if start_brace != -1 and end_brace != -1 and end_brace > start_brace:
-                json_content = response_content[start_brace:end_brace + 1]
-            else:
-                json_content = response_content
-            
-            # Try to fix malformed JSON
-            json_content = self._fix_malformed_json(json_content)
-            
-            try:
-                # Try to parse as JSON
-                result_data = json.loads(json_content)
-                
-                # Validate and sanitize the data
-                is_valid = bool(result_data.get("is_valid", False))
-                score = max(0.0, min(100.0, float(result_data.get("score", 0.0))))
-                
-                issues = result_data.get("issues", [])
-                if not isinstance(issues, list):
-                    issues = [str(issues)] if issues else []
-                # Clean up issues - remove partial JSON artifacts and limit length
-                issues = [issue[:100] for issue in issues if isinstance(issue, str) and len(issue.strip()) > 0]
-                
-                suggestions = result_data.get("suggestions", [])
-                if not isinstance(suggestions, list):
-                    suggestions = [str(suggestions)] if suggestions else []
-                # Clean up suggestions - remove partial JSON artifacts and limit length
-                suggestions = [sugg[:100] for sugg in suggestions if isinstance(sugg, str) and len(sugg.strip()) > 0]
-                
-                detailed_reasoning = str(result_data.get("detailed_reasoning", "Analysis completed"))[:500]
-                
-                # Extract analysis if available
-                analysis = result_data.get("analysis", {})
-                if not isinstance(analysis, dict):
-                    analysis = {}
-                
-                return ValidationResult(
-                    is_valid=is_valid,
-                    score=score,
-                    issues=issues[:5],  # Limit to 5 issues
-                    suggestions=suggestions[:5],  # Limit to 5 suggestions
-                    detailed_reasoning=detailed_reasoning,
-                    analysis=analysis
-                )
-                
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing failed: {e}")
-                print(f"Cleaned JSON content: {json_content[:300]}...")
-                # Use enhanced fallback parsing
-                return self._parse_llm_response_enhanced_fallback(response_content)
-                
-        except Exception as e:
-            print(f"LLM evaluation error: {e}")
-            return ValidationResult(
-                is_valid=False,
-                score=0.0,
-                issues=[f"LLM evaluation failed: {str(e)}"],
-                suggestions=["Try again with a different model or check your API key"],
-                detailed_reasoning=f"Failed to get LLM response: {str(e)}"
-            )
+    def _parse_evaluation_response(self, response_content: str, record: bool = True) -> ValidationResult:
+        """Parse the raw LLM response into a ValidationResult"""
+        # One tolerant pass handles fences, stray quotes, unquoted values and truncation
+        with timed("parse.validation", self.groq_client.served_model):
+            result_data = parse_lenient_json(response_content)
+        parsed = isinstance(result_data, dict) and bool(result_data)
+        if record:
+            record_parse("validation", self.groq_client.served_model, "text", parsed)
+        if not parsed:
+            print(f"JSON parsing failed: {response_content[:300]}...")
+            # Use enhanced fallback parsing
+            return self._parse_llm_response_enhanced_fallback(response_content)
+        return self._result_from_data(result_data)
 
-    def _fix_malformed_json(self, json_content: str) -> str:
-        """Fix common JSON formatting issues from LLM responses"""
-        
-        # Step 1: Ensure property names are quoted
-        json_content = re.sub(r'(\w+):', r'"\1":', json_content)
-        
-        # Step 2: Fix quoted boolean and number values
-        json_content = re.sub(r':\s*"(true|false)"', r': \1', json_content)  # Fix quoted booleans
-        json_content = re.sub(r':\s*"(\d+(?:\.\d+)?)"', r': \1', json_content)  # Fix quoted numbers
+    def _repair_structured_output(self, e: StructuredOutputError) -> ValidationResult:
+        """Salvage a schema violation (already counted as a structured failure) with the text parser"""
+        print(f"Structured evaluation failed validation: {e}")
+        if not e.raw_output.strip():
+            raise ValueError("Empty response from the LLM")
+        return self._parse_evaluation_response(e.raw_output, record=False)
+
+    def _result_from_data(self, result_data: dict) -> ValidationResult:
+        """Validate and sanitize parsed response fields into a ValidationResult"""
+        is_valid = _coerce_bool(result_data.get("is_valid", False))
+        score = max(0.0, min(100.0, _coerce_score(result_data.get("score", 0.0))))
         
-        # Step 3: Fix unquoted string values (but not booleans/numbers)
-        json_content = re.sub(r':\s*([^",\[\]{}]\w[^",\[\]{}]*)', r': "\1"', json_content)
+        issues = result_data.get("issues", [])
+        if not isinstance(issues, list):
+            issues = [str(issues)] if issues else []
+        # Clean up issues - remove partial JSON artifacts and limit length
+        issues = [issue[:100] for issue in issues if isinstance(issue, str) and len(issue.strip()) > 0]
         
-        # Step 4: Fix arrays with unquoted strings
-        def fix_array_items(match):
-            array_content = match.group(1)
-            items = []
-            parts = array_content.split(',')
-            
-            for part in parts:
-                part = part.strip()
-                if not part:
-                    continue
-                # Don't quote if already quoted or if it's a number/boolean
-                if not (part.startswith('"') and part.endswith('"')) and not re.match(r'^(\d+(\.\d+)?|true|false|null)$', part):
-                    # Escape any internal quotes
-                    part = part.replace('"', '\\"')
-                    part = f'"{part}"'
-                items.append(part)
-            
-            return f"[{', '.join(items)}]"
+        suggestions = result_data.get("suggestions", [])
+        if not isinstance(suggestions, list):
+            suggestions = [str(suggestions)] if suggestions else []
+        # Clean up suggestions - remove partial JSON artifacts and limit length
+        suggestions = [sugg[:100] for sugg in suggestions if isinstance(sugg, str) and len(sugg.strip()) > 0]
         
-        json_content = re.sub(r'\[([^\]]*)\]', fix_array_items, json_content)
+        detailed_reasoning = str(result_data.get("detailed_reasoning", "Analysis completed"))[:500]
         
-        # Step 5: Fix unescaped quotes in string values
-        def fix_string_quotes(match):
-            content = match.group(1)
-            # Escape internal quotes
-            content = content.replace('"', '\\"')
-            return f'"{content}"'
+        # Extract analysis if available
+        analysis = result_data.get("analysis", {})
+        if not isinstance(analysis, dict):
+            analysis = {}
         
-        # This is a simple approach - find strings and escape internal quotes
-        # We need to be careful not to break the JSON structure
-        
-        return json_content
+        return ValidationResult(
+            is_valid=is_valid,
+            score=score,
+            issues=issues[:5],  # Limit to 5 issues
+            suggestions=suggestions[:5],  # Limit to 5 suggestions
+            detailed_reasoning=detailed_reasoning,
+            analysis=analysis
+        )
+
+    def _llm_error_result(self, e: Exception) -> ValidationResult:
+        print(f"LLM evaluation error: {e}")
+        return ValidationResult(
+            is_valid=False,
+            score=0.0,
+            issues=[f"LLM evaluation failed: {str(e)}"],
+            suggestions=["Try again with a different model or check your API key"],
+            detailed_reasoning=f"Failed to get LLM response: {str(e)}",
+            error=str(e)
+        )
 
     def _parse_llm_response_enhanced_fallback(self, response: str) -> ValidationResult:
         """Enhanced fallback parser for LLM responses that aren't in JSON format"""
@@ -315,15 +739,8 @@ Rules:
             score = 25.0
         
         # Look for score patterns
-        score_patterns = [
-            r'score[:\s]*(\d+)',
-            r'(\d+)\s*(?:out of|/)\s*100',
-            r'(\d+)%',
-            r'rating[:\s]*(\d+)'
-        ]
-        
-        for pattern in score_patterns:
-            score_match = re.search(pattern, response_lower)
+        for pattern in _FALLBACK_SCORE_PATTERNS:
+            score_match = pattern.search(response_lower)
             if score_match:
                 try:
                     extracted_score = float(score_match.group(1))
@@ -334,28 +751,14 @@ Rules:
                     continue
         
         # Extract issues
-        issues_patterns = [
-            r'issues?[:\s]*([^.]+\.)',
-            r'problems?[:\s]*([^.]+\.)',
-            r'concerns?[:\s]*([^.]+\.)',
-            r'lacks?[:\s]*([^.]+\.)'
-        ]
-        
-        for pattern in issues_patterns:
-            matches = re.findall(pattern, response, re.IGNORECASE)
+        for pattern in _FALLBACK_ISSUE_PATTERNS:
+            matches = pattern.findall(response)
             for match in matches[:3]:  # Limit to 3 issues
                 issues.append(match.strip())
         
         # Extract suggestions
-        suggestions_patterns = [
-            r'suggest[^.]*[:\s]*([^.]+\.)',
-            r'recommend[^.]*[:\s]*([^.]+\.)',
-            r'should[:\s]*([^.]+\.)',
-            r'improvement[^.]*[:\s]*([^.]+\.)'
-        ]
-        
-        for pattern in suggestions_patterns:
-            matches = re.findall(pattern, response, re.IGNORECASE)
+        for pattern in _FALLBACK_SUGGESTION_PATTERNS:
+            matches = pattern.findall(response)
             for match in matches[:3]:  # Limit to 3 suggestions
                 suggestions.append(match.strip())
         
@@ -0,0 +1,409 @@
+"""
+Persistent background job queue for work that outlasts an HTTP request.
+
+Jobs are rows in SQLite: a submission returns the job ID at once and a pool of
+asyncio workers claims queued jobs, highest priority first, oldest first within
+a priority. Results are written back to the same row. A dropped client
+connection therefore costs nothing, and finished results survive restarts.
+Several app processes may share one database. Claims run in an immediate
+transaction, and each worker heartbeats its running jobs, so a job whose
+process died is requeued once its lease lapses. Cancelling a running job stops
+it at its next await, in whichever process runs it. Store calls from the
+workers and the async endpoints run in threads: a claim can wait on another
+process's write lock, and that wait must not stall the event loop.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import (
+    JOBS_ENABLED, JOBS_SQLITE_PATH, JOB_WORKERS, JOB_POLL_SECONDS, JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS, JOB_RESULT_TTL_SECONDS
+)
+from metrics import STAGE_SECONDS, timed
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+# handler(payload, progress) returns the JSON-serializable result; progress(completed, total) reports headway
+Progress = Callable[[int, int], None]
+Handler = Callable[[dict, Progress], Awaitable[dict]]
+
+_COLUMNS = (
+    "id, kind, priority, status, payload, result, error, completed, total, attempts, "
+    "created_at, started_at, heartbeat_at, finished_at, expires_at"
+)
+
+class JobStore:
+    def __init__(self, sqlite_path: str, result_ttl_seconds: float = 86400):
+        """
+        Args:
+            sqlite_path (str): Database file; ":memory:" keeps jobs for this process only
+            result_ttl_seconds (float): Age after which finished jobs are deleted; 0 keeps them
+        """
+        self.result_ttl_seconds = result_ttl_seconds
+        self._lock = threading.Lock()
+        # Autocommit, so claims can open their own immediate transaction
+        self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        if sqlite_path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+            "payload TEXT NOT NULL, result TEXT, error TEXT, "
+            "completed INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+            "started_at REAL, heartbeat_at REAL, finished_at REAL, expires_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs(status, priority DESC, created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_expiry ON jobs(expires_at)")
+
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.result_ttl_seconds if self.result_ttl_seconds else None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def submit(self, kind: str, payload: dict, priority: int = 0, total: int = 0) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, priority, status, payload, total, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, priority, json.dumps(payload), total, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """The job, or None when it is unknown or its result has expired"""
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] < time.time()):
+            return None
+        return self._to_dict(row)
+
+    def claim(self) -> Optional[dict]:
+        """Mark the next queued job running and return it, or None when the queue is empty"""
+        now = time.time()
+        with self._lock:
+            # Immediate: another process cannot claim the same row between the SELECT and the UPDATE
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (now, now, row["id"])
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        job.update(status="running", started_at=now, heartbeat_at=now, attempts=job["attempts"] + 1)
+        return job
+
+    def progress(self, job_id: str, completed: int, total: int):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET completed = ?, total = ? WHERE id = ? AND status = 'running'",
+                (completed, total, job_id)
+            )
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Extend a running job's lease; False when it is no longer running (cancelled, or requeued after its lease lapsed)"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            )
+        return cursor.rowcount > 0
+
+    def finish(self, job_id: str, status: str, result: dict = None, error: str = None) -> bool:
+        """Record a running job's outcome; False when it was cancelled meanwhile"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, now, self._expires_at(now), job_id)
+            )
+        return cursor.rowcount > 0
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (now, self._expires_at(now), job_id)
+            )
+        return self.get(job_id)
+
+    def release(self, job_id: str):
+        """Put a running job back in the queue without counting the interrupted run"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL, "
+                "attempts = MAX(attempts - 1, 0) WHERE id = ? AND status = 'running'",
+                (job_id,)
+            )
+
+    def requeue_stale(self, lease_seconds: float, max_attempts: int) -> int:
+        """
+        Recover running jobs whose worker stopped heartbeating
+
+        Args:
+            lease_seconds (float): Heartbeat age after which the worker is presumed dead
+            max_attempts (int): Jobs that already ran this often fail instead of running again
+
+        Returns:
+            int: Jobs requeued or failed
+        """
+        now = time.time()
+        stale_before = now - lease_seconds
+        with self._lock:
+            failed = self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, expires_at = ? "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (f"Worker lost {max_attempts} times; giving up", now, self._expires_at(now), stale_before, max_attempts)
+            ).rowcount
+            requeued = self._db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ?",
+                (stale_before,)
+            ).rowcount
+        return failed + requeued
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({status: count for status, count in rows})
+        return counts
+
+class JobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        poll_seconds: float = 1.0,
+        lease_seconds: float = 60,
+        max_attempts: int = 3
+    ):
+        """
+        Args:
+            store (JobStore): Where jobs and results are kept
+            workers (int): Jobs run at once by this process
+            poll_seconds (float): Idle workers look for jobs submitted by other processes this often
+            lease_seconds (float): A running job without a heartbeat for this long is requeued
+            max_attempts (int): Runs per job before a lost worker fails it
+        """
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, Handler] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._progress: Dict[str, tuple] = {}  # Latest (completed, total) per running job, written behind
+        self._flushing = set()
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def submit(self, kind: str, payload: dict, priority: int = 0, total: int = 0) -> dict:
+        """
+        Queue a job
+
+        Args:
+            kind (str): Handler to run it with
+            payload (dict): JSON-serializable handler input
+            priority (int): Higher runs first
+            total (int): Expected progress total, e.g. the number of requirements
+
+        Returns:
+            dict: The queued job
+        """
+        job = await asyncio.to_thread(self.store.submit, kind, payload, priority, total)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        job = await asyncio.to_thread(self.store.cancel, job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    async def start(self, handlers: Dict[str, Handler]):
+        """Start the workers and the heartbeat loop on the running event loop"""
+        if self.started:
+            return
+        self._handlers = dict(handlers)
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._maintain()))
+        print(f"🗂️  Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back to the queue for the next start"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id in list(self._running):
+            await asyncio.to_thread(self.store.release, job_id)
+        self._running.clear()
+        self._progress.clear()
+
+    async def _work(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+                await self._run(job)
+            except Exception as e:
+                # e.g. "database is locked" while another process holds the store; keep the worker alive
+                print(f"Error in job queue worker: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _run(self, job: dict):
+        job_id, kind = job["id"], job["kind"]
+        STAGE_SECONDS.observe(job["started_at"] - job["created_at"], "job.queue_wait", "")
+        handler = self._handlers.get(kind)
+        if handler is None:
+            await asyncio.to_thread(self.store.finish, job_id, "failed", None, f"Unknown job kind: {kind}")
+            return
+
+        def progress(completed: int, total: int):
+            # Called from the handler on the event loop: record now, write from a thread
+            self._progress[job_id] = (completed, total)
+            if job_id not in self._flushing:
+                self._flushing.add(job_id)
+                asyncio.ensure_future(self._flush_progress(job_id))
+
+        task = asyncio.ensure_future(handler(job["payload"], progress))
+        self._running[job_id] = task
+        try:
+            with timed(f"job.{kind}"):
+                result = await task
+            await self._finish(job_id, "succeeded", result=result)
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            print(f"🛑 Job {job_id} cancelled")
+        except Exception as e:
+            # HTTPException from the shared request checks carries its message in detail
+            await self._finish(job_id, "failed", error=str(getattr(e, "detail", None) or e))
+            print(f"❌ Job {job_id} ({kind}) failed: {e}")
+        finally:
+            if not self._stopping:
+                self._running.pop(job_id, None)
+                self._progress.pop(job_id, None)
+
+    async def _finish(self, job_id: str, status: str, result: dict = None, error: str = None):
+        latest = self._progress.get(job_id)
+        if latest is not None:
+            # The write-behind flush may still be pending; the final count must land before the status
+            await asyncio.to_thread(self.store.progress, job_id, *latest)
+        await asyncio.to_thread(self.store.finish, job_id, status, result, error)
+
+    async def _flush_progress(self, job_id: str):
+        # One write in flight per job; updates arriving meanwhile collapse into the next write
+        try:
+            while True:
+                latest = self._progress.get(job_id)
+                if latest is None:
+                    return
+                await asyncio.to_thread(self.store.progress, job_id, *latest)
+                if self._progress.get(job_id) == latest:
+                    return
+        except Exception as e:
+            print(f"Error saving progress of job {job_id}: {e}")
+        finally:
+            self._flushing.discard(job_id)
+
+    async def _maintain(self):
+        # Heartbeats well inside the lease; also where cancellations from other processes are noticed
+        interval = max(0.1, min(self.lease_seconds / 3, 10.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                lost = await asyncio.to_thread(self._maintain_store, list(self._running))
+                for job_id in lost:
+                    task = self._running.get(job_id)
+                    if task is not None:
+                        task.cancel()
+            except Exception as e:
+                print(f"Error maintaining job queue: {e}")
+
+    def _maintain_store(self, running_ids: list) -> list:
+        """Heartbeat, requeue and purge in one worker thread; returns running jobs no longer ours"""
+        lost = [job_id for job_id in running_ids if not self.store.heartbeat(job_id)]
+        self.store.requeue_stale(self.lease_seconds, self.max_attempts)
+        self.store.purge_expired()
+        return lost
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "workers": self.workers,
+            "running_here": len(self._running),
+            "jobs": self.store.counts(),
+        }
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Return the process-wide queue configured in config.py, or None when jobs are disabled"""
+    global _default_queue
+    if not JOBS_ENABLED:
+        return None
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                _default_queue = JobQueue(
+                    JobStore(JOBS_SQLITE_PATH, result_ttl_seconds=JOB_RESULT_TTL_SECONDS),
+                    workers=JOB_WORKERS,
+                    poll_seconds=JOB_POLL_SECONDS,
+                    lease_seconds=JOB_LEASE_SECONDS,
+                    max_attempts=JOB_MAX_ATTEMPTS
+                )
+    return _default_queue
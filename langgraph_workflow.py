@@ -1,6 +1,9 @@
-from langgraph.graph import StateGraph, END
+import threading
 from typing import TypedDict, Optional
+from config import PARTITIONED_GENERATION
 from groq_client import GroqUMLClient
+from lazy_imports import timed_import
+from metrics import timed
 from uml_generator import UMLDiagramGenerator
 from uml_models import UMLDiagram
 
@@ -11,17 +14,49 @@ class WorkflowState(TypedDict):
     error: str
     uml_type: Optional[str]
     model: Optional[str]
+    structured: Optional[bool]
+    partitioned: Optional[bool]  # None uses PARTITIONED_GENERATION
+    served_model: Optional[str]  # Model that generated the diagram; differs from model after a scheduler fallback
+
+def _partitioned(state: WorkflowState) -> bool:
+    partitioned = state.get("partitioned")
+    return PARTITIONED_GENERATION if partitioned is None else partitioned
 
 def create_uml_workflow():
+    # langgraph is only needed once a UML request arrives, so it is not imported with the module
+    graph = timed_import("langgraph.graph")
+    RunnableLambda = timed_import("langchain_core.runnables").RunnableLambda
     uml_generator = UMLDiagramGenerator()
     def generate_uml(state: WorkflowState) -> WorkflowState:
         try:
             scenario = state["scenario"]
             uml_type = state.get("uml_type", "class")
             model = state.get("model", "llama3-8b-8192")
-            groq_client = GroqUMLClient(model=model)
-            uml_diagram = groq_client.generate_uml(scenario, uml_type)
+            groq_client = GroqUMLClient(model=model, structured=state.get("structured"))
+            with timed("workflow.generate_uml", model):
+                if _partitioned(state):
+                    uml_diagram = groq_client.generate_uml_partitioned(scenario, uml_type)
+                else:
+                    uml_diagram = groq_client.generate_uml(scenario, uml_type)
             state["uml_diagram"] = uml_diagram
+            state["served_model"] = uml_diagram.served_model or model
+            state["error"] = ""
+        except Exception as e:
+            state["error"] = f"Error generating UML: {str(e)}"
+        return state
+    async def agenerate_uml(state: WorkflowState) -> WorkflowState:
+        try:
+            scenario = state["scenario"]
+            uml_type = state.get("uml_type", "class")
+            model = state.get("model", "llama3-8b-8192")
+            groq_client = GroqUMLClient(model=model, structured=state.get("structured"))
+            with timed("workflow.generate_uml", model):
+                if _partitioned(state):
+                    uml_diagram = await groq_client.agenerate_uml_partitioned(scenario, uml_type)
+                else:
+                    uml_diagram = await groq_client.agenerate_uml(scenario, uml_type)
+            state["uml_diagram"] = uml_diagram
+            state["served_model"] = uml_diagram.served_model or model
             state["error"] = ""
         except Exception as e:
             state["error"] = f"Error generating UML: {str(e)}"
@@ -29,7 +64,8 @@ def create_uml_workflow():
     def create_diagram(state: WorkflowState) -> WorkflowState:
         try:
             if "uml_diagram" in state and state["uml_diagram"]:
-                dot_source = uml_generator.generate_diagram(state["uml_diagram"])
+                with timed("workflow.create_diagram", state.get("model") or ""):
+                    dot_source = uml_generator.generate_diagram(state["uml_diagram"])
                 state["dot_source"] = dot_source
                 state["error"] = ""
             else:
@@ -37,11 +73,32 @@ def create_uml_workflow():
         except Exception as e:
             state["error"] = f"Error creating diagram: {str(e)}"
         return state
-    workflow = StateGraph(WorkflowState)
-    workflow.add_node("generate_uml", generate_uml)
-    workflow.add_node("create_diagram", create_diagram)
+    async def acreate_diagram(state: WorkflowState) -> WorkflowState:
+        # DOT generation is pure CPU and fast, so the async node runs it inline
+        return create_diagram(state)
+    workflow = graph.StateGraph(WorkflowState)
+    # Each node carries a sync and an async implementation so both invoke() and ainvoke() work
+    workflow.add_node("generate_uml", RunnableLambda(generate_uml, afunc=agenerate_uml))
+    workflow.add_node("create_diagram", RunnableLambda(create_diagram, afunc=acreate_diagram))
     workflow.set_entry_point("generate_uml")
     workflow.add_edge("generate_uml", "create_diagram")
-    workflow.add_edge("create_diagram", END)
+    workflow.add_edge("create_diagram", graph.END)
     return workflow.compile()
-workflow = create_uml_workflow() 
\ No newline at end of file
+
+_workflow = None
+_workflow_lock = threading.Lock()
+
+def get_workflow():
+    """Return the compiled workflow, building it on first use"""
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                _workflow = create_uml_workflow()
+    return _workflow
+
+def __getattr__(name: str):
+    # Keeps `from langgraph_workflow import workflow` working; the graph is still built on first access
+    if name == "workflow":
+        return get_workflow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,91 @@
+"""
+Deferred imports for heavy dependencies and an import-cost report.
+
+Modules such as torch, chromadb, langgraph and graphviz are imported through
+timed_import() on first use instead of at module import, so the API process
+starts serving lightweight endpoints immediately. Each deferred import is timed
+and exposed by import_timings().
+
+Run as a script to break down the cold import cost of a module (default: app)
+by top-level package, using the interpreter's -X importtime output:
+
+    python lazy_imports.py [module] [--top 25]
+"""
+
+import argparse
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+_lock = threading.Lock()
+_timings: Dict[str, float] = {}
+
+def timed_import(module_name: str):
+    """Import a module on first use and record how long the first import took"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        if module_name not in _timings:
+            _timings[module_name] = elapsed
+            print(f"📦 Loaded {module_name} in {elapsed:.2f}s")
+    return module
+
+def import_timings() -> Dict[str, float]:
+    """Seconds spent on each deferred import so far, in load order"""
+    with _lock:
+        return dict(_timings)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def import_cost_report(module_name: str = "app") -> Dict[str, float]:
+    """
+    Cold-import module_name in a fresh interpreter and total the cost per top-level package
+
+    Returns:
+        Dict[str, float]: Self time in seconds per top-level package, largest first,
+            plus "total" for the cumulative time of module_name itself
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module_name} failed:\n{completed.stderr[-2000:]}")
+    per_package = defaultdict(float)
+    total = 0.0
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        per_package[name.split(".")[0]] += int(self_us) / 1e6
+        if name == module_name:
+            total = int(cumulative_us) / 1e6
+    report = dict(sorted(per_package.items(), key=lambda item: item[1], reverse=True))
+    report["total"] = total
+    return report
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Break down the cold import cost of a module")
+    arg_parser.add_argument("module", nargs="?", default="app", help="Module to import")
+    arg_parser.add_argument("--top", type=int, default=25, help="Packages to list")
+    args = arg_parser.parse_args()
+
+    report = import_cost_report(args.module)
+    total = report.pop("total")
+    print(f"⏱️  import {args.module}: {total:.3f}s")
+    print(f"{'package':<32}{'seconds':>10}{'share':>8}")
+    for package, seconds in list(report.items())[:args.top]:
+        print(f"{package:<32}{seconds:>10.3f}{seconds / total if total else 0:>8.1%}")
+
+if __name__ == "__main__":
+    main()
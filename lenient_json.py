@@ -0,0 +1,163 @@
+"""
+Single-pass, linear-time tolerant JSON scanner for LLM responses.
+
+Handles the defects LLMs actually produce instead of rewriting the text with
+regular expressions first: prose or ``` fences around the object, single-quoted
+or unquoted keys and values, unescaped quotes inside strings, Python literals,
+missing or trailing commas, and output truncated before the closing braces.
+"""
+
+import re
+from typing import Any, Optional
+
+_WHITESPACE_RUN = re.compile(r"[ \t\r\n]*")
+_SEPARATOR_RUN = re.compile(r"[ \t\r\n,]*")
+_VALUE_TOKEN = re.compile(r"[^,}\]\n]*")
+_KEY_TOKEN = re.compile(r"[^:,}\]\n]*")
+_CONTAINER_START = re.compile(r"[{\[]")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_LITERALS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None,
+}
+_ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class _Scanner:
+    def __init__(self, text: str, start: int):
+        self.text = text
+        self.pos = start
+        self.end = len(text)
+        self._next_backslash = -1  # Cached text.find("\\") result so string scans stay linear
+
+    def skip_whitespace(self):
+        self.pos = _WHITESPACE_RUN.match(self.text, self.pos).end()
+
+    def value(self) -> Any:
+        self.skip_whitespace()
+        if self.pos >= self.end:
+            return None
+        char = self.text[self.pos]
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char == '"' or char == "'":
+            return self.string(char)
+        return self.bare(_VALUE_TOKEN)
+
+    def object(self) -> dict:
+        self.pos += 1
+        result = {}
+        while True:
+            self._skip_separators()
+            if self.pos >= self.end:
+                return result  # Truncated: close the object implicitly
+            char = self.text[self.pos]
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == "]":
+                self.pos += 1  # Stray closer from a mismatched array; drop it
+                continue
+            if char == '"' or char == "'":
+                key = self.string(char)
+            else:
+                key = self.bare(_KEY_TOKEN)
+            self.skip_whitespace()
+            if self.pos < self.end and self.text[self.pos] in ":=":
+                self.pos += 1
+                result[str(key)] = self.value()
+            else:
+                result[str(key)] = None
+
+    def array(self) -> list:
+        self.pos += 1
+        result = []
+        while True:
+            self._skip_separators()
+            if self.pos >= self.end:
+                return result
+            char = self.text[self.pos]
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == "}":
+                return result  # Unterminated array inside an object; let the object close
+            result.append(self.value())
+
+    def string(self, quote: str) -> str:
+        text, end = self.text, self.end
+        pos = self.pos + 1
+        parts = []
+        next_quote = -1  # Searched again only once passed, so escapes do not rescan the same span
+        while pos < end:
+            if next_quote < pos:
+                next_quote = text.find(quote, pos)
+                if next_quote == -1:
+                    next_quote = end
+            if self._next_backslash < pos:
+                self._next_backslash = text.find("\\", pos)
+                if self._next_backslash == -1:
+                    self._next_backslash = end
+            if self._next_backslash < next_quote:
+                parts.append(text[pos:self._next_backslash])
+                pos = self._escape(self._next_backslash, parts)
+                continue
+            parts.append(text[pos:next_quote])
+            pos = next_quote + 1
+            if next_quote >= end or self._closes_string(pos):
+                break
+            # A quote followed by more prose is part of the value, not its end
+            parts.append(quote)
+        self.pos = min(pos, end)
+        return "".join(parts)
+
+    def _escape(self, pos: int, parts: list) -> int:
+        if pos + 1 >= self.end:
+            return self.end
+        code = self.text[pos + 1]
+        if code == "u":
+            digits = self.text[pos + 2:pos + 6]
+            try:
+                parts.append(chr(int(digits, 16)))
+                return pos + 6
+            except ValueError:
+                parts.append("\\u")
+                return pos + 2
+        parts.append(_ESCAPES.get(code, code))
+        return pos + 2
+
+    def _closes_string(self, pos: int) -> bool:
+        text, end = self.text, self.end
+        after = _WHITESPACE_RUN.match(text, pos).end()
+        if after >= end or text[after] in ",}]:":
+            return True
+        # A newline before the next quoted item means a missing comma, not an embedded quote
+        return text[after] in "\"'" and "\n" in text[pos:after]
+
+    def bare(self, token_pattern: re.Pattern) -> Any:
+        start = self.pos
+        self.pos = token_pattern.match(self.text, start).end()
+        token = self.text[start:self.pos].strip()
+        if token in _LITERALS:
+            return _LITERALS[token]
+        if _NUMBER.fullmatch(token):
+            number = float(token)
+            return int(number) if number.is_integer() and "." not in token else number
+        return token
+
+    def _skip_separators(self):
+        self.pos = _SEPARATOR_RUN.match(self.text, self.pos).end()
+
+def parse_lenient_json(text: str) -> Optional[Any]:
+    """
+    Parse the first JSON object or array in text, repairing common LLM defects
+
+    Returns None when the text contains no object or array at all.
+    """
+    if not text:
+        return None
+    match = _CONTAINER_START.search(text)
+    if match is None:
+        return None
+    return _Scanner(text, match.start()).value()
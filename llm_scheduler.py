@@ -0,0 +1,243 @@
+"""
+Admission, retry and model fallback for Groq calls.
+
+Every completion first reserves one request and its estimated tokens from the
+model's ModelBudget, so bursts queue on the client instead of arriving at Groq
+as 429s. Rate limit headers on each response keep the budget aligned with the
+account's real limits. A 429, a 5xx or a dropped connection is retried with
+full-jitter exponential backoff; a 429 also blocks the model for its
+retry-after, so the retry (and every other caller) is routed to the next model
+in LLM_FALLBACK_MODELS when that is the faster way through (only when some are
+configured; by default a call waits for the model it asked for). A call that could
+not be admitted within LLM_MAX_QUEUE_SECONDS fails fast with LLMSaturatedError
+instead of piling onto a saturated model.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from config import (
+    AVAILABLE_MODELS, LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, LLM_FALLBACK_AFTER_SECONDS,
+    LLM_FALLBACK_MODELS, LLM_MAX_ATTEMPTS, LLM_MAX_QUEUE_SECONDS, LLM_SCHEDULER_ENABLED
+)
+from metrics import LLM_FALLBACKS, LLM_RETRIES, STAGE_SECONDS
+from rate_limit import ModelBudget, parse_reset
+
+# send(model) performs the request on that model and returns (response, response headers)
+Send = Callable[[str], Tuple[object, Mapping[str, str]]]
+AsyncSend = Callable[[str], Awaitable[Tuple[object, Mapping[str, str]]]]
+
+class LLMSaturatedError(RuntimeError):
+    """No candidate model could admit the call within LLM_MAX_QUEUE_SECONDS"""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def retry_reason(error: Exception) -> Optional[str]:
+    """"rate_limited", "server_error" or "connection" for errors worth retrying, else None"""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None:
+        return "server_error" if status >= 500 else None
+    # groq.APIConnectionError and APITimeoutError carry no status; match by name to keep groq unimported
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & {"APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectionError"}:
+        return "connection"
+    return None
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Server-suggested wait of a failed response: retry-after, else the relevant reset header"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after", "x-ratelimit-reset-tokens", "x-ratelimit-reset-requests"):
+        seconds = parse_reset(headers.get(name))
+        if seconds is not None:
+            return seconds
+    return None
+
+class LLMScheduler:
+    def __init__(
+        self,
+        enabled: bool = LLM_SCHEDULER_ENABLED,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+        max_queue_seconds: float = LLM_MAX_QUEUE_SECONDS,
+        fallback_after: float = LLM_FALLBACK_AFTER_SECONDS,
+        fallback_models: List[str] = None
+    ):
+        """
+        Args:
+            enabled (bool): False sends every call once, straight to the requested model
+            max_attempts (int): Sends per call, the first included
+            backoff_base (float): Backoff before the second attempt; doubles per attempt, fully jittered
+            backoff_max (float): Backoff ceiling
+            max_queue_seconds (float): Longest admission wait before LLMSaturatedError
+            fallback_after (float): Admission wait beyond which another model is considered
+            fallback_models (List[str]): Models tried instead, in order of preference;
+                defaults to LLM_FALLBACK_MODELS
+        """
+        self.enabled = enabled
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_seconds = max_queue_seconds
+        self.fallback_after = fallback_after
+        self.fallback_models = [
+            model for model in (LLM_FALLBACK_MODELS if fallback_models is None else fallback_models)
+            if model in AVAILABLE_MODELS
+        ]
+        self._budgets: Dict[str, ModelBudget] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def budget(self, model: str) -> ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.get(model)
+                if budget is None:
+                    info = AVAILABLE_MODELS.get(model, {})
+                    budget = ModelBudget(info.get("requests_per_minute", 0), info.get("tokens_per_minute", 0))
+                    self._budgets[model] = budget
+        return budget
+
+    def admit(self, model: str, tokens: int) -> Tuple[str, float]:
+        """
+        Pick the model for a call and reserve its budget
+
+        Args:
+            model (str): Requested model; kept unless it would wait longer than fallback_after
+                and a fallback model would admit the call sooner
+            tokens (int): Estimated prompt plus completion tokens
+
+        Returns:
+            Tuple[str, float]: Model to send to, and seconds to wait before sending
+
+        Raises:
+            LLMSaturatedError: Every candidate would wait longer than max_queue_seconds
+        """
+        chosen = model
+        wait = self.budget(model).wait_time(tokens)
+        if wait > self.fallback_after:
+            for candidate in self.fallback_models:
+                if candidate != model:
+                    candidate_wait = self.budget(candidate).wait_time(tokens)
+                    if candidate_wait < wait:
+                        chosen, wait = candidate, candidate_wait
+        reserved = self.budget(chosen).reserve(tokens, self.max_queue_seconds)
+        if reserved is None:
+            raise LLMSaturatedError(f"{model} is rate limited; retry in {wait:.1f}s", retry_after=wait)
+        if chosen != model:
+            LLM_FALLBACKS.inc(1, model, chosen)
+        STAGE_SECONDS.observe(reserved, "llm.admission", chosen)
+        return chosen, reserved
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: concurrent callers that failed together do not retry together
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _on_error(self, model: str, tokens: int, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None when the error is final"""
+        # A failed call used no tokens; the server-side request count is corrected by the next headers
+        self.budget(model).settle(tokens, 0)
+        reason = retry_reason(error)
+        if reason is None or attempt >= self.max_attempts:
+            return None
+        LLM_RETRIES.inc(1, model, reason)
+        suggested = retry_after(error)
+        if reason == "rate_limited":
+            # Admission waits out the block on this model, or routes around it
+            self.budget(model).block(suggested if suggested is not None else self._backoff(attempt + 1))
+        print(f"⚠️  Groq {reason} on {model} (attempt {attempt}/{self.max_attempts}): {error}")
+        return self._backoff(attempt)
+
+    def _on_success(self, model: str, tokens: int, response, headers: Mapping[str, str]):
+        budget = self.budget(model)
+        usage = getattr(response, "usage", None)
+        used = getattr(usage, "total_tokens", None)
+        if used is None and usage is not None:
+            used = (getattr(usage, "prompt_tokens", None) or 0) + (getattr(usage, "completion_tokens", None) or 0)
+        budget.settle(tokens, used)
+        budget.observe_headers(headers)
+
+    def call(self, model: str, tokens: int, send: Send) -> Tuple[object, str]:
+        """
+        Send one completion with admission, retries and fallback
+
+        Args:
+            model (str): Requested model
+            tokens (int): Estimated prompt plus completion tokens
+            send (Send): Performs the request on the model it is given
+
+        Returns:
+            Tuple[object, str]: The response and the model that produced it
+
+        Raises:
+            LLMSaturatedError: The call could not be admitted in time
+            Exception: The last error from send once it is final or attempts run out
+        """
+        if not self.enabled:
+            return send(model)[0], model
+        attempt = 0
+        while True:
+            attempt += 1
+            chosen, wait = self.admit(model, tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response, headers = send(chosen)
+            except Exception as e:
+                delay = self._on_error(chosen, tokens, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._on_success(chosen, tokens, response, headers)
+            return response, chosen
+
+    async def acall(self, model: str, tokens: int, send: AsyncSend) -> Tuple[object, str]:
+        """Async variant of call"""
+        if not self.enabled:
+            return (await send(model))[0], model
+        attempt = 0
+        while True:
+            attempt += 1
+            chosen, wait = self.admit(model, tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                response, headers = await send(chosen)
+            except Exception as e:
+                delay = self._on_error(chosen, tokens, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._on_success(chosen, tokens, response, headers)
+            return response, chosen
+
+    def stats(self) -> dict:
+        with self._lock:
+            budgets = dict(self._budgets)
+        return {
+            "enabled": self.enabled,
+            "fallback_models": self.fallback_models,
+            "models": {model: budget.snapshot() for model, budget in sorted(budgets.items())},
+        }
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler; budgets are per account, so all clients share them"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
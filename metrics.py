@@ -0,0 +1,227 @@
+"""
+Process-wide latency histograms and counters in the Prometheus text format.
+
+Pipeline stages time themselves with `with timed("llm.uml", model):`, which
+costs two perf_counter calls, a bisect and one locked increment, so the
+instrumentation stays in the microseconds next to millisecond-to-second stages.
+Counters other modules already keep (parse_stats, rule_screen_stats, cache
+statistics) are not copied here: collectors registered with register_collector
+read them only when /metrics is scraped.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from config import METRICS_ENABLED
+
+# Seconds; spans a cached lookup (milliseconds) to a long completion (up to a minute)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (labels, value) pairs of one metric family
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def format_family(name: str, kind: str, documentation: str, samples: Samples) -> List[str]:
+    """
+    Exposition lines for one metric family
+
+    Args:
+        name (str): Metric name, e.g. "cache_hits_total"
+        kind (str): "counter", "gauge" or "histogram"
+        documentation (str): HELP text
+        samples (Samples): (labels, value) pairs; histogram samples carry their own
+            full name (with the _bucket, _sum or _count suffix) under the "__name__" label
+
+    Returns:
+        List[str]: HELP and TYPE lines followed by one line per sample
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        labels = dict(labels)
+        sample_name = labels.pop("__name__", name)
+        lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+class Counter:
+    """Monotonic counter keyed by a fixed tuple of label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *label_values):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return format_family(self.name, "counter", self.documentation, (
+            (dict(zip(self.labelnames, label_values)), value) for label_values, value in values
+        ))
+
+class Histogram:
+    """Latency histogram keyed by a fixed tuple of label values"""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label tuple: [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[tuple, dict]:
+        """Per label tuple: cumulative bucket counts, sum and count"""
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        result = {}
+        for key, (counts, total, count) in series.items():
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            result[key] = {"buckets": cumulative, "sum": total, "count": count}
+        return result
+
+    def expose(self) -> List[str]:
+        samples = []
+        for label_values, series in sorted(self.snapshot().items()):
+            labels = dict(zip(self.labelnames, label_values))
+            for bound, cumulative in zip(self.buckets + (float("inf"),), series["buckets"]):
+                samples.append(({"__name__": f"{self.name}_bucket", **labels, "le": _format_value(bound)}, cumulative))
+            samples.append(({"__name__": f"{self.name}_sum", **labels}, series["sum"]))
+            samples.append(({"__name__": f"{self.name}_count", **labels}, series["count"]))
+        return format_family(self.name, "histogram", self.documentation, samples)
+
+STAGE_SECONDS = Histogram(
+    "stage_seconds", "Wall time of one pipeline stage", ("stage", "model")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Wall time of one HTTP request", ("method", "path", "status")
+)
+LLM_REQUESTS = Counter(
+    "llm_requests_total", "Groq chat completions by outcome", ("model", "kind", "outcome")
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by Groq usage, in = prompt and out = completion",
+    ("model", "kind", "direction")
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total", "Groq calls retried by the scheduler, by reason", ("model", "reason")
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total", "Groq calls routed away from a saturated model", ("requested", "served")
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total", "Requests that ran the pipeline (leader) or joined an identical call in flight (coalesced)",
+    ("flight", "role")
+)
+
+_METRICS = [
+    STAGE_SECONDS, HTTP_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS, LLM_RETRIES, LLM_FALLBACKS, SINGLE_FLIGHT_CALLS
+]
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+class _StageTimer:
+    __slots__ = ("stage", "model", "started")
+
+    def __init__(self, stage: str, model: str):
+        self.stage = stage
+        self.model = model
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # Failed stages are timed too: a slow timeout is exactly what the histogram should show
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.stage, self.model or "")
+        return False
+
+def timed(stage: str, model: str = "") -> _StageTimer:
+    """
+    Time the enclosed block into stage_seconds
+
+    Args:
+        stage (str): Stage name, e.g. "llm.uml", "parse.validation" or "validation.embed"
+        model (str): Groq model the stage ran for; "" for model-independent stages
+    """
+    return _StageTimer(stage, model)
+
+def record_llm_usage(model: str, kind: str, response, outcome: str = "ok"):
+    """Count one completion and the prompt and completion tokens its usage reports"""
+    LLM_REQUESTS.inc(1, model, kind, outcome)
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model, kind, "in")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, model, kind, "out")
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+    """
+    Add a scrape-time source of metric families
+
+    Args:
+        collector (Callable): Returns (name, kind, documentation, samples) tuples,
+            as taken by format_family; it runs on every scrape, so keep it to reading counters
+    """
+    _collectors.append(collector)
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.expose())
+    for collector in list(_collectors):
+        try:
+            for name, kind, documentation, samples in collector():
+                lines.extend(format_family(name, kind, documentation, samples))
+        except Exception as e:
+            print(f"Error collecting metrics from {getattr(collector, '__name__', collector)}: {e}")
+    return "\n".join(lines) + "\n"
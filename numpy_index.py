@@ -0,0 +1,159 @@
+"""
+In-process exact vector index for the INCOSE corpus.
+
+Chunk embeddings live in a memory-mapped float32 .npy matrix next to a JSON file
+of chunk texts. Top-k and MMR re-ranking are plain NumPy matrix operations, and
+every search takes a batch of queries, so a whole validation batch costs one
+matrix product instead of one Chroma round trip per requirement.
+"""
+
+import json
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.json"
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class NumpyVectorIndex:
+    def __init__(self, ids: List[str], documents: List[str], embeddings: np.ndarray):
+        """
+        Args:
+            ids (List[str]): Chunk IDs, aligned with documents and embedding rows
+            documents (List[str]): Chunk texts
+            embeddings (np.ndarray): (n, dim) float32 unit vectors, usually a read-only memmap
+        """
+        self.ids = ids
+        self.documents = documents
+        self.embeddings = embeddings
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return (
+            os.path.exists(os.path.join(index_dir, EMBEDDINGS_FILE))
+            and os.path.exists(os.path.join(index_dir, CHUNKS_FILE))
+        )
+
+    @classmethod
+    def load(cls, index_dir: str) -> "NumpyVectorIndex":
+        """Open an index written by save(); the matrix is memory-mapped, not read into RAM"""
+        embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        if len(chunks["documents"]) != embeddings.shape[0]:
+            raise ValueError(f"Index at {index_dir} has mismatched chunk and embedding counts")
+        return cls(chunks["ids"], chunks["documents"], embeddings)
+
+    @classmethod
+    def save(
+        cls,
+        index_dir: str,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        embeddings: Sequence[Sequence[float]]
+    ) -> "NumpyVectorIndex":
+        """Write chunks and their normalized embeddings to index_dir and return the loaded index"""
+        os.makedirs(index_dir, exist_ok=True)
+        matrix = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(documents), -1))
+        # Write to temporary names first so a reader never sees a half-written index
+        embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+        chunks_path = os.path.join(index_dir, CHUNKS_FILE)
+        np.save(embeddings_path + ".tmp.npy", matrix)
+        with open(chunks_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "documents": list(documents)}, f)
+        os.replace(embeddings_path + ".tmp.npy", embeddings_path)
+        os.replace(chunks_path + ".tmp", chunks_path)
+        return cls.load(index_dir)
+
+    @classmethod
+    def from_chroma(cls, vectorstore, index_dir: str) -> "NumpyVectorIndex":
+        """Export a Chroma store's stored vectors without re-embedding anything"""
+        data = vectorstore._collection.get(include=["documents", "embeddings"])
+        return cls.save(index_dir, data["ids"], data["documents"], data["embeddings"])
+
+    def _queries(self, query_embeddings) -> np.ndarray:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        return _normalize_rows(queries.reshape(-1, self.embeddings.shape[1]))
+
+    def _top(self, scores: np.ndarray, k: int) -> np.ndarray:
+        # argpartition is O(n); only the k survivors get sorted
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1)
+
+    def search(self, query_embeddings, k: int = 5) -> List[List[Tuple[int, float]]]:
+        """
+        Exact cosine top-k for a batch of queries
+
+        Returns:
+            List[List[Tuple[int, float]]]: Per query, (row, similarity) pairs, best first
+        """
+        if not len(self):
+            return [[] for _ in range(len(query_embeddings))]
+        scores = self._queries(query_embeddings) @ self.embeddings.T
+        top = self._top(scores, min(k, len(self)))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        return [
+            list(zip(rows.tolist(), row_scores.tolist()))
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def mmr_rows(self, query_embeddings, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5) -> np.ndarray:
+        """
+        Maximal marginal relevance over the exact fetch_k nearest chunks, for a batch of queries
+
+        Same selection rule as langchain's maximal_marginal_relevance, which Chroma's
+        "mmr" retriever uses, but run for every query at once.
+
+        Returns:
+            np.ndarray: (queries, k) chunk rows in selection order
+        """
+        queries = self._queries(query_embeddings)
+        fetch_k = min(fetch_k, len(self))
+        k = min(k, fetch_k)
+        if k == 0:
+            return np.empty((queries.shape[0], 0), dtype=np.intp)
+        scores = queries @ self.embeddings.T
+        candidates = self._top(scores, fetch_k)  # (q, f)
+        query_similarity = np.take_along_axis(scores, candidates, axis=1)  # (q, f)
+        candidate_vectors = np.asarray(self.embeddings[candidates.ravel()]).reshape(
+            candidates.shape[0], fetch_k, -1
+        )
+        pair_similarity = candidate_vectors @ candidate_vectors.transpose(0, 2, 1)  # (q, f, f)
+
+        rows = np.arange(queries.shape[0])
+        selected = np.empty((queries.shape[0], k), dtype=np.intp)
+        available = np.ones(candidates.shape, dtype=bool)
+        redundancy = np.full(candidates.shape, -np.inf, dtype=np.float32)
+        for step in range(k):
+            if step == 0:
+                mmr = query_similarity.copy()
+            else:
+                mmr = lambda_mult * query_similarity - (1 - lambda_mult) * redundancy
+            mmr[~available] = -np.inf
+            pick = mmr.argmax(axis=1)
+            selected[:, step] = pick
+            available[rows, pick] = False
+            redundancy = np.maximum(redundancy, pair_similarity[rows, pick])
+        return np.take_along_axis(candidates, selected, axis=1)
+
+    def mmr_search(self, query_embeddings, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5) -> List[List[str]]:
+        """Batched MMR search returning chunk texts per query"""
+        if not len(self):
+            return [[] for _ in range(len(query_embeddings))]
+        return [
+            [self.documents[row] for row in query_rows]
+            for query_rows in self.mmr_rows(query_embeddings, k, fetch_k, lambda_mult).tolist()
+        ]
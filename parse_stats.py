@@ -0,0 +1,38 @@
+"""
+Per-model counters of LLM output parse outcomes.
+Used to compare the free-text (XML / repaired JSON) mode against structured output.
+"""
+
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counts = defaultdict(lambda: {"attempts": 0, "failures": 0})
+
+def record_parse(kind: str, model: str, mode: str, ok: bool):
+    """
+    Args:
+        kind (str): What was parsed: "uml", "uml_outline", "uml_patch" or "validation"
+        model (str): Model that produced the output
+        mode (str): "text" for prompt-only output, "structured" for schema-constrained output
+        ok (bool): Whether the output parsed without falling back or erroring
+    """
+    with _lock:
+        entry = _counts[(kind, model, mode)]
+        entry["attempts"] += 1
+        if not ok:
+            entry["failures"] += 1
+
+def parse_stats() -> list:
+    with _lock:
+        return [
+            {
+                "kind": kind,
+                "model": model,
+                "mode": mode,
+                "attempts": entry["attempts"],
+                "failures": entry["failures"],
+                "failure_rate": entry["failures"] / entry["attempts"] if entry["attempts"] else 0.0,
+            }
+            for (kind, model, mode), entry in sorted(_counts.items())
+        ]
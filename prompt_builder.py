@@ -0,0 +1,171 @@
+"""
+Token-aware context compression for the INCOSE evaluation prompt.
+
+Retrieved chunks overlap (the chunker repeats the tail of each chunk at the head
+of the next) and are mostly prose unrelated to the requirement. Instead of
+joining them and cutting at a character limit, the builder splits them into
+sentences, drops repeated and partial ones, scores the rest against the
+requirement (plus the vocabulary of the writing rules it already breaks), and
+packs the best sentences into a per-model token budget without cutting any of
+them. Token counts are estimated per model from AVAILABLE_MODELS, since the
+models' tokenizers are not available locally.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+from bm25_index import tokenize
+from config import AVAILABLE_MODELS, GROQ_MODEL, VALIDATOR_CONTEXT_TOKENS, VALIDATOR_MAX_OUTPUT_TOKENS
+from incose_rules import screen_requirement
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+DEFAULT_CONTEXT_WINDOW = 8192
+PROMPT_RESERVE_TOKENS = 1024  # Instructions and the requirement itself
+
+# Words, digit groups (split in threes as the Llama 3 tokenizer does) and single punctuation marks
+_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+(?=[\"“(\[A-Z0-9])")
+_WHITESPACE = re.compile(r"\s+")
+# Sentences that state or name a rule ("R7 -", "shall", "requirement") are preferred on ties
+_RULE_MARKER = re.compile(r"\bR\d+\b|\bshall\b|\brequirements?\b", re.IGNORECASE)
+_MIN_SENTENCE_CHARS = 25
+
+def model_profile(model: str) -> dict:
+    return AVAILABLE_MODELS.get(model) or AVAILABLE_MODELS[GROQ_MODEL]
+
+def count_tokens(text: str, model: str = GROQ_MODEL) -> int:
+    """
+    Estimate how many tokens a model's tokenizer produces for the text
+
+    Args:
+        text (str): Text to count
+        model (str): Model name; its chars_per_token sets how long a word runs before splitting
+
+    Returns:
+        int: Estimated token count
+    """
+    chars_per_token = model_profile(model).get("chars_per_token", DEFAULT_CHARS_PER_TOKEN)
+    return sum(
+        math.ceil(len(piece) / chars_per_token) if piece[0].isalpha() else 1
+        for piece in _PIECE.findall(text)
+    )
+
+def max_output_tokens(model: str) -> int:
+    window = model_profile(model).get("context_window", DEFAULT_CONTEXT_WINDOW)
+    return min(VALIDATOR_MAX_OUTPUT_TOKENS, window // 2)
+
+def context_budget(model: str) -> int:
+    """Tokens of retrieved context a prompt may carry, bounded by what fits in the model's window"""
+    window = model_profile(model).get("context_window", DEFAULT_CONTEXT_WINDOW)
+    return max(0, min(VALIDATOR_CONTEXT_TOKENS, window - max_output_tokens(model) - PROMPT_RESERVE_TOKENS))
+
+def split_sentences(chunk: str) -> List[str]:
+    """Split a chunk into whitespace-normalized sentences, dropping the partial ones at its edges"""
+    text = _WHITESPACE.sub(" ", chunk).strip()
+    sentences = [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+    if sentences and not sentences[0][0].isupper() and not sentences[0][0].isdigit():
+        sentences = sentences[1:]  # Starts mid-sentence: the rest is in the previous chunk
+    if sentences and sentences[-1][-1] not in ".!?;:\"”)]":
+        sentences = sentences[:-1]  # Runs into the next chunk
+    return sentences
+
+def dedupe_sentences(chunks: List[str]) -> List[str]:
+    """
+    Sentences of the chunks in order, each kept once
+
+    A sentence is dropped when it already appeared in an earlier chunk, which
+    removes the overlap the chunker repeats between neighbouring chunks.
+    """
+    seen = set()
+    sentences = []
+    for chunk in chunks:
+        for sentence in split_sentences(chunk):
+            key = sentence.lower()
+            if len(sentence) >= _MIN_SENTENCE_CHARS and key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+    return sentences
+
+def _query_weights(requirement_text: str) -> dict:
+    """Requirement terms at full weight, plus the vocabulary of the writing rules it breaks"""
+    weights = {term: 1.0 for term in tokenize(requirement_text)}
+    for rule in screen_requirement(requirement_text).violations:
+        for term in tokenize(f"{rule.issue} {rule.suggestion}"):
+            weights.setdefault(term, 0.5)
+    return weights
+
+def compress_context(requirement_text: str, chunks: List[str], model: str = GROQ_MODEL,
+                     budget: Optional[int] = None) -> str:
+    """
+    Pack the retrieved sentences most relevant to a requirement into a token budget
+
+    Args:
+        requirement_text (str): Requirement the context is for
+        chunks (List[str]): Retrieved chunks, best first
+        model (str): Model whose token counts and budget apply
+        budget (Optional[int]): Context tokens; defaults to context_budget(model)
+
+    Returns:
+        str: Selected sentences in retrieval order, one per line; empty if none fit
+    """
+    if budget is None:
+        budget = context_budget(model)
+    sentences = dedupe_sentences(chunks)
+    if not sentences or budget <= 0:
+        return ""
+
+    weights = _query_weights(requirement_text)
+    sentence_terms = [set(tokenize(sentence)) & weights.keys() for sentence in sentences]
+    # Terms found in many sentences say little about which ones matter
+    frequency = Counter(term for terms in sentence_terms for term in terms)
+    total = len(sentences)
+
+    def score(i: int) -> float:
+        relevance = sum(weights[term] * math.log(1 + total / frequency[term]) for term in sentence_terms[i])
+        return relevance + (0.25 if _RULE_MARKER.search(sentences[i]) else 0.0)
+
+    scores = [score(i) for i in range(total)]
+    ranked = sorted((i for i in range(total) if scores[i] > 0), key=lambda i: (-scores[i], i))
+    if not ranked:
+        ranked = list(range(total))  # Nothing matched: keep the best-ranked chunks' opening sentences
+
+    selected = []
+    used = 0
+    for i in ranked:
+        tokens = count_tokens(sentences[i], model) + 1  # Plus the line break
+        if used + tokens <= budget:
+            selected.append(i)
+            used += tokens
+    return "\n".join(sentences[i] for i in sorted(selected))
+
+_lock = threading.Lock()
+_counts = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "llm_seconds": 0.0})
+
+def record_prompt(model: str, input_tokens: int, llm_seconds: float):
+    """
+    Args:
+        model (str): Model the evaluation prompt was sent to
+        input_tokens (int): Estimated tokens of the whole prompt
+        llm_seconds (float): Time spent waiting for the model
+    """
+    with _lock:
+        entry = _counts[model]
+        entry["calls"] += 1
+        entry["input_tokens"] += input_tokens
+        entry["llm_seconds"] += llm_seconds
+
+def prompt_stats() -> list:
+    with _lock:
+        return [
+            {
+                "model": model,
+                "calls": entry["calls"],
+                "avg_input_tokens": entry["input_tokens"] / entry["calls"],
+                "avg_llm_seconds": entry["llm_seconds"] / entry["calls"],
+            }
+            for model, entry in sorted(_counts.items())
+            if entry["calls"]
+        ]
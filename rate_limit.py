@@ -0,0 +1,179 @@
+"""
+Client-side pacing for fan-out LLM calls, and per-model request and token budgets.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from typing import Mapping, Optional
+
+class AsyncRateLimiter:
+    def __init__(self, requests_per_minute: float = 0):
+        """
+        Space request starts evenly so a burst never exceeds the per-minute budget
+
+        Args:
+            requests_per_minute (float): Allowed request starts per minute; 0 disables pacing
+        """
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+def parse_reset(value) -> Optional[float]:
+    """Seconds in a rate limit header: "7.66s", "2m59.56s", "250ms", or plain seconds as in retry-after"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Refills at capacity per minute; not locked itself, ModelBudget serializes access"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # Set when the server says the budget is exhausted
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available; a request larger than the bucket only waits for a full one"""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        wait = deficit / self.rate if deficit > 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def take(self, amount: float):
+        # The level may go negative: later callers then queue behind this reservation
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+    def observe(self, remaining: Optional[int], reset_seconds: Optional[float], now: float):
+        """Align with the server's count; it wins whenever it has less left than we think"""
+        if remaining is None:
+            return
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+        if remaining <= 0 and reset_seconds:
+            self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+class ModelBudget:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """
+        Token-bucket admission for one model's request and token rate limits
+
+        Starts from the configured per-minute limits; observe_headers() then follows
+        Groq's x-ratelimit-* headers, so the budget tracks what the account really has left.
+
+        Args:
+            requests_per_minute (float): Request budget; 0 leaves requests unmetered
+            tokens_per_minute (float): Prompt plus completion token budget; 0 leaves tokens unmetered
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+
+    def wait_time(self, tokens: int) -> float:
+        """Seconds a call of this many tokens would wait for admission now"""
+        with self._lock:
+            now = time.monotonic()
+            return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def reserve(self, tokens: int, max_wait: float) -> Optional[float]:
+        """
+        Reserve one request and tokens, returning how long to wait before sending
+
+        Returns:
+            Optional[float]: Seconds to sleep, or None (nothing reserved) when that exceeds max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > max_wait:
+                return None
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            return wait
+
+    def settle(self, reserved_tokens: int, used_tokens: Optional[int]):
+        """Return the part of a reservation the call did not use"""
+        if used_tokens is None or used_tokens >= reserved_tokens:
+            return
+        with self._lock:
+            self.tokens.give_back(reserved_tokens - used_tokens)
+
+    def observe_headers(self, headers: Mapping[str, str]):
+        """Follow x-ratelimit-{limit,remaining,reset}-{requests,tokens} from a Groq response"""
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+            if limit_tokens:
+                # The token limit is per minute; the request limit is per day, so only its remainder is used
+                self.tokens.capacity = float(limit_tokens)
+            self.tokens.observe(
+                _header_int(headers, "x-ratelimit-remaining-tokens"),
+                parse_reset(headers.get("x-ratelimit-reset-tokens")), now
+            )
+            self.requests.observe(
+                _header_int(headers, "x-ratelimit-remaining-requests"),
+                parse_reset(headers.get("x-ratelimit-reset-requests")), now
+            )
+
+    def block(self, seconds: float):
+        """Admit nothing for this long, e.g. after a 429 with retry-after"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self.requests.blocked_until = max(self.requests.blocked_until, until)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "requests_per_minute": self.requests.capacity,
+                "requests_available": self.requests.level,
+                "tokens_per_minute": self.tokens.capacity,
+                "tokens_available": self.tokens.level,
+                "blocked_for_seconds": max(0.0, self.requests.blocked_until - now, self.tokens.blocked_until - now),
+            }
@@ -0,0 +1,47 @@
+"""
+Export the embedding model to ONNX and quantize it to int8.
+
+Run once on a machine with torch and optimum installed; the serving image then
+only needs onnxruntime and tokenizers (EMBEDDING_BACKEND=onnx or onnx-int8).
+
+    python setup_onnx_encoder.py [--output onnx_encoder]
+"""
+
+import argparse
+import os
+
+from config import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR
+from encoders import ONNX_MODEL_FILES
+
+def setup_onnx_encoder(output_dir: str = ONNX_MODEL_DIR, model_name: str = EMBEDDING_MODEL_NAME):
+    """Write model.onnx, model_int8.onnx and tokenizer.json to output_dir"""
+    print(f"🚀 Exporting {model_name} to ONNX...")
+    try:
+        from optimum.exporters.onnx import main_export
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        print(f"❌ Export needs optimum[onnxruntime]: {e}")
+        return False
+
+    try:
+        # Writes model.onnx plus the tokenizer files next to it
+        main_export(model_name, output=output_dir, task="feature-extraction")
+        
+        float_path = os.path.join(output_dir, ONNX_MODEL_FILES["onnx"])
+        int8_path = os.path.join(output_dir, ONNX_MODEL_FILES["onnx-int8"])
+        print("🗜️  Quantizing weights to int8...")
+        quantize_dynamic(float_path, int8_path, weight_type=QuantType.QInt8)
+        
+        for path in (float_path, int8_path):
+            print(f"✅ {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        print("🔍 Run benchmark_encoders.py to check retrieval parity before switching backends")
+        return True
+    except Exception as e:
+        print(f"❌ Failed to export encoder: {e}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=ONNX_MODEL_DIR, help="Directory for the exported models")
+    args = parser.parse_args()
+    setup_onnx_encoder(args.output)
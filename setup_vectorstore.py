@@ -1,60 +1,135 @@
 import os
 import json
-import torch
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 
-def setup_incose_vectorstore():
-    """Create and persist the INCOSE vectorstore"""
+from config import (
+    INCOSE_PERSIST_DIR, VECTOR_BACKEND, NUMPY_INDEX_DIR, EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS, INCOSE_CHUNKS_PATH, BM25_INDEX_PATH
+)
+from bm25_index import BM25Index, index_path
+from encoders import ENCODER_BACKENDS, encoder_signature
+from incose_validator import IncoseStore
+from numpy_index import NumpyVectorIndex
+
+CHUNKS_PATH = INCOSE_CHUNKS_PATH
+
+def chunk_id(chunk: str, encoder_backend: str = EMBEDDING_BACKEND) -> str:
+    """
+    Content-hashed ID of a chunk
+
+    The embedding model and encoder backend are part of the hash, so switching
+    either re-embeds every chunk instead of mixing vectors in one collection.
+    """
+    signature = encoder_signature(encoder_backend)
+    return hashlib.sha256(f"{signature}\0{chunk}".encode("utf-8")).hexdigest()
+
+def _embed_batches(embedding_model, texts: List[str], batch_size: int, workers: int) -> List[List[float]]:
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if workers <= 1 or len(batches) <= 1:
+        vectors = [embedding_model.embed_documents(batch) for batch in batches]
+    else:
+        # Torch and ONNX Runtime release the GIL, so a few threads overlap tokenization and inference
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            vectors = list(pool.map(embedding_model.embed_documents, batches))
+    return [vector for batch in vectors for vector in batch]
+
+def setup_incose_vectorstore(
+    chunks_path: str = CHUNKS_PATH,
+    persist_dir: str = INCOSE_PERSIST_DIR,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS,
+    encoder_backend: str = EMBEDDING_BACKEND
+):
+    """
+    Create or incrementally update the persisted INCOSE vectorstore
+
+    Chunks are stored under content-hashed IDs. Only chunks missing from the store
+    are embedded and upserted, and stored chunks no longer in chunks_path are
+    removed, so rerunning on unchanged input embeds nothing.
+
+    Args:
+        chunks_path (str): JSON list of text chunks
+        persist_dir (str): Chroma persist directory
+        batch_size (int): Chunks per embedding call
+        workers (int): Concurrent embedding calls
+        encoder_backend (str): Encoder from encoders.ENCODER_BACKENDS
+
+    Returns:
+        bool: Whether the store is up to date
+    """
     
     print("🚀 Setting up INCOSE vector database...")
     
     # Check if chunked data exists
-    if not os.path.exists("chunked_incose.json"):
-        print("❌ chunked_incose.json not found. Please ensure the file is in the UML directory.")
+    if not os.path.exists(chunks_path):
+        print(f"❌ {chunks_path} not found. Please ensure the file is in the UML directory.")
         return False
     
     try:
         # Load the chunked text
         print("📖 Loading chunked INCOSE data...")
-        with open("chunked_incose.json", "r", encoding="utf-8") as f:
+        with open(chunks_path, "r", encoding="utf-8") as f:
             chunks = json.load(f)
         
         print(f"✅ Loaded {len(chunks)} chunks")
         
-        # Convert chunks to LangChain Document objects
-        docs = [Document(page_content=chunk) for chunk in chunks]
-        
-        # Set PyTorch to avoid meta tensor issues
-        torch.set_default_dtype(torch.float32)
+        # Identical chunks share an ID, so keep the first occurrence only
+        wanted: Dict[str, str] = {}
+        for chunk in chunks:
+            wanted.setdefault(chunk_id(chunk, encoder_backend), chunk)
         
-        # Initialize HuggingFace Embeddings model with device mapping fix
         print("🤖 Initializing embedding model...")
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={
-                'device': 'cpu',
-                'torch_dtype': torch.float32
-            },
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        # Chroma stays the source of truth; the numpy index is exported from it below
+        store = IncoseStore.load(persist_dir, backend="chroma", encoder_backend=encoder_backend)
+        if store.vectorstore is None:
+            return False
+        collection = store.vectorstore._collection
+        
+        existing = set(collection.get(include=[])["ids"])
+        stale = sorted(existing - wanted.keys())
+        missing = [doc_id for doc_id in wanted if doc_id not in existing]
+        skipped = len(wanted) - len(missing)
+        
+        if stale:
+            print(f"🧹 Removing {len(stale)} stale chunks...")
+            collection.delete(ids=stale)
+        
+        if missing:
+            print(f"💾 Embedding {len(missing)} new or changed chunks into {persist_dir} "
+                  f"(batch size {batch_size}, {workers} workers)...")
+            start = time.perf_counter()
+            documents = [wanted[doc_id] for doc_id in missing]
+            embeddings = _embed_batches(store.embedding_model, documents, batch_size, workers)
+            # Upsert rather than add so an interrupted earlier run cannot leave duplicates
+            for i in range(0, len(missing), batch_size):
+                collection.upsert(
+                    ids=missing[i:i + batch_size],
+                    embeddings=embeddings[i:i + batch_size],
+                    documents=documents[i:i + batch_size]
+                )
+            print(f"⏱️  Embedded in {time.perf_counter() - start:.2f}s")
         
-        # Create and persist Chroma vector DB
-        persist_dir = "chroma_db_incose"
-        print(f"💾 Creating vector database at {persist_dir}...")
+        if stale or missing:
+            # Save to disk
+            store.vectorstore.persist()
         
-        vectorstore = Chroma.from_documents(
-            documents=docs,
-            embedding=embeddings,
-            persist_directory=persist_dir
-        )
+        index_present = NumpyVectorIndex.exists(NUMPY_INDEX_DIR)
+        if (VECTOR_BACKEND == "numpy" or index_present) and (stale or missing or not index_present):
+            index = NumpyVectorIndex.from_chroma(store.vectorstore, NUMPY_INDEX_DIR)
+            print(f"🧮 Exported numpy index with {len(index)} chunks to {NUMPY_INDEX_DIR}")
         
-        # Save to disk
-        vectorstore.persist()
+        # Rebuilt only when chunks_path changed since the last build
+        bm25_path = index_path(persist_dir, BM25_INDEX_PATH)
+        bm25 = BM25Index.load_or_build(chunks_path, bm25_path)
+        print(f"📚 BM25 index covers {len(bm25)} chunks at {bm25_path}")
         
-        print(f"✅ INCOSE vector database created successfully at: {persist_dir}")
-        print(f"📊 Database contains {len(chunks)} document chunks")
+        print(f"✅ INCOSE vector database up to date at: {persist_dir}")
+        print(f"📊 Embedded: {len(missing)}, skipped: {skipped}, removed: {len(stale)}, "
+              f"total: {collection.count()}")
         
         return True
         
@@ -63,4 +138,13 @@ def setup_incose_vectorstore():
         return False
 
 if __name__ == "__main__":
-    setup_incose_vectorstore()
+    parser = argparse.ArgumentParser(description="Create or incrementally update the INCOSE vector database")
+    parser.add_argument("--chunks", default=CHUNKS_PATH, help="JSON list of text chunks")
+    parser.add_argument("--persist-dir", default=INCOSE_PERSIST_DIR, help="Chroma persist directory")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Chunks per embedding call")
+    parser.add_argument("--workers", type=int, default=EMBEDDING_WORKERS, help="Concurrent embedding calls")
+    parser.add_argument("--encoder", default=EMBEDDING_BACKEND, choices=ENCODER_BACKENDS, help="Encoder backend")
+    args = parser.parse_args()
+    setup_incose_vectorstore(
+        args.chunks, args.persist_dir, max(1, args.batch_size), max(1, args.workers), args.encoder
+    )
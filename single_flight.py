@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing of identical concurrent requests.
+
+When many users submit the same scenario or requirement at once (a workshop
+running the same example), only the first request runs the pipeline; the rest
+await its result instead of each spending an LLM call. Unlike the response
+caches this needs no stored result: a key is shared only while its call is in
+flight, so it also covers requests that bypass or miss the caches, and the
+cost is one dict lookup per request.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from config import SINGLE_FLIGHT_ENABLED
+from metrics import SINGLE_FLIGHT_CALLS
+
+T = TypeVar("T")
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        """
+        Args:
+            name (str): Label for stats and metrics, e.g. the endpoint path
+            enabled (bool): False runs every call on its own
+        """
+        self.name = name
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call(), or join the identical call already in flight
+
+        Args:
+            key (Hashable): Identifies identical requests; build it from normalized input
+                and every option that changes the result
+            call (Callable): Starts the work; only invoked by the first caller of a key
+
+        Returns:
+            T: The shared result. Every waiter receives the same object, so treat it as read-only.
+        """
+        if not self.enabled:
+            return await call()
+        pending = self._inflight.get(key)
+        if pending is None:
+            self.leaders += 1
+            SINGLE_FLIGHT_CALLS.inc(1, self.name, "leader")
+            pending = asyncio.ensure_future(call())
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda future: self._finish(key, future))
+        else:
+            self.coalesced += 1
+            SINGLE_FLIGHT_CALLS.inc(1, self.name, "coalesced")
+        # Shielded so a client disconnecting does not cancel a call others are waiting for
+        return await asyncio.shield(pending)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # Retrieved here in case every waiter has gone away
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_share": self.coalesced / calls if calls else 0.0,
+        }
@@ -0,0 +1,18 @@
+from dot_writer import diagram_to_dot
+from groq_client import GroqUMLClient
+from uml_models import UMLClass, UMLDiagram
+
+def test_missing_title_is_written_as_empty_comment():
+    diagram = UMLDiagram(classes=[UMLClass(name="Order")])
+    diagram.title = None  # What an unvalidated assignment from an empty <title/> used to leave
+    dot = diagram_to_dot(diagram)
+    assert dot.startswith("// \ndigraph {")
+    assert "Order" in dot
+
+def test_empty_title_element_keeps_default_title():
+    client = GroqUMLClient(model="llama3-8b-8192")
+    diagram = client._parse_xml_to_uml(
+        "<uml><title/><classes><class><name>Order</name></class></classes></uml>"
+    )
+    assert diagram.title == UMLDiagram().title
+    assert "Order" in diagram_to_dot(diagram)
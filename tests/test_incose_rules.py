@@ -0,0 +1,24 @@
+import pytest
+
+from incose_rules import screen_requirement
+
+@pytest.mark.parametrize("requirement", [
+    "The radio shall tune within 1.5 kHz.",
+    "The crane shall lift loads up to 1,000 kg.",
+    "The crane shall lift loads up to 1,250.5 kg.",
+    "The valve shall close within 5-10 s.",
+    "The valve shall close within 5 - 10 s.",
+    "The client shall support API version 2.0.",
+    "The server shall respond within 200 ms.",
+    "The link shall sustain 99.9% availability.",
+])
+def test_quantities_with_units_are_not_flagged(requirement):
+    assert "missing_unit" not in screen_requirement(requirement).rule_ids
+
+@pytest.mark.parametrize("requirement", [
+    "The pump shall start within 10.",
+    "The tank shall hold 1,000.",
+    "The tank shall hold 2.5 of fuel.",
+])
+def test_quantities_without_units_are_flagged(requirement):
+    assert "missing_unit" in screen_requirement(requirement).rule_ids
@@ -0,0 +1,39 @@
+import asyncio
+import sqlite3
+
+from job_queue import JobQueue, JobStore
+
+def test_worker_survives_a_failed_claim():
+    store = JobStore(":memory:")
+    claim = store.claim
+    failures = []
+
+    def flaky_claim():
+        if not failures:
+            failures.append(True)
+            raise sqlite3.OperationalError("database is locked")
+        return claim()
+
+    store.claim = flaky_claim
+
+    async def echo(payload, progress):
+        return {"echo": payload["value"]}
+
+    async def scenario():
+        queue = JobQueue(store, workers=1, poll_seconds=0.01)
+        await queue.start({"echo": echo})
+        try:
+            job = await queue.submit("echo", {"value": 1})
+            for _ in range(200):
+                finished = store.get(job["id"])
+                if finished["status"] == "succeeded":
+                    return finished
+                await asyncio.sleep(0.01)
+            return store.get(job["id"])
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert failures
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"echo": 1}
@@ -0,0 +1,9 @@
+from validator_registry import ValidatorRegistry
+
+def test_result_caches_are_separate_per_output_mode():
+    registry = ValidatorRegistry()
+    text = registry.get_result_cache("llama3-8b-8192", structured=False)
+    structured = registry.get_result_cache("llama3-8b-8192", structured=True)
+    assert text is not structured
+    assert registry.get_result_cache("llama3-8b-8192", structured=True) is structured
+    assert set(registry.cache_stats()["llama3-8b-8192"]) == {"text", "structured"}
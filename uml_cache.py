@@ -0,0 +1,188 @@
+"""
+Content-addressed response cache for UML generation.
+An in-memory LRU tier backed by an optional on-disk SQLite tier, both with TTL and size limits.
+Reads never write to disk: access times of disk hits are saved with the next set(). Async
+callers use aget/aset, which run disk-tier work in a thread instead of on the event loop.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import (
+    UML_CACHE_ENABLED, UML_CACHE_MAX_ENTRIES, UML_CACHE_TTL_SECONDS,
+    UML_CACHE_SQLITE_PATH, UML_CACHE_SQLITE_MAX_ENTRIES
+)
+from uml_models import UMLDiagram
+
+def normalize_scenario(scenario: str) -> str:
+    """Collapse whitespace and case so trivially different scenarios share an entry"""
+    return " ".join(scenario.split()).casefold()
+
+class UMLResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        sqlite_path: Optional[str] = None,
+        sqlite_max_entries: int = 10000
+    ):
+        """
+        Args:
+            max_entries (int): Entries kept in the in-memory LRU tier
+            ttl_seconds (float): Age after which an entry is treated as a miss; 0 disables expiry
+            sqlite_path (str): Optional database file for the persistent tier
+            sqlite_max_entries (int): Entries kept on disk before the least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_max_entries = sqlite_max_entries
+        self._memory = OrderedDict()  # key -> (stored_at, diagram json)
+        self._touched = {}  # key -> accessed_at of disk hits not yet written
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS uml_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS uml_cache_accessed ON uml_cache(accessed_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(scenario: str, uml_type: str, model: str, prompt_version: str) -> str:
+        payload = "\x1f".join([normalize_scenario(scenario), uml_type or "class", model, prompt_version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[UMLDiagram]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if not self._expired(stored_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return UMLDiagram.model_validate_json(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM uml_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, stored_at = row
+                    # Expired rows are a miss here and deleted by the next set()
+                    if not self._expired(stored_at, now):
+                        self._touched[key] = now
+                        self._put_memory(key, stored_at, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return UMLDiagram.model_validate_json(value)
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, diagram: UMLDiagram):
+        now = time.time()
+        value = diagram.model_dump_json()
+        with self._lock:
+            self._put_memory(key, now, value)
+            if self._db is not None:
+                if self._touched:
+                    self._db.executemany(
+                        "UPDATE uml_cache SET accessed_at = ? WHERE key = ?",
+                        [(accessed_at, touched) for touched, accessed_at in self._touched.items()]
+                    )
+                    self._touched.clear()
+                if self.ttl_seconds:
+                    self._db.execute("DELETE FROM uml_cache WHERE stored_at < ?", (now - self.ttl_seconds,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO uml_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                overflow = self._db.execute("SELECT COUNT(*) FROM uml_cache").fetchone()[0] - self.sqlite_max_entries
+                if overflow > 0:
+                    self._db.execute(
+                        "DELETE FROM uml_cache WHERE key IN "
+                        "(SELECT key FROM uml_cache ORDER BY accessed_at LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+                self._db.commit()
+
+    async def aget(self, key: str) -> Optional[UMLDiagram]:
+        """get for async callers; the disk tier is read in a thread"""
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, diagram: UMLDiagram):
+        """set for async callers; the disk write and commit run in a thread"""
+        if self._db is None:
+            self.set(key, diagram)
+        else:
+            await asyncio.to_thread(self.set, key, diagram)
+
+    def _put_memory(self, key: str, stored_at: float, value: str):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM uml_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM uml_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_uml_cache() -> Optional[UMLResponseCache]:
+    """Return the process-wide cache configured in config.py, or None when caching is disabled"""
+    global _default_cache
+    if not UML_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = UMLResponseCache(
+                    max_entries=UML_CACHE_MAX_ENTRIES,
+                    ttl_seconds=UML_CACHE_TTL_SECONDS,
+                    sqlite_path=UML_CACHE_SQLITE_PATH,
+                    sqlite_max_entries=UML_CACHE_SQLITE_MAX_ENTRIES
+                )
+    return _default_cache
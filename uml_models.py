@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, PrivateAttr
+from typing import List, Optional
 
 class UMLClass(BaseModel):
     name: str
@@ -14,4 +14,31 @@ class UMLRelationship(BaseModel):
 class UMLDiagram(BaseModel):
     classes: List[UMLClass] = []
     relationships: List[UMLRelationship] = []
-    title: str = "UML Class Diagram"
\ No newline at end of file
+    title: str = "UML Class Diagram"
+    # Set when the Groq scheduler fell back to another model; private, so not part of the tool schema or JSON
+    _served_model: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def served_model(self) -> Optional[str]:
+        """Model that generated the diagram when it is not the one requested, else None"""
+        return self._served_model
+
+class UMLDiagramPatch(BaseModel):
+    """Changes to an existing diagram; classes are matched by name"""
+    title: Optional[str] = None  # New title, or None to keep it
+    added_classes: List[UMLClass] = []
+    changed_classes: List[UMLClass] = []  # Full replacement of the class with the same name
+    removed_classes: List[str] = []  # Their relationships are removed with them
+    added_relationships: List[UMLRelationship] = []
+    removed_relationships: List[UMLRelationship] = []
+
+class UMLSubsystem(BaseModel):
+    name: str
+    description: str = ""
+    classes: List[str] = []  # Names of the classes this subsystem defines
+
+class UMLOutline(BaseModel):
+    """First pass of partitioned generation: subsystems and the relationships between them"""
+    title: str = "UML Class Diagram"
+    subsystems: List[UMLSubsystem] = []
+    relationships: List[UMLRelationship] = []  # Between classes of different subsystems
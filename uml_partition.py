@@ -0,0 +1,90 @@
+"""
+Hierarchical generation of large diagrams.
+
+One completion cannot hold the diagram of a big system, and a truncated XML
+answer parses to nothing. Partitioned generation asks first for an outline
+(subsystems, the classes each one owns, and the relationships between
+subsystems), then generates every subsystem's classes in its own completion,
+concurrently, and merges the results here. Class names are matched loosely
+across subsystems ("Order Item", "order_item" and "OrderItem" are one class),
+so relationships that cross subsystem boundaries resolve to the class that
+defines them.
+"""
+
+import re
+from typing import Dict, List
+
+from uml_models import UMLClass, UMLDiagram, UMLOutline, UMLRelationship, UMLSubsystem
+
+_NAME_NOISE = re.compile(r"[\s_\-]+")
+
+def normalize_class_name(name: str) -> str:
+    return _NAME_NOISE.sub("", name or "").casefold()
+
+def subsystem_scenario(scenario: str, outline: UMLOutline, subsystem: UMLSubsystem) -> str:
+    """The scenario text for one subsystem's completion"""
+    others = [
+        name for other in outline.subsystems if other is not subsystem for name in other.classes
+    ]
+    lines = [
+        scenario,
+        f"Model ONLY the {subsystem.name} subsystem of this system: {subsystem.description}".rstrip(": "),
+    ]
+    if subsystem.classes:
+        lines.append(f"Define these classes in full: {', '.join(subsystem.classes)}.")
+    if others:
+        lines.append(
+            f"Classes of other subsystems, which you may relate to by exact name but must not define: {', '.join(others)}."
+        )
+    return "\n".join(lines)
+
+def _merge_members(existing: List[str], extra: List[str]) -> List[str]:
+    merged = list(existing)
+    for member in extra:
+        if member not in merged:
+            merged.append(member)
+    return merged
+
+def merge_subsystem_diagrams(outline: UMLOutline, diagrams: List[UMLDiagram]) -> UMLDiagram:
+    """
+    Merge the subsystem diagrams of an outline into one diagram
+
+    Args:
+        outline (UMLOutline): Outline the subsystems were generated from
+        diagrams (List[UMLDiagram]): One diagram per outline subsystem, in order; a failed
+            subsystem (no classes) contributes its outlined classes without members
+
+    Returns:
+        UMLDiagram: Classes merged by normalized name (members of duplicates are
+        combined), and relationships whose endpoints resolve, without duplicates
+    """
+    classes: Dict[str, UMLClass] = {}
+    for subsystem, diagram in zip(outline.subsystems, diagrams):
+        generated = diagram.classes or [UMLClass(name=name) for name in subsystem.classes]
+        for uml_class in generated:
+            key = normalize_class_name(uml_class.name)
+            if not key:
+                continue
+            if key in classes:
+                merged = classes[key]
+                merged.attributes = _merge_members(merged.attributes, uml_class.attributes)
+                merged.methods = _merge_members(merged.methods, uml_class.methods)
+            else:
+                classes[key] = uml_class.model_copy(deep=True)
+
+    relationships = []
+    seen = set()
+    candidates = [relationship for diagram in diagrams for relationship in diagram.relationships]
+    for relationship in candidates + outline.relationships:
+        source = classes.get(normalize_class_name(relationship.from_class))
+        target = classes.get(normalize_class_name(relationship.to_class))
+        if source is None or target is None:
+            continue
+        key = (source.name, target.name, relationship.relationship_type)
+        if key not in seen:
+            seen.add(key)
+            relationships.append(UMLRelationship(
+                from_class=source.name, to_class=target.name, relationship_type=relationship.relationship_type
+            ))
+
+    return UMLDiagram(title=outline.title, classes=list(classes.values()), relationships=relationships)
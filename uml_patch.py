@@ -0,0 +1,106 @@
+"""
+Apply incremental changes to a UMLDiagram and emit DOT for only what changed.
+
+A refinement asks the LLM for a UMLDiagramPatch instead of a whole diagram.
+apply_patch merges it into the previous diagram, and dot_fragments returns the
+node and edge statements that were added, replaced or removed. dot_writer's
+output is deterministic, so a client holding the previous DOT source can splice
+these statements in instead of reloading the graph.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from dot_writer import class_statement, quote_id, relationship_statement
+from uml_models import UMLClass, UMLDiagram, UMLDiagramPatch, UMLRelationship
+
+@dataclass
+class DiagramChanges:
+    """What apply_patch actually changed; no-op entries of the patch are left out"""
+    title: Optional[str] = None  # Set when the title changed
+    classes: List[UMLClass] = field(default_factory=list)  # Added or replaced
+    removed_classes: List[str] = field(default_factory=list)
+    relationships: List[UMLRelationship] = field(default_factory=list)  # Added
+    removed_relationships: List[UMLRelationship] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.title or self.classes or self.removed_classes
+            or self.relationships or self.removed_relationships
+        )
+
+def _relationship_key(relationship: UMLRelationship) -> Tuple[str, str, str]:
+    return relationship.from_class, relationship.to_class, relationship.relationship_type
+
+def apply_patch(diagram: UMLDiagram, patch: UMLDiagramPatch) -> Tuple[UMLDiagram, DiagramChanges]:
+    """
+    Merge a patch into a diagram without modifying either
+
+    Args:
+        diagram (UMLDiagram): Current diagram
+        patch (UMLDiagramPatch): Proposed changes
+
+    Returns:
+        Tuple[UMLDiagram, DiagramChanges]: The patched diagram and what changed. Classes
+        keep their order and new ones are appended; relationships of removed classes
+        are removed, and added relationships must connect classes of the result.
+    """
+    changes = DiagramChanges()
+    if patch.title and patch.title != diagram.title:
+        changes.title = patch.title
+
+    classes: Dict[str, UMLClass] = {uml_class.name: uml_class for uml_class in diagram.classes}
+    for name in patch.removed_classes:
+        if classes.pop(name, None) is not None:
+            changes.removed_classes.append(name)
+    # Added and changed classes are both upserts by name: models mix the two up
+    touched = {}
+    for uml_class in patch.changed_classes + patch.added_classes:
+        if classes.get(uml_class.name) != uml_class:
+            classes[uml_class.name] = uml_class
+            touched[uml_class.name] = uml_class
+    changes.classes = list(touched.values())
+
+    removed_names = set(changes.removed_classes)
+    dropped = {_relationship_key(relationship) for relationship in patch.removed_relationships}
+    relationships = []
+    for relationship in diagram.relationships:
+        if (_relationship_key(relationship) in dropped
+                or relationship.from_class in removed_names or relationship.to_class in removed_names):
+            changes.removed_relationships.append(relationship)
+        else:
+            relationships.append(relationship)
+
+    present = {_relationship_key(relationship) for relationship in relationships}
+    for relationship in patch.added_relationships:
+        key = _relationship_key(relationship)
+        if key not in present and relationship.from_class in classes and relationship.to_class in classes:
+            present.add(key)
+            relationships.append(relationship)
+            changes.relationships.append(relationship)
+
+    patched = UMLDiagram(
+        title=changes.title or diagram.title,
+        classes=list(classes.values()),
+        relationships=relationships
+    )
+    return patched, changes
+
+def dot_fragments(changes: DiagramChanges) -> dict:
+    """
+    DOT statements for the changes, as dot_writer emits them
+
+    "classes" maps each added or replaced class to its node statement (replacing the
+    line that starts with the same node ID), "removed_class_ids" lists node IDs whose
+    statements go away, and relationship statements are given verbatim to add or drop.
+    """
+    return {
+        "title": changes.title,
+        "classes": {uml_class.name: class_statement(uml_class) for uml_class in changes.classes},
+        "removed_class_ids": [quote_id(name) for name in changes.removed_classes],
+        "relationships": [relationship_statement(relationship) for relationship in changes.relationships],
+        "removed_relationships": [
+            relationship_statement(relationship) for relationship in changes.removed_relationships
+        ],
+    }
@@ -0,0 +1,159 @@
+"""
+XML helpers for LLM-generated UML diagrams, including an incremental parser
+that turns a streamed completion into classes and relationships as they close.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import List, Optional, Tuple
+
+from uml_models import UMLDiagram, UMLDiagramPatch, UMLClass, UMLOutline, UMLRelationship, UMLSubsystem
+
+ROOT_OPEN = "<uml_diagram"
+ROOT_CLOSE = "</uml_diagram>"
+
+def class_from_element(class_elem: ET.Element) -> UMLClass:
+    uml_class = UMLClass(name=class_elem.find("name").text)
+
+    attrs_elem = class_elem.find("attributes")
+    if attrs_elem is not None:
+        for attr_elem in attrs_elem.findall("attribute"):
+            text = (attr_elem.text or "").strip()
+            if text:
+                uml_class.attributes.append(text)
+
+    methods_elem = class_elem.find("methods")
+    if methods_elem is not None:
+        for method_elem in methods_elem.findall("method"):
+            text = (method_elem.text or "").strip()
+            if text:
+                uml_class.methods.append(text)
+    return uml_class
+
+def relationship_from_element(rel_elem: ET.Element) -> UMLRelationship:
+    return UMLRelationship(
+        from_class=rel_elem.find("from").text,
+        to_class=rel_elem.find("to").text,
+        relationship_type=rel_elem.find("type").text
+    )
+
+def strip_code_fence(content: str) -> str:
+    """The XML inside a ```xml (or bare ```) fence, or the content unchanged"""
+    if "```xml" in content:
+        return content.split("```xml")[1].split("```")[0]
+    if "```" in content:
+        return content.split("```")[1]
+    return content
+
+def patch_from_element(root: ET.Element) -> UMLDiagramPatch:
+    """Read a <uml_patch> element; missing sections are empty"""
+    def section(tag: str, child: str) -> List[ET.Element]:
+        elem = root.find(tag)
+        return elem.findall(child) if elem is not None else []
+
+    title_elem = root.find("title")
+    title = (title_elem.text or "").strip() if title_elem is not None else ""
+    return UMLDiagramPatch(
+        title=title or None,
+        added_classes=[class_from_element(elem) for elem in section("added_classes", "class")],
+        changed_classes=[class_from_element(elem) for elem in section("changed_classes", "class")],
+        removed_classes=[elem.text.strip() for elem in section("removed_classes", "name") if elem.text],
+        added_relationships=[
+            relationship_from_element(elem) for elem in section("added_relationships", "relationship")
+        ],
+        removed_relationships=[
+            relationship_from_element(elem) for elem in section("removed_relationships", "relationship")
+        ]
+    )
+
+def outline_from_element(root: ET.Element) -> UMLOutline:
+    """Read a <uml_outline> element"""
+    outline = UMLOutline()
+    title_elem = root.find("title")
+    if title_elem is not None and title_elem.text:
+        outline.title = title_elem.text.strip()
+    subsystems_elem = root.find("subsystems")
+    if subsystems_elem is not None:
+        for subsystem_elem in subsystems_elem.findall("subsystem"):
+            classes_elem = subsystem_elem.find("classes")
+            outline.subsystems.append(UMLSubsystem(
+                name=subsystem_elem.find("name").text.strip(),
+                description=(subsystem_elem.findtext("description") or "").strip(),
+                classes=[
+                    name_elem.text.strip() for name_elem in classes_elem.findall("name") if name_elem.text
+                ] if classes_elem is not None else []
+            ))
+    relationships_elem = root.find("relationships")
+    if relationships_elem is not None:
+        for rel_elem in relationships_elem.findall("relationship"):
+            outline.relationships.append(relationship_from_element(rel_elem))
+    return outline
+
+class IncrementalUMLParser:
+    """
+    Parse a streamed <uml_diagram> document chunk by chunk
+
+    Text before the root element (prose, ```xml fences) and after it is ignored.
+    feed() returns the events completed by that chunk: ("title", str),
+    ("class", UMLClass) or ("relationship", UMLRelationship). The diagram built
+    so far is always available as .diagram.
+    """
+
+    def __init__(self):
+        self.diagram = UMLDiagram()
+        self.error: Optional[str] = None
+        self.finished = False
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._started = False
+        self._prefix = ""  # Text seen before the root element opened
+        self._tail = ""  # End of the text fed so far, to spot a root close split across chunks
+        self._depth = 0
+
+    def feed(self, text: str) -> List[Tuple[str, object]]:
+        if self.finished or self.error or not text:
+            return []
+
+        if not self._started:
+            self._prefix += text
+            start = self._prefix.find(ROOT_OPEN)
+            if start == -1:
+                # Keep just enough to match a root tag split across chunks
+                self._prefix = self._prefix[-len(ROOT_OPEN):]
+                return []
+            self._started = True
+            text = self._prefix[start:]
+            self._prefix = ""
+
+        combined = self._tail + text
+        end = combined.find(ROOT_CLOSE)
+        if end != -1:
+            text = text[:end + len(ROOT_CLOSE) - len(self._tail)]
+            self.finished = True
+        self._tail = combined[-len(ROOT_CLOSE):]
+
+        try:
+            self._parser.feed(text)
+            return self._drain()
+        except ET.ParseError as e:
+            self.error = str(e)
+            return []
+
+    def _drain(self) -> List[Tuple[str, object]]:
+        events = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                self._depth += 1
+                continue
+            self._depth -= 1
+            # Depth after closing: 1 means a direct child of <uml_diagram>, 2 a grandchild
+            if elem.tag == "title" and self._depth == 1:
+                self.diagram.title = elem.text or self.diagram.title
+                events.append(("title", self.diagram.title))
+            elif elem.tag == "class" and self._depth == 2:
+                uml_class = class_from_element(elem)
+                self.diagram.classes.append(uml_class)
+                events.append(("class", uml_class))
+            elif elem.tag == "relationship" and self._depth == 2:
+                relationship = relationship_from_element(elem)
+                self.diagram.relationships.append(relationship)
+                events.append(("relationship", relationship))
+        return events
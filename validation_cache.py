@@ -0,0 +1,118 @@
+"""
+Semantic near-duplicate cache for INCOSE requirement validation.
+Exact (normalized) matches are direct hits; otherwise the closest cached requirement
+is reused when its cosine similarity clears a configurable threshold.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import numpy as np
+
+def normalize_requirement(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+class SemanticValidationCache:
+    def __init__(self, prompt_version: str, threshold: float = 0.97, max_entries: int = 2048):
+        """
+        Args:
+            prompt_version (str): Version of the evaluation prompt the cached results came from
+            threshold (float): Minimum cosine similarity for a near-duplicate hit
+            max_entries (int): Cached requirements kept before the least recently used is evicted
+        """
+        self.prompt_version = prompt_version
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reset()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _reset(self):
+        # Rows of _vectors are reused in place; _slots maps normalized text -> row in LRU order
+        self._vectors = None
+        self._has_vector = np.zeros(self.max_entries, dtype=bool)
+        self._slots = OrderedDict()
+        self._results = [None] * self.max_entries
+        self._keys = [None] * self.max_entries
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def invalidate(self, prompt_version: Optional[str] = None):
+        """Drop every entry, e.g. because the evaluation prompt changed"""
+        with self._lock:
+            if prompt_version is not None:
+                self.prompt_version = prompt_version
+            self._reset()
+
+    def ensure_prompt_version(self, prompt_version: str):
+        if prompt_version != self.prompt_version:
+            self.invalidate(prompt_version)
+
+    def lookup(self, requirement_text: str, embedding: Optional[Sequence[float]] = None):
+        """Return a copy of the cached ValidationResult for the requirement, or None"""
+        key = normalize_requirement(requirement_text)
+        with self._lock:
+            row = self._slots.get(key)
+            if row is not None:
+                self._slots.move_to_end(key)
+                self.exact_hits += 1
+                return copy.deepcopy(self._results[row])
+
+            if embedding is not None and self._vectors is not None and self._has_vector.any():
+                query = np.asarray(embedding, dtype=np.float32)
+                # Stored and query embeddings are unit-normalized, so the dot product is the cosine
+                similarities = self._vectors @ query
+                similarities[~self._has_vector] = -1.0
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._slots.move_to_end(self._keys[best])
+                    self.semantic_hits += 1
+                    return copy.deepcopy(self._results[best])
+
+            self.misses += 1
+            return None
+
+    def store(self, requirement_text: str, result, embedding: Optional[Sequence[float]] = None):
+        key = normalize_requirement(requirement_text)
+        with self._lock:
+            row = self._slots.get(key)
+            if row is None:
+                if not self._free:
+                    _, evicted_row = self._slots.popitem(last=False)
+                    self._has_vector[evicted_row] = False
+                    self._results[evicted_row] = None
+                    self._keys[evicted_row] = None
+                    self._free.append(evicted_row)
+                    self.evictions += 1
+                row = self._free.pop()
+            self._slots[key] = row
+            self._slots.move_to_end(key)
+            self._keys[row] = key
+            self._results[row] = copy.deepcopy(result)
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32)
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._vectors[row] = vector
+                self._has_vector[row] = True
+            else:
+                self._has_vector[row] = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "prompt_version": self.prompt_version,
+                "entries": len(self._slots),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,152 @@
+"""
+Process-wide INCOSE validator registry.
+Loads the embedding model and vector store once and hands out cheap per-model validators.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config import (
+    INCOSE_PERSIST_DIR, STRUCTURED_OUTPUT, VALIDATION_CACHE_ENABLED,
+    VALIDATION_CACHE_THRESHOLD, VALIDATION_CACHE_MAX_ENTRIES
+)
+from groq_client import GroqUMLClient
+from incose_validator import INCOSEValidator, IncoseStore
+from validation_cache import SemanticValidationCache
+
+class ValidatorRegistry:
+    COLD = "cold"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, persist_dir: str = INCOSE_PERSIST_DIR):
+        """Create an empty registry; nothing is loaded until warmup() or get() is called"""
+        self.persist_dir = persist_dir
+        self.state = self.COLD
+        self.error: Optional[str] = None
+        self.warmup_started_at: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._store: Optional[IncoseStore] = None
+        self._clients: Dict[Tuple[str, bool], GroqUMLClient] = {}
+        self._result_caches: Dict[Tuple[str, bool], SemanticValidationCache] = {}
+        self._store_lock = threading.Lock()
+        self._clients_lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def warmup(self) -> IncoseStore:
+        """
+        Load the shared embedding model and vector store if not loaded yet
+
+        Concurrent callers block on the same load instead of starting their own.
+        A failed load still yields a store, so validation degrades to the basic
+        context instead of erroring, but the registry reports itself as not ready.
+        """
+        if self._store is not None:
+            return self._store
+        with self._store_lock:
+            if self._store is not None:
+                return self._store
+            self.state = self.WARMING
+            self.warmup_started_at = time.time()
+            start = time.perf_counter()
+            store = IncoseStore.load(self.persist_dir)
+            if store.embedding_model is not None:
+                try:
+                    # Run one embedding so model weights are paged in before traffic arrives
+                    store.embedding_model.embed_query("The system shall respond within 2 seconds.")
+                except Exception as e:
+                    print(f"⚠️  Embedding warmup query failed: {e}")
+            self.warmup_seconds = time.perf_counter() - start
+            if store.has_retrieval:
+                self.state = self.READY
+                self.error = None
+                print(f"🔥 Validator registry warm in {self.warmup_seconds:.2f}s")
+            else:
+                self.state = self.FAILED
+                self.error = "Vector store could not be loaded"
+            self._store = store
+            return store
+
+    def start_background_warmup(self) -> threading.Thread:
+        """Warm up on a daemon thread so the server can accept health checks meanwhile"""
+        thread = threading.Thread(target=self.warmup, name="validator-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def get_client(self, model: str, structured: bool = None) -> GroqUMLClient:
+        """Return the shared Groq client for a model and output mode, creating it on first use"""
+        key = (model, STRUCTURED_OUTPUT if structured is None else structured)
+        client = self._clients.get(key)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = GroqUMLClient(model=model, structured=key[1])
+                    self._clients[key] = client
+        return client
+
+    def get_result_cache(self, model: str, structured: bool = None) -> Optional[SemanticValidationCache]:
+        """
+        Return the validation result cache for a model and output mode
+
+        Results are never shared across models, nor between free-text and
+        structured output, so a per-request structured override is honoured on hits.
+        """
+        if not VALIDATION_CACHE_ENABLED:
+            return None
+        key = (model, STRUCTURED_OUTPUT if structured is None else structured)
+        cache = self._result_caches.get(key)
+        if cache is None:
+            with self._clients_lock:
+                cache = self._result_caches.get(key)
+                if cache is None:
+                    cache = SemanticValidationCache(
+                        prompt_version=INCOSEValidator.PROMPT_VERSION,
+                        threshold=VALIDATION_CACHE_THRESHOLD,
+                        max_entries=VALIDATION_CACHE_MAX_ENTRIES
+                    )
+                    self._result_caches[key] = cache
+        return cache
+
+    def invalidate_result_caches(self):
+        for cache in list(self._result_caches.values()):
+            cache.invalidate()
+
+    def cache_stats(self) -> dict:
+        """Result cache counters by model, then by output mode ("text" or "structured")"""
+        stats: Dict[str, dict] = {}
+        for (model, structured), cache in list(self._result_caches.items()):
+            stats.setdefault(model, {})["structured" if structured else "text"] = cache.stats()
+        return stats
+
+    def embedding_cache_stats(self) -> Optional[dict]:
+        """Query embedding cache counters, or None before warmup"""
+        if self._store is None or self._store.embedding_model is None:
+            return None
+        return self._store.embedding_model.stats()
+
+    def get(self, model: str, structured: bool = None) -> INCOSEValidator:
+        """Return a validator for the model bound to the shared store"""
+        store = self.warmup()
+        return INCOSEValidator(
+            self.get_client(model, structured),
+            store=store,
+            result_cache=self.get_result_cache(model, structured)
+        )
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.is_ready,
+            "warmup_started_at": self.warmup_started_at,
+            "warmup_seconds": self.warmup_seconds,
+            "models": sorted({model for model, _ in self._clients}),
+            "error": self.error,
+        }
+
+validator_registry = ValidatorRegistry()